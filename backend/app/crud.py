@@ -1,8 +1,23 @@
 # backend/app/crud.py
+import os
 from sqlalchemy.orm import Session
 from datetime import datetime
-from sqlalchemy import select
-from backend.models import Device, SensorReading, Prediction, User
+from sqlalchemy import select, and_, or_, case, func
+from sqlalchemy.dialects import postgresql, sqlite
+from backend.models import Device, SensorReading, Prediction, User, DeviceStatus
+from backend.app.services.status import RISK_RUL, STATUS_SEVERITY
+
+# Версія моделі за замовчуванням (якщо реєстр моделей не використовується).
+# Прогнози інших версій (тіньове оцінювання, backfill кандидата) зберігаються
+# поруч з is_primary = False.
+SERVING_MODEL_VERSION = os.getenv("MODEL_VERSION", "best_rul_model")
+
+def prediction_join():
+    """Умова LEFT JOIN SensorReading -> Prediction лише для робочого прогнозу."""
+    return and_(
+        SensorReading.id == Prediction.reading_id,
+        Prediction.is_primary.is_(True)
+    )
 
 # Створити або отримати device по device_uid
 def get_or_create_device(db: Session, device_uid: str, product_type: str = None):
@@ -44,7 +59,7 @@ def insert_sensor_reading(db: Session, payload: dict):
 def get_next_unpredicted_reading(db: Session):
     """Повертає перший запис, для якого ще немає прогнозу."""
     # Використовуємо select() замість db.query().subquery()
-    subq = select(Prediction.reading_id)
+    subq = select(Prediction.reading_id).where(Prediction.is_primary.is_(True))
     
     # Фільтруємо записи, ID яких НЕМАЄ в підзапиті прогнозів
     row = db.query(SensorReading).filter(
@@ -53,7 +68,9 @@ def get_next_unpredicted_reading(db: Session):
     
     return row
 
-def insert_prediction_for_reading(db: Session, reading_id: int, predicted_rul: float, class_failure_type: str = "Normal"):
+def insert_prediction_for_reading(db: Session, reading_id: int, predicted_rul: float, class_failure_type: str = "Normal",
+                                  model_version: str = SERVING_MODEL_VERSION, is_primary: bool = True,
+                                  anomaly_score: float = None, device_id: int = None):
     """
     Зберігає результат роботи моделі та детектора.
     
@@ -62,13 +79,132 @@ def insert_prediction_for_reading(db: Session, reading_id: int, predicted_rul: f
         predicted_rul: Прогнозований час життя (або 0.0, якщо аварія)
         class_failure_type: Тип поломки ('Normal', 'PWF', 'TWF', 'HDF', 'OSF')
         probability: (Опціонально) Вірогідність поломки, якщо використовується класифікатор
+        model_version: Версія моделі з реєстру
+        is_primary: False для тіньових прогнозів (не показуються дашбордами)
+        anomaly_score: Оцінка аномальності показника (None, поки базова лінія порожня)
+        device_id: Пристрій запису — робочий прогноз оновлює device_status у тій самій транзакції
     """
     pred = Prediction(
         reading_id = reading_id,
         predicted_rul = float(predicted_rul),
-        class_failure_type = class_failure_type
+        class_failure_type = class_failure_type,
+        model_version = model_version,
+        is_primary = is_primary,
+        anomaly_score = anomaly_score
     )
     db.add(pred)
+    if is_primary and device_id is not None:
+        upsert_device_status_prediction(db, device_id, reading_id, predicted_rul, class_failure_type, anomaly_score)
     db.commit()
     db.refresh(pred)
     return pred
+
+
+# --- device_status: поточний стан пристрою, оновлюється при записі ---------------
+
+def _status_expression(failure, rul):
+    """determine_status (status.py) у вигляді SQL-виразу для ON CONFLICT DO UPDATE."""
+    return case(
+        (and_(failure.is_not(None), failure != "Normal"), "emergency"),
+        (rul < RISK_RUL, "risk"),
+        else_="normal"
+    )
+
+
+def _severity_expression(status):
+    return case(STATUS_SEVERITY, value=status, else_=0)
+
+
+def _device_status_insert(db: Session):
+    # INSERT ... ON CONFLICT є і в PostgreSQL, і в SQLite, але будується діалектом
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    return dialect.insert(DeviceStatus)
+
+
+def upsert_device_status_reading(db: Session, device_id: int, values: dict, failure: str = None, last_seen=None,
+                                 product_type: str = None):
+    """
+    Останній показник пристрою -> device_status (без commit, у транзакції запису показників).
+    reading_id — найбільший id пристрою в sensor_readings (індекс device_id, id),
+    тож показники можна вставляти і через COPY, який id не повертає.
+    Старіший показник новішого не перезаписує.
+    """
+    reading_id = select(func.max(SensorReading.id)).where(SensorReading.device_id == device_id).scalar_subquery()
+    status = "emergency" if failure and failure != "Normal" else "normal"
+    stmt = _device_status_insert(db).values(
+        device_id=device_id,
+        product_type=product_type,
+        reading_id=reading_id,
+        air_temp=values["air_temp"],
+        process_temp=values["process_temp"],
+        rotational_speed=values["rotational_speed"],
+        torque=values["torque"],
+        tool_wear=values["tool_wear"],
+        reading_failure=failure,
+        last_seen=last_seen or func.now(),
+        status=status,
+        severity=STATUS_SEVERITY[status],
+        updated_at=func.now()
+    )
+    excluded = stmt.excluded
+    # Відмова за новим показником + останній відомий прогноз
+    status = _status_expression(excluded.reading_failure, DeviceStatus.predicted_rul)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DeviceStatus.device_id],
+        set_={
+            "reading_id": excluded.reading_id,
+            "air_temp": excluded.air_temp,
+            "process_temp": excluded.process_temp,
+            "rotational_speed": excluded.rotational_speed,
+            "torque": excluded.torque,
+            "tool_wear": excluded.tool_wear,
+            "reading_failure": excluded.reading_failure,
+            "last_seen": excluded.last_seen,
+            "product_type": func.coalesce(excluded.product_type, DeviceStatus.product_type),
+            "status": status,
+            "severity": _severity_expression(status),
+            "updated_at": excluded.updated_at,
+        },
+        where=or_(DeviceStatus.reading_id.is_(None), excluded.reading_id > DeviceStatus.reading_id)
+    )
+    db.execute(stmt)
+
+
+def upsert_device_status_prediction(db: Session, device_id: int, reading_id: int, predicted_rul: float,
+                                    failure_type: str, anomaly_score: float = None):
+    """
+    Робочий прогноз -> device_status (без commit, у транзакції запису прогнозу).
+    Прогноз для старішого запису (наздоганяння черги) новішого не перезаписує.
+    """
+    failure = failure_type if failure_type != "Normal" else None
+    status = "emergency" if failure else "risk" if predicted_rul < RISK_RUL else "normal"
+    stmt = _device_status_insert(db).values(
+        device_id=device_id,
+        prediction_reading_id=reading_id,
+        predicted_rul=float(predicted_rul),
+        failure_type=failure_type,
+        anomaly_score=anomaly_score,
+        status=status,
+        severity=STATUS_SEVERITY[status],
+        updated_at=func.now()
+    )
+    excluded = stmt.excluded
+    # Відмова за останнім показником + новий прогноз
+    status = _status_expression(DeviceStatus.reading_failure, excluded.predicted_rul)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DeviceStatus.device_id],
+        set_={
+            "prediction_reading_id": excluded.prediction_reading_id,
+            "predicted_rul": excluded.predicted_rul,
+            "failure_type": excluded.failure_type,
+            "anomaly_score": excluded.anomaly_score,
+            "status": status,
+            "severity": _severity_expression(status),
+            "updated_at": excluded.updated_at,
+        },
+        where=or_(
+            DeviceStatus.prediction_reading_id.is_(None),
+            excluded.prediction_reading_id >= DeviceStatus.prediction_reading_id
+        )
+    )
+    db.execute(stmt)
@@ -1,7 +1,12 @@
 # backend/app/database.py
+import itertools
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
+from backend.app.services.metrics import instrument_engine
 
 # 1. Спробуємо отримати готовий URL від Docker (де прописано @db)
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -20,13 +25,136 @@ print(f"Connecting to Database: {DATABASE_URL}")
 
 # 3. Створюємо з'єднання
 engine = create_engine(DATABASE_URL, pool_size=10, max_overflow=20)
+instrument_engine(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# 4. Репліки для читання (необов'язково): графіки, експорт, /api/latest, знімок WebSocket.
+# Запис (consumer, predictor) і все інше — лише на основну БД.
+REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# Репліка, що відстала більше ніж на стільки секунд, не використовується
+MAX_REPLICA_LAG = float(os.getenv("MAX_REPLICA_LAG", 5.0))
+# Як часто перевіряти відставання кожної репліки (фоновий потік)
+REPLICA_CHECK_INTERVAL = 2.0
+# Недоступна репліка не повинна тримати перевірку довше за кілька секунд
+REPLICA_CONNECT_TIMEOUT = int(os.getenv("REPLICA_CONNECT_TIMEOUT", 3))
+
+# Відставання 0, якщо репліка програла все отримане (простій основної БД не рахується як відставання).
+# NULL — репліка не отримує WAL (зв'язок з основною БД розірвано): "програла все" тут нічого не означає.
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class Replica:
+    def __init__(self, url):
+        self.url = url
+        connect_args = {}
+        if make_url(url).get_backend_name() == "postgresql":
+            connect_args["connect_timeout"] = REPLICA_CONNECT_TIMEOUT
+        self.engine = create_engine(url, pool_size=5, max_overflow=10, pool_pre_ping=True,
+                                    connect_args=connect_args)
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.lag = None
+        self.healthy = None  # ще не перевірялась
+
+    def check(self):
+        """Оновлює відставання; недоступна репліка — healthy=False до наступної перевірки."""
+        try:
+            with self.engine.connect() as conn:
+                if self.engine.dialect.name == "postgresql":
+                    lag = conn.execute(REPLICA_LAG_SQL).scalar()
+                else:
+                    conn.execute(text("SELECT 1"))
+                    lag = 0.0
+            if lag is None:
+                if self.healthy is not False:
+                    print(f"[DB] Replica {self.engine.url.host} is not streaming WAL from the primary")
+                self.lag = None
+                self.healthy = False
+                return
+            self.lag = float(lag)
+            self.healthy = self.lag <= MAX_REPLICA_LAG
+        except Exception as e:
+            if self.healthy is not False:
+                print(f"[DB] Replica {self.engine.url.host} unavailable: {e}")
+            self.lag = None
+            self.healthy = False
+
+
+class ReplicaRouter:
+    """
+    Вибір репліки для читання (по колу серед придатних) з відкатом на основну БД.
+    Відставання перевіряє фоновий потік; pick лише читає результат останньої
+    перевірки, тож запит ніколи не чекає на недоступну репліку.
+    """
+
+    def __init__(self, urls):
+        self.replicas = [Replica(url) for url in urls]
+        self._order = itertools.cycle(range(len(self.replicas))) if self.replicas else None
+        self.lock = threading.Lock()
+        # pid процесу, в якому запущено потік (після fork воркера його треба запустити знову)
+        self._checker_pid = None
+
+    def _check_loop(self):
+        while True:
+            for replica in self.replicas:
+                replica.check()
+            time.sleep(REPLICA_CHECK_INTERVAL)
+
+    def _ensure_checker(self):
+        if self._checker_pid == os.getpid():
+            return
+        with self.lock:
+            if self._checker_pid != os.getpid():
+                self._checker_pid = os.getpid()
+                threading.Thread(target=self._check_loop, daemon=True, name="replica-check").start()
+
+    def pick(self):
+        if not self.replicas:
+            return None
+        self._ensure_checker()
+        # До першої перевірки (healthy=None) читання йде на основну БД
+        with self.lock:
+            for _ in range(len(self.replicas)):
+                replica = self.replicas[next(self._order)]
+                if replica.healthy:
+                    return replica
+        return None
+
+    def status(self):
+        return [
+            {"host": replica.engine.url.host, "healthy": replica.healthy,
+             "lag_seconds": None if replica.lag is None else round(replica.lag, 3)}
+            for replica in self.replicas
+        ]
+
+
+replica_router = ReplicaRouter(REPLICA_URLS)
+
+def ReadSessionLocal():
+    """Сесія лише для читання: придатна репліка або, якщо таких немає, основна БД."""
+    replica = replica_router.pick()
+    if replica is None:
+        return SessionLocal()
+    return replica.session_factory()
+
 def get_db():
     db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_read_db():
+    db = ReadSessionLocal()
     try:
         yield db
     finally:
@@ -6,10 +6,14 @@
 from fastapi import FastAPI, Request
 from fastapi.responses import RedirectResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
-from backend.app.database import engine, Base
-from backend.app.routers import web, live, auth, export
+from backend.app.database import engine, Base, replica_router
+from backend.app.routers import web, live, auth, export, alerts, admin, fleet
 from backend.app.services.auth import NotAuthenticatedException
+from backend.app.services import readiness
+from sqlalchemy import text
+from prometheus_client import make_asgi_app
 import os
+import time
 
 app = FastAPI(title="Система прогнозування технічного стану обладнання")
 
@@ -18,13 +22,51 @@ app.include_router(auth.router)
 app.include_router(live.router) 
 app.include_router(web.router)
 app.include_router(export.router)
+app.include_router(alerts.router)
+app.include_router(admin.router)
+app.include_router(fleet.router)
+
+# Метрики вебсервера (WebSocket, пул з'єднань) у форматі Prometheus
+app.mount("/metrics", make_asgi_app())
 
 # статичні файли
 # app.mount("/static", StaticFiles(directory="backend/app/templates/static"), name="static")
 
+def check_database():
+    started = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        return {"ready": False, "detail": str(e)}
+    return {"ready": True, "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+@app.on_event("startup")
+def warm_up():
+    # Відкриваємо перше з'єднання пулу до першого запиту
+    database = check_database()
+    print(f"[WEB] Database {'ready' if database['ready'] else 'unavailable'}")
+
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    """
+    Вебсервер живий, якщо відповідає. ready — чи готова вся система:
+    БД доступна, predictor прогрів моделі, consumer підключений до брокера.
+    """
+    components = {"database": check_database()}
+    if replica_router.replicas:
+        # Репліки не впливають на ready: без них читання йде з основної БД
+        components["database"]["replicas"] = replica_router.status()
+    for component in readiness.COMPONENTS:
+        components[component] = readiness.read_status(component)
+    ready = all(c["ready"] for c in components.values())
+    return {"status": "ok", "ready": ready, "components": components}
+
+@app.get("/health/ready")
+def health_ready():
+    """Проба готовності: 503, поки будь-який компонент не готовий."""
+    result = health()
+    return JSONResponse(status_code=200 if result["ready"] else 503, content=result)
 
 @app.exception_handler(NotAuthenticatedException)
 async def auth_exception_handler(request: Request, exc: NotAuthenticatedException):
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from backend.app.services import profiler
+from backend.app.services.auth import allow_manager_only
+
+router = APIRouter(prefix="/api/admin", tags=["Admin"])
+
+
+@router.post("/profile/{component}")
+def start_profile(
+    component: str,
+    seconds: float = profiler.PROFILE_SECONDS,
+    user = Depends(allow_manager_only)
+):
+    """
+    Вмикає вибірковий профайлер процесу (web, predictor, consumer) на seconds секунд.
+    Результат з'явиться у GET /api/admin/profiles після завершення сеансу.
+    """
+    if component not in profiler.COMPONENTS:
+        raise HTTPException(status_code=404, detail=f"Unknown component: {component}")
+    seconds = min(seconds, profiler.MAX_PROFILE_SECONDS)
+
+    if component == "web":
+        if not profiler.start_profile("web", seconds):
+            raise HTTPException(status_code=409, detail="Profiling already in progress")
+        return {"component": component, "seconds": seconds}
+
+    try:
+        pids = profiler.request_profile(component, seconds)
+    except ProcessLookupError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"component": component, "seconds": seconds, "pids": pids}
+
+
+@router.get("/profiles")
+def list_profiles(user = Depends(allow_manager_only)):
+    """Зняті профілі, найновіші першими."""
+    return profiler.list_profiles()
+
+
+@router.get("/profiles/{name}", response_class=PlainTextResponse)
+def get_profile(name: str, user = Depends(allow_manager_only)):
+    """Профіль у форматі collapsed stacks (flamegraph.pl, speedscope)."""
+    path = profiler.PROFILE_DIR / name
+    if path.suffix != ".folded" or path.parent != profiler.PROFILE_DIR or not path.exists():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return path.read_text()
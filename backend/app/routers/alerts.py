@@ -0,0 +1,119 @@
+import asyncio
+import json
+import os
+import threading
+from typing import Optional
+
+import paho.mqtt.client as mqtt
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+from jose import jwt, JWTError
+from sqlalchemy.orm import Session
+
+from backend.app.database import get_db
+from backend.app.services.alert_engine import ALERT_TOPIC_PREFIX, alert_to_dict
+from backend.app.services.auth import allow_any_staff, SECRET_KEY, ALGORITHM
+from backend.app.services import metrics
+from backend.models import Alert, Device
+
+router = APIRouter(prefix="/api", tags=["Alerts"])
+
+
+class AlertHub:
+    """
+    Окремий WebSocket-канал тривог. Тривоги формує predictor і публікує в
+    MQTT (alerts/<device_uid>); вебсервер підписується на цю тему лише поки
+    є хоча б один клієнт і пересилає події всім підключеним.
+    """
+
+    def __init__(self):
+        self.active_connections: list[WebSocket] = []
+        self.loop = None
+        self.client = None
+        self.lock = threading.Lock()
+
+    async def connect(self, websocket: WebSocket):
+        await websocket.accept()
+        self.active_connections.append(websocket)
+        metrics.WS_CLIENTS.labels("alerts").set(len(self.active_connections))
+        self.loop = asyncio.get_running_loop()
+        self._start_subscriber()
+
+    def disconnect(self, websocket: WebSocket):
+        if websocket in self.active_connections:
+            self.active_connections.remove(websocket)
+            metrics.WS_CLIENTS.labels("alerts").set(len(self.active_connections))
+
+    def _start_subscriber(self):
+        with self.lock:
+            if self.client is not None:
+                return
+            client = mqtt.Client()
+            client.on_connect = lambda c, userdata, flags, rc: c.subscribe(f"{ALERT_TOPIC_PREFIX}/#", qos=1)
+            client.on_message = self._on_message
+            client.connect_async(os.getenv("MQTT_HOST", "localhost"), int(os.getenv("MQTT_PORT", 1883)), 60)
+            client.loop_start()
+            self.client = client
+
+    def _on_message(self, client, userdata, msg):
+        # Потік paho -> цикл подій вебсервера
+        try:
+            data = json.loads(msg.payload.decode())
+        except ValueError:
+            return
+        if self.loop is not None:
+            asyncio.run_coroutine_threadsafe(self.broadcast(data), self.loop)
+
+    async def broadcast(self, message: dict):
+        disconnected = []
+        for connection in self.active_connections:
+            try:
+                with metrics.WS_SEND_SECONDS.labels("alerts").time():
+                    await connection.send_json(message)
+                metrics.WS_MESSAGES.labels("alerts").inc()
+            except Exception:
+                disconnected.append(connection)
+        for connection in disconnected:
+            self.disconnect(connection)
+
+
+hub = AlertHub()
+
+
+@router.get("/alerts")
+def list_alerts(
+    state: Optional[str] = "open",
+    device_uid: Optional[str] = None,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    user = Depends(allow_any_staff)
+):
+    """Тривоги (за замовчуванням відкриті), найновіші першими."""
+    query = db.query(Alert, Device.device_uid).join(Device, Alert.device_id == Device.id)
+    if state:
+        query = query.filter(Alert.state == state)
+    if device_uid:
+        query = query.filter(Device.device_uid == device_uid)
+    rows = query.order_by(Alert.updated_at.desc()).limit(min(limit, 1000)).all()
+    return [alert_to_dict(alert, uid) for alert, uid in rows]
+
+
+@router.websocket("/ws/alerts")
+async def alerts_websocket(websocket: WebSocket):
+    token = websocket.cookies.get("access_token")
+    if not token:
+        await websocket.close(code=1008)
+        return
+    try:
+        jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        await websocket.close(code=1008)
+        return
+
+    await hub.connect(websocket)
+    try:
+        while True:
+            data = await websocket.receive_text()
+            if data == "ping":
+                await websocket.send_json({"type": "pong"})
+    except WebSocketDisconnect:
+        hub.disconnect(websocket)
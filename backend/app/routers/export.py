@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from backend.app.database import get_db
+from backend.app.crud import prediction_join
+from backend.app.database import get_read_db
 from backend.models import SensorReading, Device, Prediction
 from backend.app.services.auth import allow_analyst_access
 import csv
@@ -17,7 +18,8 @@ def export_device_history(
     device_uid: str, 
     start_date: Optional[str] = None, 
     end_date: Optional[str] = None, 
-    db: Session = Depends(get_db),
+    # Важкий експорт аналітика — на репліку, щоб не заважати запису
+    db: Session = Depends(get_read_db),
     user = Depends(allow_analyst_access)
 ):
     device = db.query(Device).filter(Device.device_uid == device_uid).first()
@@ -26,7 +28,7 @@ def export_device_history(
 
     query = (
         db.query(SensorReading, Prediction)
-        .outerjoin(Prediction, SensorReading.id == Prediction.reading_id)
+        .outerjoin(Prediction, prediction_join())
         .filter(SensorReading.device_id == device.id)
     )
 
@@ -0,0 +1,162 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import DateTime, func, literal, tuple_
+from sqlalchemy.orm import Session
+
+from backend.app.database import get_read_db
+from backend.app.services.auth import allow_any_staff
+from backend.app.services.status import STATUS_SEVERITY
+from backend.models import Device, DeviceStatus, FLEET_NULL_RUL, FLEET_NULL_LAST_SEEN
+
+router = APIRouter(prefix="/api", tags=["Fleet"])
+
+# Ключі сортування збігаються з індексами device_status (models.py): вирази без NULL
+# (NULL — найбільше значення) і в одному напрямі, тож курсор сторінки — одне
+# порівняння рядків (ключі) > (курсор), яке PostgreSQL виконує діапазоном по індексу.
+# Останній ключ — device_id, щоб порядок і курсор були однозначними.
+RUL_KEY = func.coalesce(DeviceStatus.predicted_rul, FLEET_NULL_RUL)
+LAST_SEEN_KEY = func.coalesce(DeviceStatus.last_seen, datetime.fromisoformat(FLEET_NULL_LAST_SEEN))
+
+# sort -> (порядок за замовчуванням, напрям ключів для нього, ключі).
+# Порядок за замовчуванням: найменший RUL, найгірший статус (-severity за зростанням),
+# найсвіжіші дані.
+SORTS = {
+    "rul": ("asc", "asc", [RUL_KEY, DeviceStatus.device_id]),
+    "status": ("desc", "asc", [-DeviceStatus.severity, RUL_KEY, DeviceStatus.device_id]),
+    "last_seen": ("desc", "desc", [LAST_SEEN_KEY, DeviceStatus.device_id]),
+}
+
+MAX_PAGE_SIZE = 500
+
+
+def sort_keys(sort: str, order: Optional[str]):
+    """(порядок, напрям ключів, ключі) для сортування і запитаного порядку."""
+    default_order, direction, keys = SORTS[sort]
+    if order and order != default_order:
+        # Зворотний прохід по тому самому індексу
+        return order, "desc" if direction == "asc" else "asc", keys
+    return default_order, direction, keys
+
+
+def after_cursor(direction, keys, values):
+    """Рядки, що йдуть після курсора: порівняння рядків (keyset pagination)."""
+    columns = tuple_(*keys)
+    cursor = tuple_(*(literal(value, key.type) for key, value in zip(keys, values)))
+    return columns > cursor if direction == "asc" else columns < cursor
+
+
+def encode_cursor(values) -> str:
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(keys, cursor: str):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError("cursor does not match sort")
+        decoded = []
+        for key, value in zip(keys, values):
+            if isinstance(key.type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError("cursor value is not a number")
+            decoded.append(value)
+        return decoded
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _split(value: Optional[str]):
+    return [item for item in value.split(",") if item] if value else []
+
+
+def format_device_status(row: DeviceStatus, device_uid: str) -> dict:
+    """Стан пристрою у вигляді, сумісному з live_data (картки дашборду)."""
+    return {
+        "id": row.reading_id,
+        "device_uid": device_uid,
+        "product_type": row.product_type,
+        "air_temp": row.air_temp,
+        "process_temp": row.process_temp,
+        "rotational_speed": row.rotational_speed,
+        "torque": row.torque,
+        "tool_wear": row.tool_wear,
+        "last_seen": row.last_seen.isoformat() if row.last_seen else None,
+        "prediction": {
+            "rul": row.predicted_rul,
+            "failure_pred": row.failure_type,
+            "anomaly_score": row.anomaly_score
+        },
+        "detected_failure": row.reading_failure,
+        "status": row.status
+    }
+
+
+@router.get("/fleet")
+def fleet_overview(
+    sort: str = "status",
+    order: Optional[str] = None,
+    status: Optional[str] = None,
+    product_type: Optional[str] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    user = Depends(allow_any_staff)
+):
+    """
+    Огляд парку обладнання сторінками з таблиці device_status.
+
+    sort: rul | status | last_seen; order: asc | desc (за замовчуванням — найважливіші першими).
+    status, product_type: фільтри, кілька значень через кому.
+    cursor: next_cursor попередньої сторінки. Сторінка — прохід по індексу
+    від курсора, тож її вартість не залежить від розміру парку і номера сторінки.
+    counts — кількість пристроїв за статусами (з урахуванням фільтра product_type).
+    """
+    if sort not in SORTS:
+        raise HTTPException(status_code=400, detail=f"Unknown sort: {sort}")
+    if order not in (None, "asc", "desc"):
+        raise HTTPException(status_code=400, detail=f"Unknown order: {order}")
+    statuses = _split(status)
+    unknown = [s for s in statuses if s not in STATUS_SEVERITY]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown status: {', '.join(unknown)}")
+    product_types = _split(product_type)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    order, direction, keys = sort_keys(sort, order)
+
+    # Значення ключів вибираються разом з рядком — з них складається курсор наступної сторінки
+    query = (
+        db.query(DeviceStatus, Device.device_uid, *keys)
+        .join(Device, DeviceStatus.device_id == Device.id)
+    )
+    if statuses:
+        query = query.filter(DeviceStatus.status.in_(statuses))
+    if product_types:
+        query = query.filter(DeviceStatus.product_type.in_(product_types))
+    if cursor:
+        query = query.filter(after_cursor(direction, keys, decode_cursor(keys, cursor)))
+    # Зайвий рядок показує, чи є наступна сторінка
+    order_by = [key.asc() if direction == "asc" else key.desc() for key in keys]
+    rows = query.order_by(*order_by).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    counts_query = db.query(DeviceStatus.status, func.count()).group_by(DeviceStatus.status)
+    if product_types:
+        counts_query = counts_query.filter(DeviceStatus.product_type.in_(product_types))
+    counts = {s: 0 for s in STATUS_SEVERITY}
+    counts.update(dict(counts_query.all()))
+
+    return {
+        "items": [format_device_status(row[0], row[1]) for row in rows],
+        "counts": counts,
+        "total": sum(counts[s] for s in (statuses or counts)),
+        "sort": sort,
+        "order": order,
+        "next_cursor": encode_cursor(rows[-1][2:]) if has_more else None
+    }
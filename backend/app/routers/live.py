@@ -1,13 +1,20 @@
 import zoneinfo
-from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
-from sqlalchemy.orm import Session
-from backend.app.database import get_db, SessionLocal
-from backend.models import SensorReading, Prediction, Device
+from fastapi import APIRouter, Depends, Request, Response, WebSocket, WebSocketDisconnect
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session, joinedload
+from backend.app.crud import prediction_join
+from backend.app.database import get_db, get_read_db, SessionLocal, ReadSessionLocal
+from backend.models import SensorReading, Prediction, Device, DeviceStatus
 from backend.app.services.failure_detector import detect_failure
 from backend.app.services.status import determine_status
+from backend.app.services import metrics
+from backend.app.services import tracing
+from backend.app.services.recent_history import recent_history, HISTORY_SIZE
 import json
 import asyncio
-from datetime import datetime
+import math
+import time
+from datetime import datetime, timedelta
 from pydantic import BaseModel
 from typing import Optional
 import paho.mqtt.client as mqtt
@@ -36,6 +43,8 @@ def format_reading_response(reading, prediction=None):
     status = determine_status(failure, prediction)
     
     return {
+        # Послідовність для відновлення WebSocket (?since_id=) і відкидання дублікатів
+        "id": reading.id,
         "device_uid": reading.device.device_uid,
         "air_temp": reading.air_temp,
         "process_temp": reading.process_temp,
@@ -46,21 +55,179 @@ def format_reading_response(reading, prediction=None):
         "prediction": {
             # Якщо прогнозу ще немає, вказуємо null
             "rul": prediction.predicted_rul if prediction else None,
-            "failure_pred": prediction.class_failure_type if prediction else None
+            "failure_pred": prediction.class_failure_type if prediction else None,
+            "model_version": prediction.model_version if prediction else None,
+            "anomaly_score": prediction.anomaly_score if prediction else None
         },
         "detected_failure": failure,
-        "status": status
+        "status": status,
+        # Для вимірювання затримки дашборду: мітки часу всіх етапів (tracing.py)
+        "seq": reading.seq,
+        "sent_at": reading.sent_at.timestamp() if reading.sent_at else None,
+        "trace": tracing.reading_trace(reading, prediction)
     }
 
+def encode_frame(data: dict) -> str:
+    # Той самий вигляд, що й у WebSocket.send_json
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+class FrameCache:
+    """
+    Останній кадр live_data кожного пристрою, закодований у JSON один раз на
+    версію (запис + прогноз): detect_failure/determine_status і серіалізація
+    виконуються один раз, а розсилка, початковий знімок і /api/latest віддають
+    готовий текст — вартість повідомлення не залежить від кількості клієнтів.
+    """
+    # Кеш актуальний, поки цикл розсилки оновлював його нещодавно
+    FRESH_SECONDS = 1.0
+
+    def __init__(self):
+        self.frames = {}  # device_uid -> (signature, data, text)
+        self.refreshed_at = 0.0
+
+    @staticmethod
+    def signature(reading, prediction):
+        return (reading.id, prediction.id if prediction else None)
+
+    def frame(self, reading, prediction, broadcast_at: float = None):
+        """
+        (data, text) для запису; форматує і кодує лише нову версію.
+        broadcast_at — мітка розсилки (цикл розсилки): кадр кодується один раз уже з нею.
+        """
+        device_uid = reading.device.device_uid
+        signature = self.signature(reading, prediction)
+        entry = self.frames.get(device_uid)
+        if entry and entry[0] == signature and (broadcast_at is None or "broadcast_at" in entry[1]["trace"]):
+            return entry[1], entry[2]
+        data = format_reading_response(reading, prediction)
+        data["type"] = "live_data"
+        if broadcast_at is not None:
+            data["trace"]["broadcast_at"] = broadcast_at
+        return data, self.put(device_uid, signature, data)
+
+    def put(self, device_uid, signature, data) -> str:
+        text = encode_frame(data)
+        self.frames[device_uid] = (signature, data, text)
+        return text
+
+    @property
+    def fresh(self):
+        return bool(self.frames) and time.time() - self.refreshed_at < self.FRESH_SECONDS
+
+frame_cache = FrameCache()
+
+# Запас курсора по device_status.updated_at: now() у транзакції запису — час її
+# початку, тож рядок, зафіксований після тіку розсилки, може мати старішу мітку
+STATUS_OVERLAP = timedelta(seconds=5)
+
+def changed_device_status(db: Session, since=None):
+    """(device_id, reading_id, prediction_reading_id) пристроїв, змінених після since (None — усіх)."""
+    query = db.query(
+        DeviceStatus.device_id, DeviceStatus.reading_id, DeviceStatus.prediction_reading_id
+    ).filter(DeviceStatus.reading_id.is_not(None))
+    if since is not None:
+        query = query.filter(DeviceStatus.updated_at > since - STATUS_OVERLAP)
+    return query.all()
+
+def readings_with_predictions(db: Session, reading_ids):
+    """Записи за id з робочими прогнозами — один запит для всіх пристроїв."""
+    if not reading_ids:
+        return []
+    # Використовуємо outerjoin (LEFT JOIN), щоб не чекати предиктора
+    return (
+        db.query(SensorReading, Prediction)
+        .outerjoin(Prediction, prediction_join())
+        .options(joinedload(SensorReading.device))
+        .filter(SensorReading.id.in_(reading_ids))
+        .order_by(SensorReading.device_id)
+        .all()
+    )
+
+def fill_history_gaps(db: Session, latest_rows, previous_status, changed_status):
+    """
+    Цикл розсилки бачить лише найновіший запис пристрою на тік. Для завантажених буферів
+    recent_history одним запитом дочитує решту: записи після останнього в буфері і,
+    якщо з'явились нові прогнози, записи після попереднього прогнозу (прогноз оновлюється
+    на місці). Якщо пропущено більше за буфер, він завантажиться з БД заново.
+    """
+    ranges = {}
+    for reading, _ in latest_rows:
+        device_uid = reading.device.device_uid
+        lower = recent_history.streamed_id(device_uid)
+        if lower is None:
+            continue
+        previous_prediction = previous_status.get(reading.device_id, (None, None))[1]
+        prediction_id = changed_status[reading.device_id][1]
+        if prediction_id is not None and prediction_id != previous_prediction:
+            # Нові прогнози — для записів після попереднього прогнозу (до нього — нічого не відомо)
+            lower = min(lower, prediction_id - 1 if previous_prediction is None else previous_prediction)
+        if lower < reading.id:
+            ranges[reading.device_id] = (device_uid, lower, reading.id)
+    if not ranges:
+        return
+    limit = HISTORY_SIZE * len(ranges)
+    rows = (
+        db.query(SensorReading, Prediction)
+        .outerjoin(Prediction, prediction_join())
+        .filter(or_(*(
+            and_(SensorReading.device_id == device_id, SensorReading.id > lower, SensorReading.id < upper)
+            for device_id, (_, lower, upper) in ranges.items()
+        )))
+        .order_by(SensorReading.id)
+        .limit(limit + 1)
+        .all()
+    )
+    if len(rows) > limit:
+        for device_uid, _, _ in ranges.values():
+            recent_history.invalidate(device_uid)
+        return
+    by_device = {}
+    for reading, prediction in rows:
+        by_device.setdefault(reading.device_id, []).append((reading, prediction))
+    for device_id, (device_uid, _, _) in ranges.items():
+        recent_history.append_rows(device_uid, by_device.get(device_id, []))
+
+def latest_frames(db: Session):
+    """
+    Кадри (data, text) останніх записів усіх пристроїв: з кешу, якщо він
+    актуальний, інакше з БД (останній запис кожного пристрою — з device_status).
+    """
+    if frame_cache.fresh:
+        return [(data, text) for _, data, text in frame_cache.frames.values()]
+    reading_ids = [reading_id for _, reading_id, _ in changed_device_status(db)]
+    return [frame_cache.frame(reading, prediction) for reading, prediction in readings_with_predictions(db, reading_ids)]
+
+class ClientWindow:
+    """
+    Вікно клієнта з обмеженням частоти: за інтервал накопичується лише
+    останній кадр кожного пристрою, а в кінці інтервалу всі вони йдуть
+    одним повідомленням live_batch.
+    """
+
+    def __init__(self, max_rate: float):
+        self.interval = 1.0 / max_rate
+        self.pending = {}  # device_uid -> закодований кадр
+        self.next_flush = 0.0
+
+    def batch_frame(self) -> str:
+        # Кадри вже закодовані — складаємо повідомлення без повторного json.dumps
+        return '{"type":"live_batch","frames":[' + ",".join(self.pending.values()) + "]}"
+
 # Вебсокетний менеджер
 class ConnectionManager:
     def __init__(self):
         self.active_connections: list[WebSocket] = []
         self.is_broadcasting = False
+        # Клієнти, що оголосили max_rate (оновлень на секунду)
+        self.windows: dict[WebSocket, ClientWindow] = {}
+        # Клієнти, що стежать лише за частиною пристроїв (сторінка огляду парку)
+        self.subscriptions: dict[WebSocket, set] = {}
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
+    async def connect(self, websocket: WebSocket, max_rate: Optional[float] = None):
+        """Додає вже прийняте з'єднання до розсилки."""
         self.active_connections.append(websocket)
+        self.set_rate(websocket, max_rate)
+        metrics.WS_CLIENTS.labels("live").set(len(self.active_connections))
         
         # Запускаємо цикл розсилки, якщо він ще не працює
         if not self.is_broadcasting:
@@ -68,61 +235,138 @@ class ConnectionManager:
             asyncio.create_task(self.broadcast_loop())
 
     def disconnect(self, websocket: WebSocket):
+        self.windows.pop(websocket, None)
+        self.subscriptions.pop(websocket, None)
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
+            metrics.WS_CLIENTS.labels("live").set(len(self.active_connections))
+
+    def set_rate(self, websocket: WebSocket, max_rate):
+        """
+        max_rate — не більше стільки повідомлень на секунду; None/0 — без обмеження.
+        Значення з команди клієнта: нечислове чи нескінченне ігнорується.
+        """
+        if max_rate is not None:
+            try:
+                max_rate = float(max_rate)
+            except (TypeError, ValueError):
+                return
+            if not math.isfinite(max_rate):
+                return
+        if max_rate and max_rate > 0:
+            self.windows[websocket] = ClientWindow(max_rate)
+        else:
+            self.windows.pop(websocket, None)
+
+    def subscribe(self, websocket: WebSocket, device_uids):
+        """Лише кадри цих пристроїв; None — усі пристрої, не список — команда ігнорується."""
+        if device_uids is None:
+            self.subscriptions.pop(websocket, None)
+        elif isinstance(device_uids, list):
+            self.subscriptions[websocket] = {uid for uid in device_uids if isinstance(uid, str)}
+
+    async def _send(self, connection: WebSocket, frame: str) -> bool:
+        try:
+            with metrics.WS_SEND_SECONDS.labels("live").time():
+                await connection.send_text(frame)
+            metrics.WS_MESSAGES.labels("live").inc()
+            return True
+        except Exception:
+            return False
 
-    async def broadcast(self, message: dict):
+    async def broadcast(self, frame: str, device_uid: str = None):
+        """
+        Розсилає вже закодований кадр (один json.dumps на всіх клієнтів).
+        Клієнтам з обмеженням частоти кадр лише замінює попередній кадр пристрою у вікні.
+        """
         if not self.active_connections: return
             
         disconnected = []
         for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception:
+            subscribed = self.subscriptions.get(connection)
+            if subscribed is not None and device_uid is not None and device_uid not in subscribed:
+                continue
+            window = self.windows.get(connection)
+            if window is not None and device_uid is not None:
+                window.pending[device_uid] = frame
+                continue
+            if not await self._send(connection, frame):
                 disconnected.append(connection)
         
         for connection in disconnected:
             self.disconnect(connection)
+
+    async def flush_windows(self):
+        """Надсилає накопичені вікна, інтервал яких минув (один live_batch на клієнта)."""
+        now = time.time()
+        disconnected = []
+        for connection, window in list(self.windows.items()):
+            if not window.pending or now < window.next_flush:
+                continue
+            frame = window.batch_frame()
+            window.pending.clear()
+            window.next_flush = now + window.interval
+            if not await self._send(connection, frame):
+                disconnected.append(connection)
+        for connection in disconnected:
+            self.disconnect(connection)
     
     async def broadcast_loop(self):
         """
         Оптимізований цикл:
-        1. Опитує ВСІ активні пристрої.
-        2. Використовує LEFT JOIN, щоб не чекати на Predictor.
+        1. Один запит до device_status: пристрої, змінені з попереднього тіку.
+        2. Повні записи (LEFT JOIN з прогнозом, без очікування Predictor) — лише для них.
         3. Спить всього 0.1с для плавності.
         """
         last_sent_ids = {}
+        # device_id -> (reading_id, prediction_reading_id) з device_status, уже оброблені
+        seen_status = {}
+        since = None
 
         while self.is_broadcasting:
             if not self.active_connections:
+                # Без розсилки буфери історії застарівають — наповнюються заново
+                recent_history.clear()
                 await asyncio.sleep(1)
                 continue
 
             db = SessionLocal()
             try:
-                devices = db.query(Device).all()
-                
-                for device in devices:
-                    latest = (
-                        db.query(SensorReading, Prediction)
-                        .outerjoin(Prediction, SensorReading.id == Prediction.reading_id)
-                        .filter(SensorReading.device_id == device.id)
-                        .order_by(SensorReading.timestamp.desc())
-                        .first()
-                    )
-                    
-                    if latest:
-                        reading, prediction = latest
-                        
-                        # Відправляємо тільки якщо це нові дані (або якщо з'явився прогноз для старих)
-                        last_id = last_sent_ids.get(device.device_uid)
-                        current_id_sig = f"{reading.id}_{prediction.id if prediction else 'no'}"
-                        
-                        if last_id != current_id_sig:
-                            data = format_reading_response(reading, prediction)
-                            data["type"] = "live_data"
-                            await self.broadcast(data)
-                            last_sent_ids[device.device_uid] = current_id_sig
+                # Час БД, а не вебсервера: з ним порівнюється updated_at
+                tick = db.query(func.now()).scalar()
+                changed = {}
+                for device_id, reading_id, prediction_reading_id in changed_device_status(db, since):
+                    if seen_status.get(device_id) != (reading_id, prediction_reading_id):
+                        changed[device_id] = (reading_id, prediction_reading_id)
+                pending = []
+
+                latest_rows = readings_with_predictions(db, [reading_id for reading_id, _ in changed.values()])
+                # Записи між тіками — у буфери історії раніше за найновіший (append_frame нижче)
+                fill_history_gaps(db, latest_rows, seen_status, changed)
+                for latest in latest_rows:
+                    reading, prediction = latest
+                    device_uid = reading.device.device_uid
+
+                    # Відправляємо тільки якщо це нові дані (або якщо з'явився прогноз для старих)
+                    last_id = last_sent_ids.get(device_uid)
+                    current_id_sig = FrameCache.signature(reading, prediction)
+
+                    if last_id != current_id_sig:
+                        pending.append(latest)
+                        last_sent_ids[device_uid] = current_id_sig
+                seen_status.update(changed)
+                since = tick
+                frame_cache.refreshed_at = time.time()
+
+                metrics.WS_PENDING.labels("live").set(len(pending))
+                for reading, prediction in pending:
+                    # Кадр кодується один раз разом з міткою розсилки і лишається в кеші
+                    data, frame = frame_cache.frame(reading, prediction, broadcast_at=time.time())
+                    await self.broadcast(frame, data["device_uid"])
+                    tracing.recorder.record(data["device_uid"], data["trace"])
+                    recent_history.append_frame(data)
+                metrics.WS_PENDING.labels("live").set(0)
+                await self.flush_windows()
 
             except Exception as e:
                 print(f"Error in broadcast loop: {e}")
@@ -135,36 +379,96 @@ manager = ConnectionManager()
 
 # API ендпоінти
 @router.get("/latest")
-def get_latest_readings(db: Session = Depends(get_db)):
+def get_latest_readings(db: Session = Depends(get_read_db)):
     """Повертає останні дані для ВСІХ пристроїв миттєво"""
-    devices = db.query(Device).all()
-    results = []
-    
-    for device in devices:
-        # Використовуємо outerjoin (LEFT JOIN), щоб не чекати предиктора
-        latest = (
-            db.query(SensorReading, Prediction)
-            .outerjoin(Prediction, SensorReading.id == Prediction.reading_id)
-            .filter(SensorReading.device_id == device.id)
-            .order_by(SensorReading.timestamp.desc())
-            .first()
-        )
-        
-        if latest:
-            reading, prediction = latest
-            data = format_reading_response(reading, prediction)
-            results.append(data)
+    results = latest_frames(db)
     
     if not results:
         return {"error": "No data available"}
     
-    if len(results) == 1:
-        return results[0]
-        
-    return results[0] 
+    # Готовий JSON-кадр з кешу, без повторної серіалізації
+    return Response(content=results[0][1], media_type="application/json")
+
+@router.get("/latency")
+def get_latency(
+    source: str = "live",
+    limit: int = 1000,
+    db: Session = Depends(get_db),
+    user = Depends(allow_any_staff)
+):
+    """
+    Перцентилі затримки (мс) по етапах шляху показника.
+    source=live — останні розсилки цього вебсервера (усі етапи, включно з broadcast);
+    source=db — останні limit записів із БД (етапи до запису прогнозу включно).
+    """
+    if source == "db":
+        rows = (
+            db.query(SensorReading, Prediction)
+            .outerjoin(Prediction, prediction_join())
+            .order_by(SensorReading.id.desc())
+            .limit(min(limit, 100000))
+            .all()
+        )
+        traces = [tracing.reading_trace(reading, prediction) for reading, prediction in rows]
+    else:
+        traces = tracing.recorder.snapshot()[-limit:]
+    return {"source": source, "samples": len(traces), "stages": tracing.summarize(traces)}
+
+# Максимум пропущених записів, що досилаються при відновленні WebSocket
+RESUME_LIMIT = 500
+
+def resume_messages(db: Session, since_id: int, device_uid: Optional[str] = None):
+    """
+    Записи після since_id (для відновлення з'єднання) у форматі live_data.
+    Якщо пропущено більше RESUME_LIMIT, повертає None — клієнту простіше
+    перезавантажити вікно через API графіків.
+    """
+    query = (
+        db.query(SensorReading, Prediction)
+        .outerjoin(Prediction, prediction_join())
+        .filter(SensorReading.id > since_id)
+    )
+    if device_uid:
+        device = db.query(Device).filter(Device.device_uid == device_uid).first()
+        if not device:
+            return []
+        query = query.filter(SensorReading.device_id == device.id)
+    rows = query.order_by(SensorReading.id.asc()).limit(RESUME_LIMIT + 1).all()
+    if len(rows) > RESUME_LIMIT:
+        return None
+    messages = []
+    for reading, prediction in rows:
+        data = format_reading_response(reading, prediction)
+        data["type"] = "live_data"
+        messages.append(data)
+    return messages
+
+def frame_version(data: dict):
+    """Версія кадру для порівняння: новіший запис або той самий, але вже з прогнозом."""
+    return data["id"], data["prediction"]["rul"] is not None
 
 @router.websocket("/ws/live")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(
+    websocket: WebSocket,
+    since_id: Optional[int] = None,
+    device_uid: Optional[str] = None,
+    max_rate: Optional[float] = None,
+    snapshot: bool = True
+):
+    """
+    max_rate — максимум повідомлень на секунду для цього клієнта: зміни
+    пристроїв за інтервал згортаються до останнього стану кожного й
+    надходять одним повідомленням {"type": "live_batch", "frames": [...]}.
+    Змінити на ходу: {"type": "set_rate", "max_rate": N}.
+
+    {"type": "subscribe", "device_uids": [...]} — лише кадри цих пристроїв
+    (null — усі). Клієнт, що бере початковий стан з /api/fleet, передає
+    ?snapshot=false і не отримує знімок усього парку.
+
+    Живий потік live_data. Клієнт, що перепідключається, передає ?since_id=<id
+    останнього отриманого запису> (і, за потреби, device_uid) — і отримує лише
+    пропущене, або {"type": "resync"}, якщо пропущено забагато.
+    """
     # Перевірка токена
     token = websocket.cookies.get("access_token")
     
@@ -180,30 +484,56 @@ async def websocket_endpoint(websocket: WebSocket):
         # Якщо токен підроблений або прострочений
         await websocket.close(code=1008)
         return
-    await manager.connect(websocket)
+    await websocket.accept()
     try:
-        # При підключенні відразу відправляємо останні наявні дані по ВСІХ девайсах
-        db = SessionLocal()
-        devices = db.query(Device).all()
-        for device in devices:
-             latest = (
-                db.query(SensorReading, Prediction)
-                .outerjoin(Prediction, SensorReading.id == Prediction.reading_id)
-                .filter(SensorReading.device_id == device.id)
-                .order_by(SensorReading.timestamp.desc())
-                .first()
-            )
-             if latest:
-                 reading, prediction = latest
-                 data = format_reading_response(reading, prediction)
-                 data["type"] = "live_data"
-                 await websocket.send_json(data)
-        db.close()
-        
+        # До розсилки клієнт додається лише після відновлення/знімка, щоб живі кадри
+        # не випереджали пропущені. sent — версія останнього надісланого кадру пристрою.
+        sent = {}
+        resync = False
+        # Відновлення читає основну БД (репліка може ще не мати пропущених записів),
+        # початковий знімок — репліку
+        db = SessionLocal() if since_id is not None else ReadSessionLocal()
+        try:
+            if since_id is not None:
+                # Відновлення: лише записи, пропущені під час розриву
+                messages = resume_messages(db, since_id, device_uid)
+                if messages is None:
+                    resync = True
+                    await websocket.send_json({"type": "resync"})
+                for data in messages or []:
+                    await websocket.send_json(data)
+                    sent[data["device_uid"]] = frame_version(data)
+            elif snapshot:
+                # При підключенні відразу відправляємо останні наявні дані по ВСІХ девайсах
+                for data, frame in latest_frames(db):
+                    await websocket.send_text(frame)
+                    sent[data["device_uid"]] = frame_version(data)
+        finally:
+            db.close()
+
+        await manager.connect(websocket, max_rate)
+        if (since_id is not None or snapshot) and not resync and frame_cache.fresh:
+            # Кадри, розіслані, поки надсилалось відновлення (клієнт відкидає дублікати за id)
+            for uid, (_, data, frame) in list(frame_cache.frames.items()):
+                if since_id is not None and device_uid and uid != device_uid:
+                    continue
+                baseline = sent.get(uid, (since_id, True) if since_id is not None else None)
+                if baseline is None or frame_version(data) > baseline:
+                    await websocket.send_text(frame)
+
         while True:
             data = await websocket.receive_text()
             if data == "ping":
                 await websocket.send_json({"type": "pong"})
+                continue
+            try:
+                command = json.loads(data)
+            except ValueError:
+                continue
+            if isinstance(command, dict) and command.get("type") == "set_rate":
+                manager.set_rate(websocket, command.get("max_rate"))
+            elif isinstance(command, dict) and command.get("type") == "subscribe":
+                manager.subscribe(websocket, command.get("device_uids"))
     except WebSocketDisconnect:
         manager.disconnect(websocket)
 
@@ -243,20 +573,86 @@ def control_device(command: ControlCommand, user = Depends(allow_any_staff)):
         print(f"MQTT Error: {e}")
         return {"status": "error", "message": str(e)}
 
+# Точок у живому режимі графіків
+LIVE_CHART_POINTS = 100
+
+CHART_TITLES = {
+    "air_temp": "Температура повітря",
+    "process_temp": "Температура процесу",
+    "rotational_speed": "Швидкість обертання",
+    "torque": "Крутний момент",
+    "tool_wear": "Знос інструменту",
+    "power": "Потужність",
+    "temp_difference": "Різниця температур",
+    "rul": "Прогноз RUL"
+}
+
+def chart_etag(device_uid, newest_id, predicted_id, *params):
+    # Прогноз приходить пізніше запису: без predicted_id ряд RUL лишався б застарілим під 304
+    return f'W/"{device_uid}-{newest_id}-{predicted_id}-' + "-".join(str(p) for p in params) + '"'
+
+def charts_response(device_uid, product_type, last_id, has_more, series):
+    return {
+        "device_uid": device_uid,
+        "product_type": product_type,
+        "last_id": last_id,
+        "has_more": has_more,
+        "charts": {name: {"title": title, "data": series[name]} for name, title in CHART_TITLES.items()}
+    }
+
 @router.get("/device/{device_uid}/charts")
 def get_device_charts(
     device_uid: str, 
+    request: Request,
+    response: Response,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    db: Session = Depends(get_db),
+    since_id: Optional[int] = None,
+    since_ts: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     user = Depends(allow_any_staff)
 ):
+    """
+    Дані графіків пристрою: останні 100 точок, вікно історії (start_date/end_date)
+    або лише нові точки після курсора since_id / since_ts (ключовий курсор по індексу
+    (device_id, id)). Відповідь містить last_id — курсор для наступного запиту.
+    ETag залежить від параметрів, найновішого запису і найновішого прогнозу пристрою:
+    без нових даних — 304.
+    Живий режим віддається з буфера недавньої історії процесу (recent_history.py), без БД.
+    """
+    live_mode = not (start_date and end_date) and since_id is None and not since_ts
+
+    # Поки працює розсилка, буфер пристрою актуальний
+    cached = recent_history.charts(device_uid, LIVE_CHART_POINTS) if live_mode and frame_cache.fresh else None
+    if cached is not None:
+        product_type, history = cached
+        etag = chart_etag(device_uid, history["last_id"], history["last_predicted_id"], start_date, end_date, since_id, since_ts)
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        return charts_response(device_uid, product_type, history["last_id"], False, history["series"])
+
     # 1. Знаходимо пристрій
     device = db.query(Device).filter(Device.device_uid == device_uid).first()
     if not device: return {"error": "Device not found"}
+
+    # Найновіший запис пристрою — один крок по індексу, найновіший прогноз — з device_status;
+    # якщо клієнт їх уже має, нічого не читаємо
+    newest_id = db.query(func.max(SensorReading.id)).filter(SensorReading.device_id == device.id).scalar()
+    predicted_id = (
+        db.query(DeviceStatus.prediction_reading_id).filter(DeviceStatus.device_id == device.id).scalar()
+    )
+    etag = chart_etag(device_uid, newest_id, predicted_id, start_date, end_date, since_id, since_ts)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     
     # 2. Базовий запит
-    query = db.query(SensorReading).filter(SensorReading.device_id == device.id)
+    query = (
+        db.query(SensorReading, Prediction)
+        .outerjoin(Prediction, prediction_join())
+        .filter(SensorReading.device_id == device.id)
+    )
     
     # Визначаємо зони
     kyiv_tz = zoneinfo.ZoneInfo("Europe/Kyiv")
@@ -283,47 +679,60 @@ def get_device_charts(
             limit = 2000
         except ValueError:
             return {"error": "Invalid date format"}
+    elif since_id is not None or since_ts:
+        # --- ІНКРЕМЕНТНИЙ РЕЖИМ (лише нові точки після курсора) ---
+        if since_id is not None:
+            query = query.filter(SensorReading.id > since_id).order_by(SensorReading.id.asc())
+        else:
+            try:
+                since = datetime.fromisoformat(since_ts)
+            except ValueError:
+                return {"error": "Invalid date format"}
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=utc_tz)
+            query = query.filter(SensorReading.timestamp > since).order_by(SensorReading.timestamp.asc())
+        limit = 100
     else:
         # --- LIVE РЕЖИМ (Останні дані) ---
-        query = query.order_by(SensorReading.timestamp.desc()) # Спочатку найновіші
-        limit = 100
+        # id зростає в порядку запису — сортування по індексу (device_id, id)
+        query = query.order_by(SensorReading.id.desc()) # Спочатку найновіші
+        # Одним запитом — і відповідь, і початкове наповнення буфера історії
+        limit = max(LIVE_CHART_POINTS, HISTORY_SIZE)
     
     # 4. Виконуємо запит (ОДИН РАЗ!)
-    readings = query.limit(limit).all()
+    rows = query.limit(limit).all()
     
     # Якщо це був запит останніх даних (Live), перевертаємо їх, щоб графік малювався зліва направо
-    if not (start_date and end_date):
-        readings = list(reversed(readings))
+    if live_mode:
+        rows = list(reversed(rows))
+        if frame_cache.fresh:
+            recent_history.seed(device_uid, device.product_type, rows)
+        rows = rows[-LIVE_CHART_POINTS:]
     
     # 5. Формуємо відповідь
-    charts_data = {
-        "device_uid": device_uid,
-        "product_type": device.product_type,
-        "charts": {
-            "air_temp": {"title": "Температура повітря", "data": []},
-            "process_temp": {"title": "Температура процесу", "data": []},
-            "rotational_speed": {"title": "Швидкість обертання", "data": []},
-            "torque": {"title": "Крутний момент", "data": []},
-            "tool_wear": {"title": "Знос інструменту", "data": []},
-            "power": {"title": "Потужність", "data": []},
-            "temp_difference": {"title": "Різниця температур", "data": []}
-        }
-    }
-    
-    for r in readings:
+    series = {name: [] for name in CHART_TITLES}
+    for r, p in rows:
         ts = r.timestamp.isoformat()
         
-        charts_data["charts"]["air_temp"]["data"].append({"x": ts, "y": r.air_temp})
-        charts_data["charts"]["process_temp"]["data"].append({"x": ts, "y": r.process_temp})
-        charts_data["charts"]["rotational_speed"]["data"].append({"x": ts, "y": r.rotational_speed})
-        charts_data["charts"]["torque"]["data"].append({"x": ts, "y": r.torque})
-        charts_data["charts"]["tool_wear"]["data"].append({"x": ts, "y": r.tool_wear})
+        series["air_temp"].append({"x": ts, "y": r.air_temp})
+        series["process_temp"].append({"x": ts, "y": r.process_temp})
+        series["rotational_speed"].append({"x": ts, "y": r.rotational_speed})
+        series["torque"].append({"x": ts, "y": r.torque})
+        series["tool_wear"].append({"x": ts, "y": r.tool_wear})
         
         power = r.torque * r.rotational_speed * 2 * 3.14159 / 60
-        charts_data["charts"]["power"]["data"].append({"x": ts, "y": power})
-        charts_data["charts"]["temp_difference"]["data"].append({"x": ts, "y": r.process_temp - r.air_temp})
-        
-    return charts_data
+        series["power"].append({"x": ts, "y": power})
+        series["temp_difference"].append({"x": ts, "y": r.process_temp - r.air_temp})
+        series["rul"].append({"x": ts, "y": p.predicted_rul if p else None})
+    
+    return charts_response(
+        device_uid, device.product_type,
+        # Курсор для наступного інкрементного запиту / відновлення WebSocket
+        rows[-1][0].id if rows else since_id,
+        # Якщо нових точок більше за limit, клієнт дочитує наступною сторінкою
+        len(rows) == limit and (since_id is not None or bool(since_ts)),
+        series
+    )
 
 @router.post("/device/control")
 def control_device(command: ControlCommand):
@@ -4,6 +4,7 @@ from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from datetime import datetime
 from backend.app.services.auth import allow_any_staff
+from backend.app.services.status import ANOMALY_THRESHOLD
 import os
 
 router = APIRouter(tags=["Web"])
@@ -22,7 +23,8 @@ async def index(
         {
             "request": request, 
             "message": "Система моніторингу",
-            "user": user
+            "user": user,
+            "anomaly_threshold": ANOMALY_THRESHOLD
         }
     )
 
@@ -0,0 +1,220 @@
+# backend/app/services/alert_engine.py
+"""
+Рушій тривог: статус кожного запису -> переходи станів тривог.
+
+Тривога визначається парою (пристрій, тип): тип відмови від
+failure_detector (TWF, HDF, PWF, OSF, RNF) або RUL — прогноз ресурсу
+нижче RISK_RUL. Зламаний пристрій у simulator_publish повідомляє ту саму
+відмову щотакту, тому на кожен запис лише оновлюється лічильник у
+пам'яті, а в БД і назовні йдуть тільки переходи:
+
+  opened    — умова з'явилась (або повернулась після вирішення пізніше
+              за reopen_cooldown; раніше — той самий рядок відкривається знову);
+  escalated — відмова триває довше escalate_after секунд (emergency -> critical)
+              або RUL впав нижче CRITICAL_RUL (risk -> emergency);
+  resolved  — умови немає resolve_after записів поспіль (гістерезис проти брязкоту).
+
+Сповіщення (MQTT alerts/<device_uid>, звідти — WebSocket /api/ws/alerts)
+обмежені rate_limit на пристрій за хвилину; переходи в БД пишуться завжди.
+"""
+import copy
+import json
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy.orm import Session
+
+from backend.app.services.status import RISK_RUL
+from backend.models import Alert
+
+ALERT_TOPIC_PREFIX = "alerts"
+
+# RUL нижче цього значення — ескалація тривоги RUL
+CRITICAL_RUL = 10
+
+SEVERITY_ORDER = ["risk", "emergency", "critical"]
+
+
+def alert_to_dict(alert: Alert, device_uid: str, event: str = None) -> dict:
+    return {
+        "type": "alert",
+        "event": event,
+        "id": alert.id,
+        "device_uid": device_uid,
+        "alert_type": alert.alert_type,
+        "severity": alert.severity,
+        "state": alert.state,
+        "message": alert.message,
+        "occurrences": alert.occurrences,
+        "opened_at": alert.opened_at.isoformat() if alert.opened_at else None,
+        "resolved_at": alert.resolved_at.isoformat() if alert.resolved_at else None,
+        "last_reading_id": alert.last_reading_id,
+    }
+
+
+class _OpenAlert:
+    """Стан відкритої (або щойно вирішеної) тривоги в пам'яті."""
+
+    def __init__(self, alert_id, severity, opened_at, occurrences=1):
+        self.alert_id = alert_id
+        self.severity = severity
+        self.opened_at = opened_at      # time.time()
+        self.occurrences = occurrences
+        self.clear_streak = 0
+        self.resolved_at = None          # time.time(), якщо вирішена
+
+
+class AlertEngine:
+    def __init__(self, publisher=None, resolve_after: int = 3, escalate_after: float = 300.0,
+                 reopen_cooldown: float = 60.0, rate_limit: int = 10):
+        # publisher(topic, payload_str) — наприклад, mqtt_client.publish
+        self.publisher = publisher
+        self.resolve_after = resolve_after
+        self.escalate_after = escalate_after
+        self.reopen_cooldown = reopen_cooldown
+        self.rate_limit = rate_limit
+        self.alerts = {}            # device_id -> {alert_type: _OpenAlert}
+        self._sent = {}             # device_id -> (початок хвилини, кількість сповіщень)
+        self.suppressed = 0
+
+    def restore(self, db: Session, device_id=None):
+        """
+        Підхоплює відкриті тривоги після перезапуску predictor
+        (або лише одного пристрою — після невдалого запису його переходів).
+        """
+        query = db.query(Alert).filter(Alert.state == "open")
+        if device_id is not None:
+            query = query.filter(Alert.device_id == device_id)
+        loaded = {} if device_id is None else {device_id: {}}
+        for alert in query.all():
+            opened = alert.opened_at.timestamp() if alert.opened_at else time.time()
+            loaded.setdefault(alert.device_id, {})[alert.alert_type] = _OpenAlert(
+                alert.id, alert.severity, opened, alert.occurrences or 1
+            )
+        self.alerts.update(loaded)
+        return sum(len(device_alerts) for device_alerts in self.alerts.values())
+
+    @staticmethod
+    def conditions(failure_status, predicted_rul):
+        """Активні умови запису: {тип: (severity, повідомлення)}."""
+        if failure_status and failure_status != "Normal":
+            return {failure_status: ("emergency", f"Виявлено відмову {failure_status}")}
+        if predicted_rul is not None and predicted_rul < RISK_RUL:
+            severity = "emergency" if predicted_rul < CRITICAL_RUL else "risk"
+            return {"RUL": (severity, f"Прогноз RUL {predicted_rul:.1f} < {RISK_RUL}")}
+        return {}
+
+    def process(self, db: Session, device_id, device_uid, reading_id, failure_status, predicted_rul, now=None):
+        """
+        Обробляє один запис; повертає список подій (dict) для сповіщення.
+        Стан у пам'яті змінюється лише після успішного commit: переходи рахуються
+        на копії стану пристрою, тож після rollback лишається попередній стан
+        і наступний запис повторить перехід. Якщо ж рядка тривоги вже немає
+        в БД (кеш застарів), стан пристрою перечитується з БД.
+        """
+        now = now or time.time()
+        device_alerts = {alert_type: copy.copy(state) for alert_type, state in self.alerts.get(device_id, {}).items()}
+        try:
+            events = self._transitions(db, device_alerts, device_id, reading_id, failure_status, predicted_rul, now)
+            if events:
+                db.commit()
+        except LookupError:
+            db.rollback()
+            self.restore(db, device_id)
+            print(f"[ALERTS] Stale alert state for device {device_id}, reloaded from DB")
+            raise
+        except Exception:
+            db.rollback()
+            raise
+        self.alerts[device_id] = device_alerts
+
+        payloads = [alert_to_dict(alert, device_uid, event) for alert, event in events]
+        for payload in payloads:
+            self.notify(device_id, device_uid, payload, now)
+        return payloads
+
+    def _transitions(self, db: Session, device_alerts, device_id, reading_id, failure_status, predicted_rul, now):
+        """Переходи станів для запису: змінює device_alerts і рядки сесії (без commit)."""
+        active = self.conditions(failure_status, predicted_rul)
+        events = []
+
+        for alert_type, (severity, message) in active.items():
+            state = device_alerts.get(alert_type)
+
+            if state is None or (state.resolved_at and now - state.resolved_at > self.reopen_cooldown):
+                alert = Alert(
+                    device_id=device_id, alert_type=alert_type, severity=severity, state="open",
+                    message=message, occurrences=1, first_reading_id=reading_id, last_reading_id=reading_id,
+                    opened_at=datetime.fromtimestamp(now, timezone.utc),
+                    updated_at=datetime.fromtimestamp(now, timezone.utc)
+                )
+                db.add(alert)
+                db.flush()
+                device_alerts[alert_type] = _OpenAlert(alert.id, severity, now)
+                events.append((alert, "opened"))
+                continue
+
+            state.clear_streak = 0
+            state.occurrences += 1
+
+            if state.resolved_at:
+                # Повернулась одразу після вирішення — це та сама тривога
+                state.resolved_at = None
+                events.append((self._update(db, state, reading_id, now, state="open", resolved_at=None,
+                                            severity=severity, message=message), "opened"))
+                state.severity = severity
+                continue
+
+            escalated = None
+            if alert_type != "RUL" and state.severity == "emergency" and now - state.opened_at > self.escalate_after:
+                escalated = "critical"
+            elif SEVERITY_ORDER.index(severity) > SEVERITY_ORDER.index(state.severity):
+                escalated = severity
+            if escalated:
+                state.severity = escalated
+                events.append((self._update(db, state, reading_id, now, severity=escalated,
+                                            message=message), "escalated"))
+
+        for alert_type, state in list(device_alerts.items()):
+            if alert_type in active:
+                continue
+            if state.resolved_at:
+                # Вирішені тривоги забуваються після cooldown, щоб словник не ріс
+                if now - state.resolved_at > self.reopen_cooldown:
+                    del device_alerts[alert_type]
+                continue
+            state.clear_streak += 1
+            if state.clear_streak >= self.resolve_after:
+                state.resolved_at = now
+                events.append((self._update(db, state, reading_id, now, state="resolved",
+                                            resolved_at=datetime.fromtimestamp(now, timezone.utc)), "resolved"))
+
+        return events
+
+    def _update(self, db: Session, memory: _OpenAlert, reading_id, now, **values):
+        alert = db.get(Alert, memory.alert_id)
+        if alert is None:
+            raise LookupError(f"alert {memory.alert_id} not found")
+        for key, value in values.items():
+            setattr(alert, key, value)
+        alert.occurrences = memory.occurrences
+        alert.last_reading_id = reading_id
+        alert.updated_at = datetime.fromtimestamp(now, timezone.utc)
+        return alert
+
+    def notify(self, device_id, device_uid, payload: dict, now=None):
+        """Публікує подію з обмеженням rate_limit сповіщень на пристрій за хвилину."""
+        if self.publisher is None:
+            return
+        now = now or time.time()
+        window_start, count = self._sent.get(device_id, (now, 0))
+        if now - window_start >= 60:
+            window_start, count = now, 0
+        if count >= self.rate_limit:
+            self.suppressed += 1
+            return
+        self._sent[device_id] = (window_start, count + 1)
+        try:
+            self.publisher(f"{ALERT_TOPIC_PREFIX}/{device_uid}", json.dumps(payload, ensure_ascii=False))
+        except Exception as e:
+            print(f"[ALERTS] Publish error: {e}")
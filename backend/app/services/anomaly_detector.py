@@ -0,0 +1,105 @@
+# backend/app/services/anomaly_detector.py
+"""
+Потокове оцінювання аномальності показників у predictor.
+
+detect_failure ловить лише жорсткі порогові відмови. Тут для кожного
+пристрою і кожного типу продукту (L/M/H) підтримується базова лінія —
+ковзне середнє і коваріація п'яти ознак моделі з експоненційним
+забуванням. Оцінка — відстань Махаланобіса показника від базової лінії
+(в одиницях стандартного відхилення), рахується до оновлення базової
+лінії, тож аномалія не «маскує» сама себе.
+
+Усе в пам'яті, O(1) на запис (матриці 5x5), без звернень до БД.
+Поки базова лінія пристрою «холодна», використовується базова лінія
+його типу продукту.
+"""
+import numpy as np
+
+# Ознаки в порядку model_loader.FEATURE_NAMES
+NUM_FEATURES = 5
+
+
+class RunningGaussian:
+    """
+    Ковзне середнє і коваріація з експоненційним забуванням.
+
+    Перші 1/alpha оновлень — звичайне (рівноважне) усереднення за
+    Велфордом, далі вага нового запису фіксована alpha, тож базова лінія
+    повільно слідує за нормальним дрейфом (знос, прогрів).
+    Обернена матриця кешується і перераховується раз на refresh_every оновлень.
+    """
+
+    def __init__(self, alpha: float = 0.01, min_samples: int = 30, refresh_every: int = 10, ridge: float = 1e-6):
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.refresh_every = refresh_every
+        self.ridge = ridge
+        self.count = 0
+        self.mean = np.zeros(NUM_FEATURES)
+        self.cov = np.zeros((NUM_FEATURES, NUM_FEATURES))
+        self._inverse = None
+        self._since_refresh = 0
+
+    @property
+    def ready(self):
+        return self.count >= self.min_samples
+
+    def update(self, x):
+        self.count += 1
+        weight = max(1.0 / self.count, self.alpha)
+        delta = x - self.mean
+        self.mean = self.mean + weight * delta
+        self.cov = (1.0 - weight) * (self.cov + weight * np.outer(delta, delta))
+        self._since_refresh += 1
+
+    def score(self, x):
+        """Відстань Махаланобіса; None, поки базова лінія не накопичилась."""
+        if not self.ready:
+            return None
+        if self._inverse is None or self._since_refresh >= self.refresh_every:
+            # Невеликий ridge на діагоналі: окремі ознаки можуть майже не змінюватись
+            scale = np.trace(self.cov) / NUM_FEATURES or 1.0
+            self._inverse = np.linalg.pinv(self.cov + self.ridge * scale * np.eye(NUM_FEATURES))
+            self._since_refresh = 0
+        delta = x - self.mean
+        return float(np.sqrt(max(delta @ self._inverse @ delta, 0.0)))
+
+
+class AnomalyScorer:
+    """Базові лінії всіх пристроїв і типів продукту процесу predictor."""
+
+    def __init__(self, alpha: float = 0.01, min_samples: int = 30):
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.devices = {}
+        self.product_types = {}
+
+    def _baseline(self, baselines: dict, key):
+        baseline = baselines.get(key)
+        if baseline is None:
+            baseline = baselines[key] = RunningGaussian(self.alpha, self.min_samples)
+        return baseline
+
+    def score(self, device_id, product_type, features):
+        """
+        Оцінка показника без зміни базових ліній: оцінка пристрою,
+        а поки вона недоступна — оцінка типу продукту.
+        """
+        x = np.asarray(features, dtype=float)
+        score = self._baseline(self.devices, device_id).score(x)
+        if score is None:
+            score = self._baseline(self.product_types, product_type or "L").score(x)
+        return score
+
+    def update(self, device_id, product_type, features):
+        """Додає показник до базових ліній пристрою і типу продукту."""
+        x = np.asarray(features, dtype=float)
+        self._baseline(self.devices, device_id).update(x)
+        self._baseline(self.product_types, product_type or "L").update(x)
+
+    def warm_up(self, device_id, product_type, rows):
+        """Наповнює базові лінії історією (наприклад, з відновлених вікон ознак)."""
+        for features in rows:
+            x = np.asarray(features, dtype=float)
+            self._baseline(self.devices, device_id).update(x)
+            self._baseline(self.product_types, product_type or "L").update(x)
@@ -1,6 +1,12 @@
 import random
 import math
 
+OVERLOAD_LIMITS = {
+    "L": 11000,
+    "M": 12000,
+    "H": 13000
+}
+
 def detect_failure(r):
     rpm_rad = r.rotational_speed * 2 * math.pi / 60
     power = r.torque * rpm_rad
@@ -14,12 +20,7 @@ def detect_failure(r):
     if power < 3500 or power > 9000:
         return "PWF"
     # OSF
-    overload_limit = {
-        "L": 11000,
-        "M": 12000,
-        "H": 13000
-    }
-    if r.torque * r.tool_wear > overload_limit.get(r.device.product_type, 11000):
+    if r.torque * r.tool_wear > OVERLOAD_LIMITS.get(r.device.product_type, 11000):
         return "OSF"
     # RNF
     if random.random() < 0.001:
@@ -28,3 +29,28 @@ def detect_failure(r):
     return None
 
 
+def detect_failure_batch(air_temp, process_temp, rotational_speed, torque, tool_wear, product_types):
+    """
+    Векторна версія detect_failure для масивів показників.
+    Порядок перевірок той самий (TWF, HDF, PWF, OSF); випадкова RNF
+    не перераховується. Повертає масив міток або None для норми.
+    """
+    # numpy потрібен лише пакетним обробникам, вебсервер його не імпортує
+    import numpy as np
+
+    air_temp = np.asarray(air_temp, dtype=float)
+    process_temp = np.asarray(process_temp, dtype=float)
+    rotational_speed = np.asarray(rotational_speed, dtype=float)
+    torque = np.asarray(torque, dtype=float)
+    tool_wear = np.asarray(tool_wear, dtype=float)
+
+    power = torque * rotational_speed * 2 * math.pi / 60
+    overload_limit = np.array([OVERLOAD_LIMITS.get(t, 11000) for t in product_types], dtype=float)
+
+    conditions = [
+        tool_wear >= 220,
+        ((process_temp - air_temp) < 8.6) & (rotational_speed < 1380),
+        (power < 3500) | (power > 9000),
+        torque * tool_wear > overload_limit,
+    ]
+    return np.select(conditions, ["TWF", "HDF", "PWF", "OSF"], default=None)
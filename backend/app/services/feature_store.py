@@ -0,0 +1,214 @@
+# backend/app/services/feature_store.py
+"""
+Потокові вікна ознак по кожному пристрою для predictor.
+
+Для кожного пристрою тримається кільцевий буфер останніх N показників і
+накопичувальні суми, з яких за O(1) на оновлення рахуються ковзні
+середнє, дисперсія, нахил (лінійна регресія по номеру запису) та EWMA
+для кожного сенсора — без запитів до БД на кожен запис.
+
+Після перезапуску вікна відновлюються одним запитом: останні N
+показників кожного пристрою, для яких вже є робочий прогноз (решту
+predictor обробить і додасть сам).
+"""
+import numpy as np
+from sqlalchemy import func, select
+
+from backend.models import SensorReading, Prediction
+
+# Сенсори у вікні: п'ять ознак моделі + різниця температур (для HDF)
+SENSORS = ["air_temp", "process_temp", "rotational_speed", "torque", "tool_wear", "temp_difference"]
+STATS = ["mean", "std", "slope", "ewma"]
+
+# Плоский вектор ознак для віконних моделей: <сенсор>_<статистика>
+WINDOW_FEATURE_NAMES = [f"{sensor}_{stat}" for sensor in SENSORS for stat in STATS]
+
+
+def reading_values(reading):
+    """Значення сенсорів запису в порядку SENSORS."""
+    return [
+        reading.air_temp,
+        reading.process_temp,
+        reading.rotational_speed,
+        reading.torque,
+        reading.tool_wear,
+        reading.process_temp - reading.air_temp,
+    ]
+
+
+class DeviceWindow:
+    """
+    Кільцевий буфер size x len(SENSORS) з накопичувальними сумами.
+
+    Для нахилу кожному запису присвоюється номер k (0, 1, 2, ...), тоді
+    slope = (n*Σky - Σk*Σy) / (n*Σk² - (Σk)²), де Σk для вікна відоме
+    в замкненій формі, знаменник дорівнює n²(n²-1)/12, а Σy і Σky
+    оновлюються інкрементно. Номери k рахуються від base, щоб Σky не
+    росла необмежено. Раз на size оновлень суми перераховуються з буфера
+    (і зсувається base), щоб похибка float не накопичувалась — амортизовано O(1).
+    """
+
+    def __init__(self, size: int = 50, alpha: float = 0.1):
+        self.size = size
+        self.alpha = alpha
+        width = len(SENSORS)
+        self.buffer = np.zeros((size, width))
+        self.count = 0          # всього оновлень (номер наступного запису)
+        self.sum = np.zeros(width)
+        self.sum_sq = np.zeros(width)
+        self.sum_ky = np.zeros(width)
+        self.base = 0
+        self.ewma = None
+
+    @property
+    def n(self):
+        return min(self.count, self.size)
+
+    def update(self, values):
+        y = np.asarray(values, dtype=float)
+        k = self.count
+        slot = k % self.size
+
+        if k >= self.size:
+            # Запис, що випадає з вікна, має номер k - size
+            old = self.buffer[slot]
+            self.sum -= old
+            self.sum_sq -= old * old
+            self.sum_ky -= (k - self.size - self.base) * old
+
+        self.buffer[slot] = y
+        self.sum += y
+        self.sum_sq += y * y
+        self.sum_ky += (k - self.base) * y
+        self.ewma = y.copy() if self.ewma is None else self.ewma + self.alpha * (y - self.ewma)
+        self.count += 1
+
+        if self.count % self.size == 0:
+            self._resync()
+
+    def preview(self, values):
+        """
+        stats() після update(values), але без зміни вікна: суми рахуються з поточних,
+        нового і витісненого показника — O(1), без копії буфера.
+        """
+        y = np.asarray(values, dtype=float)
+        k = self.count
+        sum_ = self.sum + y
+        sum_sq = self.sum_sq + y * y
+        sum_ky = self.sum_ky + (k - self.base) * y
+        if k >= self.size:
+            old = self.buffer[k % self.size]
+            sum_ -= old
+            sum_sq -= old * old
+            sum_ky -= (k - self.size - self.base) * old
+        ewma = y if self.ewma is None else self.ewma + self.alpha * (y - self.ewma)
+        return self._stats(k + 1, sum_, sum_sq, sum_ky, ewma)
+
+    def _resync(self):
+        n = self.n
+        first = self.count - n
+        ks = np.arange(first, self.count)
+        rows = self.buffer[ks % self.size]
+        self.base = first
+        self.sum = rows.sum(axis=0)
+        self.sum_sq = (rows * rows).sum(axis=0)
+        self.sum_ky = ((ks - first)[:, None] * rows).sum(axis=0)
+
+    def rows(self):
+        """Показники вікна від найстарішого до найновішого."""
+        ks = np.arange(self.count - self.n, self.count)
+        return self.buffer[ks % self.size]
+
+    def stats(self):
+        """Масив len(SENSORS) x len(STATS): mean, std, slope (за запис), ewma."""
+        return self._stats(self.count, self.sum, self.sum_sq, self.sum_ky, self.ewma)
+
+    def _stats(self, count, sum_, sum_sq, sum_ky, ewma):
+        n = min(count, self.size)
+        result = np.zeros((len(SENSORS), len(STATS)))
+        if n == 0:
+            return result
+
+        mean = sum_ / n
+        var = np.maximum(sum_sq / n - mean * mean, 0.0)
+
+        # Номери записів у вікні (від base): first .. first + n - 1
+        first = count - n - self.base
+        sum_k = n * (2 * first + n - 1) / 2
+        denominator = n * n * (n * n - 1) / 12
+        slope = (n * sum_ky - sum_k * sum_) / denominator if n > 1 else np.zeros(len(SENSORS))
+
+        result[:, 0] = mean
+        result[:, 1] = np.sqrt(var)
+        result[:, 2] = slope
+        result[:, 3] = ewma
+        return result
+
+
+class FeatureStore:
+    """Вікна всіх пристроїв процесу predictor (device_id -> DeviceWindow)."""
+
+    def __init__(self, window_size: int = 50, alpha: float = 0.1):
+        self.window_size = window_size
+        self.alpha = alpha
+        self.windows = {}
+
+    def window(self, device_id) -> DeviceWindow:
+        window = self.windows.get(device_id)
+        if window is None:
+            window = self.windows[device_id] = DeviceWindow(self.window_size, self.alpha)
+        return window
+
+    def update(self, device_id, values):
+        """Додає показник і повертає плоский вектор WINDOW_FEATURE_NAMES."""
+        window = self.window(device_id)
+        window.update(values)
+        return window.stats().reshape(-1)
+
+    def preview(self, device_id, values):
+        """
+        Вектор ознак з урахуванням показника без зміни вікна пристрою — O(1).
+        Показник додається через commit лише після запису прогнозу: якщо запис
+        не вдасться, той самий показник не потрапить у вікно двічі.
+        """
+        window = self.windows.get(device_id)
+        if window is None:
+            window = DeviceWindow(self.window_size, self.alpha)
+        return window.preview(values).reshape(-1)
+
+    def commit(self, device_id, values):
+        self.window(device_id).update(values)
+
+    def features(self, device_id) -> dict:
+        """Поточні ознаки пристрою у вигляді {<сенсор>_<статистика>: значення}."""
+        window = self.windows.get(device_id)
+        if window is None:
+            return {}
+        return dict(zip(WINDOW_FEATURE_NAMES, window.stats().reshape(-1).tolist()))
+
+    def restore(self, db):
+        """
+        Відновлює вікна з БД: останні window_size показників кожного пристрою
+        з робочим прогнозом, у порядку надходження. Повертає кількість записів.
+        """
+        ranked = (
+            select(
+                SensorReading.id, SensorReading.device_id,
+                SensorReading.air_temp, SensorReading.process_temp,
+                SensorReading.rotational_speed, SensorReading.torque, SensorReading.tool_wear,
+                func.row_number().over(
+                    partition_by=SensorReading.device_id,
+                    order_by=SensorReading.id.desc()
+                ).label("rn")
+            )
+            .join(Prediction, (Prediction.reading_id == SensorReading.id) & Prediction.is_primary.is_(True))
+            .subquery()
+        )
+        rows = db.execute(
+            select(ranked).where(ranked.c.rn <= self.window_size).order_by(ranked.c.id)
+        ).all()
+
+        self.windows = {}
+        for row in rows:
+            self.window(row.device_id).update(reading_values(row))
+        return len(rows)
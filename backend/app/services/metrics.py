@@ -0,0 +1,89 @@
+# backend/app/services/metrics.py
+"""
+Метрики у форматі Prometheus для всіх процесів.
+
+Кожен процес має власний реєстр prometheus_client і власну точку збору:
+  вебсервер       — GET /metrics (той самий порт, що й API);
+  mqtt_consumer   — http://<host>:METRICS_PORT + 10 * номер процесу (9101, 9111, ...);
+  predictor       — http://<host>:METRICS_PORT (за замовчуванням 9102).
+
+Тут лише оголошення метрик; інструментування — у самих модулях.
+Метрики пулу з'єднань database.py підключаються через instrument_engine().
+"""
+import os
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+from sqlalchemy import event
+
+# Дрібні кошики для шляхів, що вимірюються в мілісекундах і менше
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# --- MQTT consumer ----------------------------------------------------------
+
+MESSAGES_RECEIVED = Counter("mqtt_messages_received_total", "MQTT-повідомлення, отримані consumer")
+MESSAGES_PARSED = Counter("mqtt_messages_parsed_total", "Повідомлення, що пройшли розбір і перевірку")
+MESSAGES_REJECTED = Counter("mqtt_messages_rejected_total", "Відхилені повідомлення", ["reason"])
+
+DB_FLUSH_ROWS = Histogram("db_flush_rows", "Кількість записів в одному коміті в БД", ["stage"],
+                          buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000))
+DB_FLUSH_SECONDS = Histogram("db_flush_seconds", "Тривалість коміту в БД", ["stage"], buckets=FAST_BUCKETS)
+
+# Локальний журнал consumer (wal_spool.py)
+SPOOL_BYTES = Gauge("spool_bytes", "Розмір журналу consumer на диску")
+SPOOL_DROPPED_BYTES = Counter("spool_dropped_bytes_total", "Байти журналу, видалені через ліміт розміру")
+SPOOL_DRAIN_ERRORS = Counter("spool_drain_errors_total", "Невдалі спроби перенести пакет журналу в БД")
+SPOOL_DEAD_LETTERS = Counter("spool_dead_letters_total", "Записи журналу, перенесені в dead-letter після помилки даних")
+
+# --- Predictor ---------------------------------------------------------------
+
+PREDICTOR_BACKLOG = Gauge("predictor_backlog_readings", "Записи без прогнозу (оцінка за id)")
+PREDICTIONS = Counter("predictions_total", "Збережені прогнози", ["status"])
+INFERENCE_SECONDS = Histogram("inference_seconds", "Тривалість прогнозу моделі на один запис",
+                              ["model_version"], buckets=FAST_BUCKETS)
+PREDICTOR_LOOP_SECONDS = Histogram("predictor_reading_seconds", "Повна обробка одного запису predictor",
+                                   buckets=FAST_BUCKETS)
+# Етапи: claim, features, rules, inference, write (profiler.PhaseTimer)
+PREDICTOR_PHASE_SECONDS = Histogram("predictor_phase_seconds", "Тривалість етапу обробки запису predictor",
+                                    ["phase"], buckets=FAST_BUCKETS)
+
+# --- WebSocket (вебсервер) ---------------------------------------------------
+
+WS_CLIENTS = Gauge("ws_clients", "Підключені WebSocket-клієнти", ["channel"])
+WS_PENDING = Gauge("ws_broadcast_pending", "Повідомлення, що очікують розсилки в поточному циклі", ["channel"])
+WS_SEND_SECONDS = Histogram("ws_send_seconds", "Тривалість надсилання одного повідомлення клієнту",
+                            ["channel"], buckets=FAST_BUCKETS)
+WS_MESSAGES = Counter("ws_messages_sent_total", "Надіслані WebSocket-повідомлення", ["channel"])
+
+# --- Пул з'єднань БД ---------------------------------------------------------
+
+POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Видачі з'єднань з пулу SQLAlchemy")
+POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "З'єднання, що зараз видані з пулу")
+POOL_SIZE = Gauge("db_pool_size", "Розмір пулу з'єднань")
+
+
+def instrument_engine(engine):
+    """Підписується на події пулу SQLAlchemy (checkout/checkin) для метрик."""
+    pool = engine.pool
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        POOL_CHECKOUTS.inc()
+
+    if hasattr(pool, "checkedout"):
+        POOL_CHECKED_OUT.set_function(pool.checkedout)
+    if hasattr(pool, "size"):
+        POOL_SIZE.set_function(pool.size)
+
+
+def start_metrics_server(default_port: int, offset: int = 0):
+    """
+    HTTP-точка збору для фонових процесів (порт з METRICS_PORT).
+    offset — номер процесу в групі (кілька consumer на одному хості).
+    """
+    port = int(os.getenv("METRICS_PORT", default_port)) + offset
+    try:
+        start_http_server(port)
+        print(f"[METRICS] Serving on :{port}/metrics")
+    except OSError as e:
+        # Зайнятий порт не має зупиняти обробку даних
+        print(f"[METRICS] Could not start metrics server on :{port}: {e}")
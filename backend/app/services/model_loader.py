@@ -1,60 +1,124 @@
 # backend/app/services/model_loader.py
 import os
+import threading
+import time
 from pathlib import Path
 import numpy as np
-import pandas as pd
-import joblib
-from tensorflow.keras.models import load_model
+
+# TensorFlow, pandas і joblib імпортуються лише під час load(): модуль
+# підключають і легкі процеси (реєстр моделей, backfill-планувальник),
+# яким не варто платити секунди за імпорт TensorFlow.
 
 ROOT = Path(__file__).resolve().parents[2]
 MODEL_DIR = ROOT / "model"
 
-MODEL_PATH = MODEL_DIR / "best_rul_model.keras"
-SCALER_PATH = MODEL_DIR / "rul_scaler.pkl"
+MODEL_PATH = Path(os.getenv("MODEL_PATH", MODEL_DIR / "best_rul_model.keras"))
+SCALER_PATH = Path(os.getenv("SCALER_PATH", MODEL_DIR / "rul_scaler.pkl"))
+
+FEATURE_NAMES = [
+    'Air temperature [K]',
+    'Process temperature [K]',
+    'Rotational speed [rpm]',
+    'Torque [Nm]',
+    'Tool wear [min]'
+]
+
+
+class RulModel:
+    """Одна версія RUL-моделі: Keras-модель + scaler, завантажуються ліниво."""
+
+    def __init__(self, model_path, scaler_path=SCALER_PATH, version=None):
+        self.model_path = Path(model_path)
+        self.scaler_path = Path(scaler_path)
+        self.version = version or self.model_path.stem
+        self._model = None
+        self._scaler = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self._model is None:
+                if not self.model_path.exists():
+                    raise FileNotFoundError(f"Model not found at {self.model_path}")
+                print("Loading Keras model from:", self.model_path)
+                from tensorflow.keras.models import load_model
+                self._model = load_model(str(self.model_path))
+                print("Model loaded")
+            if self._scaler is None:
+                if not self.scaler_path.exists():
+                    raise FileNotFoundError(f"Scaler not found at {self.scaler_path}")
+                print("Loading scaler from:", self.scaler_path)
+                import joblib
+                self._scaler = joblib.load(str(self.scaler_path))
+                print("Scaler loaded")
+        return self
+
+    def warm_up(self, batch_sizes=(1, 64)):
+        """
+        Прогрів: перший виклик Keras будує граф і виділяє буфери, що коштує
+        секунди. Проганяємо фіктивні дані заздалегідь, щоб цю ціну не платив
+        перший живий запис. Повертає тривалість прогріву в секундах.
+        """
+        self.load()
+        started = time.perf_counter()
+        dummy = [300.0, 310.0, 1500.0, 40.0, 100.0]
+        self.predict(dummy)
+        for size in batch_sizes:
+            self.predict_batch(np.tile(dummy, (size, 1)))
+        elapsed = time.perf_counter() - started
+        print(f"Model {self.version} warmed up in {elapsed:.2f}s")
+        return elapsed
+
+    def predict(self, feature_list):
+        self.load()
+
+        rotational_speed = feature_list[2]
+        if rotational_speed < 500:
+            return 0.0
+
+        import pandas as pd
+        df_features = pd.DataFrame([feature_list], columns=FEATURE_NAMES)
+
+        arr_scaled = self._scaler.transform(df_features)
+
+        pred = self._model.predict(arr_scaled, verbose=0)
+
+        if hasattr(pred, "flatten"):
+            val = float(pred.flatten()[0])
+        else:
+            val = float(pred[0])
+
+        return max(0.0, val)
+
+    def predict_batch(self, features, batch_size: int = 1024):
+        """
+        Пакетний прогноз RUL для масиву ознак форми (n, 5) у порядку FEATURE_NAMES.
+        Правила ті самі, що в predict: оберти < 500 -> 0.0, від'ємні значення -> 0.0.
+        """
+        self.load()
+
+        features = np.asarray(features, dtype=float).reshape(-1, len(FEATURE_NAMES))
+        if len(features) == 0:
+            return np.zeros(0)
+
+        import pandas as pd
+        df_features = pd.DataFrame(features, columns=FEATURE_NAMES)
+        arr_scaled = self._scaler.transform(df_features)
+
+        pred = np.asarray(self._model.predict(arr_scaled, batch_size=batch_size, verbose=0), dtype=float).reshape(-1)
+        pred = np.maximum(0.0, pred)
+        pred[features[:, 2] < 500] = 0.0
+        return pred
+
 
-_model = None
-_scaler = None
+# Модель за замовчуванням (MODEL_PATH/SCALER_PATH) для простих викликів
+_default = RulModel(MODEL_PATH, SCALER_PATH)
 
 def _load():
-    global _model, _scaler
-    if _model is None:
-        if not MODEL_PATH.exists():
-            raise FileNotFoundError(f"Model not found at {MODEL_PATH}")
-        print("Loading Keras model from:", MODEL_PATH)
-        _model = load_model(str(MODEL_PATH))
-        print("Model loaded")
-    if _scaler is None:
-        if not SCALER_PATH.exists():
-            raise FileNotFoundError(f"Scaler not found at {SCALER_PATH}")
-        print("Loading scaler from:", SCALER_PATH)
-        _scaler = joblib.load(str(SCALER_PATH))
-        print("Scaler loaded")
+    _default.load()
 
 def predict_rul(feature_list):
+    return _default.predict(feature_list)
 
-    _load()
-    
-    rotational_speed = feature_list[2]
-    if rotational_speed < 500:
-        return 0.0
-
-    feature_names = [
-        'Air temperature [K]', 
-        'Process temperature [K]', 
-        'Rotational speed [rpm]', 
-        'Torque [Nm]', 
-        'Tool wear [min]'
-    ]
-    
-    df_features = pd.DataFrame([feature_list], columns=feature_names)
-    
-    arr_scaled = _scaler.transform(df_features)
-    
-    pred = _model.predict(arr_scaled)
-    
-    if hasattr(pred, "flatten"):
-        val = float(pred.flatten()[0])
-    else:
-        val = float(pred[0])
-        
-    return max(0.0, val)
\ No newline at end of file
+def predict_rul_batch(features, batch_size: int = 1024):
+    return _default.predict_batch(features, batch_size)
@@ -0,0 +1,258 @@
+# backend/app/services/model_registry.py
+"""
+Реєстр версій RUL-моделей.
+
+Маніфест backend/model/registry.json описує артефакти (шлях до .keras,
+scaler, sha256, опис) і які версії зараз робоча ("serving") та тіньова
+("shadow"). Процеси слідкують за маніфестом: нова версія завантажується
+у фоні, перевіряється контрольна сума, і лише після цього посилання на
+модель атомарно підміняється — без перезапуску та простою.
+
+CLI:
+    python -m backend.app.services.model_registry list
+    python -m backend.app.services.model_registry register v2 backend/model/final_rul_model.keras --description "..."
+    python -m backend.app.services.model_registry promote v2
+    python -m backend.app.services.model_registry shadow v2     # або: shadow none
+    python -m backend.app.services.model_registry verify
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+from backend.app.services.model_loader import MODEL_DIR, MODEL_PATH, SCALER_PATH, RulModel
+
+REGISTRY_PATH = Path(os.getenv("MODEL_REGISTRY", MODEL_DIR / "registry.json"))
+DEFAULT_VERSION = os.getenv("MODEL_VERSION", "best_rul_model")
+# keras | float32 | float16 | int8 (див. quantized_model.py); поле "precision"
+# версії в маніфесті має пріоритет
+MODEL_PRECISION = os.getenv("MODEL_PRECISION", "keras")
+
+
+def sha256_file(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def resolve_artifact(path) -> Path:
+    # Шляхи в маніфесті — відносно backend/model
+    path = Path(path)
+    return path if path.is_absolute() else MODEL_DIR / path
+
+
+def read_manifest(path=REGISTRY_PATH) -> dict:
+    """Маніфест реєстру; якщо файла немає — одна версія з MODEL_PATH/SCALER_PATH."""
+    if not Path(path).exists():
+        return {
+            "serving": DEFAULT_VERSION,
+            "shadow": None,
+            "models": {
+                DEFAULT_VERSION: {"path": str(MODEL_PATH), "scaler": str(SCALER_PATH), "sha256": None}
+            }
+        }
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest(manifest: dict, path=REGISTRY_PATH):
+    # Запис через тимчасовий файл, щоб читачі ніколи не бачили напівзаписаний JSON
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_version(version: str, manifest: dict = None) -> RulModel:
+    """
+    Завантажує і прогріває версію з маніфесту, перевіряючи контрольні суми
+    артефактів. Підміна в ModelRegistry відбувається лише після прогріву.
+    """
+    manifest = manifest or read_manifest()
+    entry = manifest["models"].get(version)
+    if entry is None:
+        raise KeyError(f"Model version '{version}' is not registered")
+
+    model_path = resolve_artifact(entry["path"])
+    scaler_path = resolve_artifact(entry.get("scaler") or SCALER_PATH)
+    for artifact, expected in ((model_path, entry.get("sha256")), (scaler_path, entry.get("scaler_sha256"))):
+        if expected and sha256_file(artifact) != expected:
+            raise ValueError(f"Checksum mismatch for {artifact} (version '{version}')")
+
+    precision = entry.get("precision") or MODEL_PRECISION
+    if precision == "keras":
+        model = RulModel(model_path, scaler_path, version=version).load()
+    else:
+        from backend.app.services.quantized_model import load_precision
+        model = load_precision(model_path, scaler_path, precision, version=version,
+                               expected_sha256=entry.get("sha256"))
+    model.warm_up()
+    return model
+
+
+class ModelRegistry:
+    """
+    Тримає робочу та тіньову моделі процесу і підміняє їх при зміні маніфесту.
+
+    serving/shadow читаються без блокувань: присвоєння атрибута атомарне,
+    тож кожен прогноз бачить або стару, або нову модель повністю.
+    """
+
+    def __init__(self, path=REGISTRY_PATH, poll_interval: float = 5.0, on_change=None):
+        self.path = Path(path)
+        self.poll_interval = poll_interval
+        # Викликається після кожної підміни моделей (наприклад, для /health)
+        self.on_change = on_change
+        self.serving: RulModel = None
+        self.shadow: RulModel = None
+        self._mtime = None
+        self._refresh_lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def _manifest_mtime(self):
+        try:
+            return self.path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+    def refresh(self, force: bool = False) -> bool:
+        """Перечитує маніфест і (пере)завантажує версії, що змінилися."""
+        with self._refresh_lock:
+            mtime = self._manifest_mtime()
+            if not force and self.serving is not None and mtime == self._mtime:
+                return False
+
+            manifest = read_manifest(self.path)
+            changed = False
+
+            serving_version = manifest["serving"]
+            if self.serving is None or self.serving.version != serving_version:
+                new_model = load_version(serving_version, manifest)
+                self.serving = new_model
+                print(f"[REGISTRY] Serving model: {serving_version}")
+                changed = True
+
+            shadow_version = manifest.get("shadow")
+            if shadow_version == serving_version:
+                # Тіньова версія, що збігається з робочою, нічого не порівнює
+                # (і дублювала б прогнози тієї ж версії) — вважаємо, що тіньової немає
+                shadow_version = None
+            if not shadow_version:
+                if self.shadow is not None:
+                    print(f"[REGISTRY] Shadow model disabled ({self.shadow.version})")
+                    self.shadow = None
+                    changed = True
+            elif self.shadow is None or self.shadow.version != shadow_version:
+                self.shadow = load_version(shadow_version, manifest)
+                print(f"[REGISTRY] Shadow model: {shadow_version}")
+                changed = True
+
+            self._mtime = mtime
+            if changed and self.on_change:
+                self.on_change(self)
+            return changed
+
+    def start_watcher(self):
+        """Фоновий потік: стежить за маніфестом і підміняє моделі."""
+        def watch():
+            while not self._stop_event.wait(self.poll_interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    # Зламаний артефакт не має зупиняти роботу — лишаємо стару модель
+                    print(f"[REGISTRY] Reload failed, keeping current models: {e}")
+
+        thread = threading.Thread(target=watch, daemon=True, name="model-registry-watcher")
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop_event.set()
+
+
+# --- CLI --------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Реєстр версій RUL-моделей")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="Показати зареєстровані версії")
+    sub.add_parser("verify", help="Перевірити контрольні суми всіх артефактів")
+
+    register = sub.add_parser("register", help="Зареєструвати нову версію")
+    register.add_argument("version")
+    register.add_argument("model_path")
+    register.add_argument("--scaler", default=str(SCALER_PATH))
+    register.add_argument("--description", default="")
+
+    promote = sub.add_parser("promote", help="Зробити версію робочою")
+    promote.add_argument("version")
+
+    shadow = sub.add_parser("shadow", help="Тіньове оцінювання версією ('none' — вимкнути)")
+    shadow.add_argument("version")
+
+    args = parser.parse_args()
+    manifest = read_manifest()
+
+    if args.command == "list":
+        for version, entry in manifest["models"].items():
+            marks = []
+            if version == manifest["serving"]:
+                marks.append("serving")
+            if version == manifest.get("shadow"):
+                marks.append("shadow")
+            print(f"{version:<24} {entry['path']:<32} {(entry.get('sha256') or '-')[:12]:<12} "
+                  f"{entry.get('registered_at', '-'):<27} {','.join(marks)}  {entry.get('description', '')}")
+        return
+
+    if args.command == "verify":
+        ok = True
+        for version in manifest["models"]:
+            try:
+                entry = manifest["models"][version]
+                for artifact, expected in ((entry["path"], entry.get("sha256")), (entry.get("scaler"), entry.get("scaler_sha256"))):
+                    if artifact and expected and sha256_file(resolve_artifact(artifact)) != expected:
+                        raise ValueError(f"checksum mismatch for {artifact}")
+                print(f"{version}: OK")
+            except Exception as e:
+                ok = False
+                print(f"{version}: FAILED ({e})")
+        raise SystemExit(0 if ok else 1)
+
+    if args.command == "register":
+        model_path = Path(args.model_path).resolve()
+        scaler_path = Path(args.scaler).resolve()
+        relative = lambda p: str(p.relative_to(MODEL_DIR)) if p.is_relative_to(MODEL_DIR) else str(p)
+        manifest["models"][args.version] = {
+            "path": relative(model_path),
+            "scaler": relative(scaler_path),
+            "sha256": sha256_file(model_path),
+            "scaler_sha256": sha256_file(scaler_path),
+            "registered_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "description": args.description,
+        }
+    elif args.command in ("promote", "shadow"):
+        version = None if args.version.lower() == "none" else args.version
+        if args.command == "promote" and version is None:
+            raise SystemExit("A serving version is required ('none' is only valid for shadow)")
+        if version and version not in manifest["models"]:
+            raise SystemExit(f"Version '{version}' is not registered")
+        if args.command == "promote":
+            manifest["serving"] = version
+            # Звичайний цикл: shadow v2 -> promote v2; тіньове оцінювання завершено
+            if manifest.get("shadow") == version:
+                manifest["shadow"] = None
+        else:
+            manifest["shadow"] = version
+
+    write_manifest(manifest)
+    print(f"Registry updated: serving={manifest['serving']}, shadow={manifest.get('shadow')}")
+
+
+if __name__ == "__main__":
+    main()
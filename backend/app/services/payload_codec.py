@@ -0,0 +1,79 @@
+# backend/app/services/payload_codec.py
+"""
+Компактний двійковий формат MQTT-повідомлень показників.
+
+Формат визначається темою:
+  sensors/<device_uid>            — JSON (як і раніше);
+  sensors/<device_uid>/bin        — двійковий запис фіксованої довжини.
+
+Перший байт двійкового запису — ідентифікатор схеми, тож формат можна
+змінювати, не ламаючи старих відправників: consumer декодує кожну
+відому схему. device_uid у запис не входить — він уже є в темі.
+
+Схема 1 (little-endian, 38 байт проти ~400 байт JSON):
+  B  schema_id        d  sent_at (epoch секунди)
+  c  product_type     Q  seq (SEQ_NONE, якщо немає)
+  5f air_temp, process_temp, rotational_speed, torque, tool_wear
+
+Модуль використовує лише стандартну бібліотеку — його імпортує і
+симулятор, і consumer.
+"""
+import struct
+
+BINARY_SUFFIX = "bin"
+
+SCHEMA_V1 = 1
+_V1 = struct.Struct("<Bc5fdQ")
+SEQ_NONE = 0xFFFFFFFFFFFFFFFF
+
+# Поля показників і точність, з якою їх округлює симулятор:
+# float32 після декодування повертається до тих самих значень, що і в JSON
+FIELDS = ("air_temp", "process_temp", "rotational_speed", "torque", "tool_wear")
+DECIMALS = (2, 2, 0, 2, 1)
+
+
+class PayloadError(ValueError):
+    """Повідомлення неможливо декодувати (невідома схема, неправильна довжина)."""
+
+
+def is_binary_topic(topic: str) -> bool:
+    return topic.endswith("/" + BINARY_SUFFIX)
+
+
+def device_uid_from_topic(topic: str) -> str:
+    # sensors/<device_uid>/bin -> <device_uid>
+    return topic.split("/")[-2]
+
+
+def binary_topic(topic_prefix: str, device_uid: str) -> str:
+    return f"{topic_prefix}/{device_uid}/{BINARY_SUFFIX}"
+
+
+def encode(data: dict) -> bytes:
+    seq = data.get("seq")
+    return _V1.pack(
+        SCHEMA_V1,
+        data["product_type"].encode()[:1],
+        *(data[field] for field in FIELDS),
+        data.get("sent_at") or 0.0,
+        SEQ_NONE if seq is None else seq,
+    )
+
+
+def decode(payload: bytes, device_uid: str) -> dict:
+    """Двійковий запис -> dict у тому ж вигляді, що і JSON-повідомлення."""
+    if not payload:
+        raise PayloadError("empty payload")
+    schema_id = payload[0]
+    if schema_id != SCHEMA_V1:
+        raise PayloadError(f"unknown schema id {schema_id}")
+    if len(payload) != _V1.size:
+        raise PayloadError(f"schema {schema_id}: expected {_V1.size} bytes, got {len(payload)}")
+
+    _, product_type, *values, sent_at, seq = _V1.unpack(payload)
+    data = {"device_uid": device_uid, "product_type": product_type.decode()}
+    for field, decimals, value in zip(FIELDS, DECIMALS, values):
+        data[field] = round(value, decimals)
+    data["sent_at"] = sent_at or None
+    data["seq"] = None if seq == SEQ_NONE else seq
+    return data
@@ -2,18 +2,172 @@
 import sys
 import os
 import time
+import queue
+import threading
 from sqlalchemy.orm import Session
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from backend.app.database import SessionLocal
 from backend.app.crud import get_next_unpredicted_reading, insert_prediction_for_reading
-from backend.app.services.model_loader import predict_rul
+from backend.app.services.model_registry import ModelRegistry
+from backend.app.services import readiness
+from backend.app.services import metrics
+from backend.app.services import profiler
+from backend.app.services.feature_store import FeatureStore, reading_values
+from backend.app.services.anomaly_detector import AnomalyScorer
+from backend.app.services.alert_engine import AlertEngine
 from backend.app.services.failure_detector import detect_failure 
-from backend.models import SensorReading
+from backend.models import SensorReading, Device
+from sqlalchemy import func
+
+# Розмір ковзного вікна ознак на пристрій (кількість останніх показників)
+FEATURE_WINDOW = int(os.getenv("FEATURE_WINDOW", 50))
+
+MQTT_HOST = os.getenv("MQTT_HOST", "mosquitto")
+MQTT_PORT = int(os.getenv("MQTT_PORT", 1883))
+
+
+class ShadowScorer(threading.Thread):
+    """
+    Тіньове оцінювання: кандидатна модель рахує ті самі живі записи
+    у фоновому потоці і пише прогнози з is_primary = False.
+
+    Черга обмежена — якщо тіньова модель не встигає, записи пропускаються,
+    а робочий цикл ніколи не чекає на неї.
+    """
+
+    def __init__(self, registry: ModelRegistry, max_queue: int = 1000, report_every: int = 500):
+        super().__init__(daemon=True, name="shadow-scorer")
+        self.registry = registry
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.report_every = report_every
+        self.dropped = 0
+        self.scored = 0
+        self.abs_diff_sum = 0.0
+
+    def submit(self, reading_id, features, failure_status, primary_rul):
+        if self.registry.shadow is None:
+            return
+        try:
+            self.queue.put_nowait((reading_id, features, failure_status, primary_rul))
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            reading_id, features, failure_status, primary_rul = self.queue.get()
+            model = self.registry.shadow
+            if model is None:
+                continue
+
+            db: Session = SessionLocal()
+            try:
+                # Правила відмов однакові для обох моделей — порівнюємо лише RUL
+                shadow_rul = 0.0 if failure_status != "Normal" else max(0.0, model.predict(features))
+                insert_prediction_for_reading(
+                    db,
+                    reading_id=reading_id,
+                    predicted_rul=shadow_rul,
+                    class_failure_type=failure_status,
+                    model_version=model.version,
+                    is_primary=False
+                )
+                self.scored += 1
+                self.abs_diff_sum += abs(shadow_rul - primary_rul)
+                if self.scored % self.report_every == 0:
+                    print(f"[SHADOW] {model.version}: {self.scored} scored, "
+                          f"MAE vs serving {self.abs_diff_sum / self.scored:.2f}, dropped {self.dropped}")
+            except Exception as e:
+                db.rollback()
+                print(f"[SHADOW] Prediction error for ID {reading_id}: {e}")
+            finally:
+                db.close()
+
+
+def report_ready(registry: ModelRegistry):
+    readiness.set_status(
+        "predictor", True,
+        serving=registry.serving.version,
+        shadow=registry.shadow.version if registry.shadow else None
+    )
+
+
+class BacklogMonitor(threading.Thread):
+    """
+    Оцінка черги predictor для метрик: max(id) показників мінус id
+    останнього обробленого запису. Один дешевий запит раз на interval секунд.
+    """
+
+    def __init__(self, interval: float = 5.0):
+        super().__init__(daemon=True, name="backlog-monitor")
+        self.interval = interval
+        self.last_processed_id = None
+
+    def run(self):
+        while True:
+            db: Session = SessionLocal()
+            try:
+                max_id = db.query(func.max(SensorReading.id)).scalar() or 0
+                if self.last_processed_id is not None:
+                    metrics.PREDICTOR_BACKLOG.set(max(0, max_id - self.last_processed_id))
+            except Exception as e:
+                print(f"[METRICS] Backlog query failed: {e}")
+            finally:
+                db.close()
+            time.sleep(self.interval)
+
+
+def alert_publisher():
+    """publish(topic, payload) для тривог через MQTT; підключення у фоні з автоперепідключенням."""
+    import paho.mqtt.client as mqtt
+
+    client = mqtt.Client()
+    client.connect_async(MQTT_HOST, MQTT_PORT, 60)
+    client.loop_start()
+    return lambda topic, payload: client.publish(topic, payload, qos=1)
+
+
+def warm_up_database(feature_store: FeatureStore, anomaly_scorer: AnomalyScorer, alert_engine: AlertEngine):
+    # Перше з'єднання пулу відкривається до появи живих даних,
+    # заодно відновлюються вікна ознак і базові лінії аномалій
+    db: Session = SessionLocal()
+    try:
+        get_next_unpredicted_reading(db)
+        restored = feature_store.restore(db)
+        product_types = dict(db.query(Device.id, Device.product_type).all())
+        for device_id, window in feature_store.windows.items():
+            # Базова лінія — на п'яти ознаках моделі (без різниці температур)
+            anomaly_scorer.warm_up(device_id, product_types.get(device_id), window.rows()[:, :5])
+        print(f"[PREDICTOR] Feature windows restored: {len(feature_store.windows)} devices, {restored} readings")
+        print(f"[PREDICTOR] Open alerts restored: {alert_engine.restore(db)}")
+    finally:
+        db.close()
+
 
 def process_loop(poll_interval: float = 0.1):
-    print("[PREDICTOR] Service started. Waiting for data...")
+    readiness.set_status("predictor", False, detail="warming up")
+    started = time.perf_counter()
+
+    # Робоча і тіньова моделі з реєстру; load_version прогріває кожну модель,
+    # тож перший живий запис не чекає на побудову графа TensorFlow.
+    # Зміна маніфесту підхоплюється без перезапуску.
+    registry = ModelRegistry(on_change=report_ready)
+    registry.refresh()
+    feature_store = FeatureStore(window_size=FEATURE_WINDOW)
+    anomaly_scorer = AnomalyScorer()
+    alert_engine = AlertEngine(publisher=alert_publisher())
+    warm_up_database(feature_store, anomaly_scorer, alert_engine)
+    registry.start_watcher()
+    shadow_scorer = ShadowScorer(registry)
+    shadow_scorer.start()
+
+    backlog_monitor = BacklogMonitor()
+    backlog_monitor.start()
+    metrics.start_metrics_server(9102)
+
+    report_ready(registry)
+    print(f"[PREDICTOR] Service ready in {time.perf_counter() - started:.1f}s. Waiting for data...")
     
     while True:
         db: Session = SessionLocal()
@@ -21,10 +175,13 @@ def process_loop(poll_interval: float = 0.1):
         
         try:
             # 1. Беремо наступний запис без прогнозу
+            phases = profiler.PhaseTimer(metrics.PREDICTOR_PHASE_SECONDS)
+            reading_started = phases.last
             row = get_next_unpredicted_reading(db)
 
             if row:
                 processed_something = True
+                phases.mark("claim")
                 
                 # Підготовка даних для моделі
                 features = [
@@ -35,6 +192,16 @@ def process_loop(poll_interval: float = 0.1):
                     getattr(row, "tool_wear")
                 ]
                 
+                # Одна модель на весь запис, навіть якщо реєстр підмінить її посередині
+                model = registry.serving
+
+                # Ковзні ознаки пристрою (середнє, std, нахил, EWMA) — O(1), без запитів до БД.
+                # Вікно і базова лінія аномалій змінюються лише після запису прогнозу:
+                # якщо запис не вдасться, цей показник буде оброблено ще раз
+                values = reading_values(row)
+                window_features = feature_store.preview(row.device_id, values)
+                phases.mark("features")
+
                 try:
                     # 2. Створюємо обгортку для детектора
                     class ReadingWrapper:
@@ -49,8 +216,14 @@ def process_loop(poll_interval: float = 0.1):
                             if r.device and r.device.product_type:
                                 self.device.product_type = r.device.product_type
 
-                    # 3. Визначаємо ФАКТИЧНИЙ статус (чи є поломка прямо зараз?)
-                    detected_status = detect_failure(ReadingWrapper(row))
+                    wrapped = ReadingWrapper(row)
+
+                    # 3. Оцінка аномальності відносно базової лінії пристрою/типу — O(1), у пам'яті
+                    anomaly_score = anomaly_scorer.score(row.device_id, wrapped.device.product_type, features)
+
+                    # Визначаємо ФАКТИЧНИЙ статус (чи є поломка прямо зараз?)
+                    detected_status = detect_failure(wrapped)
+                    phases.mark("rules")
                     
                     # 4. Логіка запису
                     if detected_status and detected_status != "Normal":
@@ -59,20 +232,50 @@ def process_loop(poll_interval: float = 0.1):
                         final_status = detected_status # Наприклад: "PWF", "TWF"
                     else:
                         # Якщо все добре, питаємо AI модель:
-                        raw_rul = predict_rul(features)
+                        inference_started = time.perf_counter()
+                        if getattr(model, "uses_window", False):
+                            # Віконні моделі отримують і миттєві, і ковзні ознаки
+                            raw_rul = model.predict(features, window=window_features)
+                        else:
+                            raw_rul = model.predict(features)
+                        metrics.INFERENCE_SECONDS.labels(model.version).observe(time.perf_counter() - inference_started)
                         final_rul = max(0.0, raw_rul)
                         final_status = "Normal"
+                        phases.mark("inference")
 
                     # 5. ЗАПИС У БАЗУ ДАНИХ
-                    insert_prediction_for_reading(
-                        db, 
-                        reading_id=row.id, 
-                        predicted_rul=final_rul, 
-                        class_failure_type=final_status
-                    )
+                    with metrics.DB_FLUSH_SECONDS.labels("predictor").time():
+                        insert_prediction_for_reading(
+                            db, 
+                            reading_id=row.id, 
+                            predicted_rul=final_rul, 
+                            class_failure_type=final_status,
+                            model_version=model.version,
+                            anomaly_score=anomaly_score,
+                            device_id=row.device_id
+                        )
+                    feature_store.commit(row.device_id, values)
+                    anomaly_scorer.update(row.device_id, wrapped.device.product_type, features)
+                    metrics.DB_FLUSH_ROWS.labels("predictor").observe(1)
+                    metrics.PREDICTIONS.labels(final_status).inc()
+                    backlog_monitor.last_processed_id = row.id
+                    shadow_scorer.submit(row.id, features, final_status, final_rul)
+
+                    # 6. Тривоги: лише переходи станів (відкрита/ескалація/вирішена)
+                    try:
+                        for event in alert_engine.process(db, row.device_id, row.device.device_uid, row.id,
+                                                          final_status, final_rul):
+                            print(f"[ALERT] {event['event']} {event['device_uid']} {event['alert_type']} "
+                                  f"({event['severity']})")
+                    except Exception as e:
+                        db.rollback()
+                        print(f"Alert engine error for ID {row.id}: {e}")
                     
                     if final_status != "Normal":
                          print(f"[PREDICTOR] FAILURE {final_status} SAVED! ID={row.id}")
+
+                    phases.mark("write")
+                    metrics.PREDICTOR_LOOP_SECONDS.observe(time.perf_counter() - reading_started)
                     
                 except Exception as e:
                     print(f"Prediction error for ID {row.id}: {e}")
@@ -88,4 +291,5 @@ def process_loop(poll_interval: float = 0.1):
             time.sleep(poll_interval)
 
 if __name__ == "__main__":
+    profiler.install_signal_handler("predictor")
     process_loop()
\ No newline at end of file
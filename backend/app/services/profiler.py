@@ -0,0 +1,179 @@
+# backend/app/services/profiler.py
+"""
+Профілювання довготривалих процесів без перезапуску.
+
+Вибірковий профайлер: окремий потік кожні interval секунд читає стеки всіх
+потоків процесу (sys._current_frames) і рахує однакові стеки. Результат —
+формат «collapsed stacks» (рядок «кадр;кадр;кадр кількість»), який
+напряму приймають flamegraph.pl, speedscope та inferno.
+
+Вмикається на duration секунд:
+  сигналом SIGUSR1 процесу predictor/consumer (тривалість — з файла запиту
+  <PROFILE_DIR>/<процес>.request або PROFILE_SECONDS);
+  адмін-ендпоінтом POST /api/admin/profile/{component}, який пише файл
+  запиту і надсилає сигнал кожному процесу компонента (pid — з файлів
+  готовності, readiness.py; у групи consumer — consumer-0, consumer-1, ...).
+
+Поза сеансом профілювання накладних витрат немає. Результати —
+<PROFILE_DIR>/<component>-<час>.folded.
+"""
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from backend.app.services import readiness
+
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", readiness.READINESS_DIR / "profiles"))
+PROFILE_SECONDS = float(os.getenv("PROFILE_SECONDS", 30))
+# Максимальна тривалість одного сеансу
+MAX_PROFILE_SECONDS = 600
+
+COMPONENTS = ["web"] + readiness.COMPONENTS
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Один сеанс вибіркового профілювання в окремому потоці."""
+
+    def __init__(self, component: str, interval: float = 0.005):
+        self.component = component
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+
+    def sample(self, own_thread_id):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread_id:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, str(thread_id)))
+            self.counts[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def run(self, duration: float) -> Path:
+        own_thread_id = threading.get_ident()
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            self.sample(own_thread_id)
+            time.sleep(self.interval)
+        return self.write()
+
+    def write(self) -> Path:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        path = PROFILE_DIR / f"{self.component}-{time.strftime('%Y%m%d-%H%M%S')}.folded"
+        with open(path, "w") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+_active = threading.Lock()
+
+
+def start_profile(component: str, duration: float = PROFILE_SECONDS, interval: float = 0.005) -> bool:
+    """Запускає сеанс у фоновому потоці; False, якщо сеанс уже йде."""
+    if not _active.acquire(blocking=False):
+        return False
+    duration = max(0.1, min(float(duration), MAX_PROFILE_SECONDS))
+
+    def worker():
+        try:
+            print(f"[PROFILE] {component}: sampling for {duration:.0f}s")
+            profiler = SamplingProfiler(component, interval)
+            path = profiler.run(duration)
+            print(f"[PROFILE] {component}: {profiler.samples} samples -> {path}")
+        except Exception as e:
+            print(f"[PROFILE] {component}: profiling failed: {e}")
+        finally:
+            _active.release()
+
+    threading.Thread(target=worker, daemon=True, name="sampling-profiler").start()
+    return True
+
+
+def _request_path(component: str) -> Path:
+    return PROFILE_DIR / f"{component}.request"
+
+
+def install_signal_handler(component: str):
+    """
+    SIGUSR1 -> сеанс профілювання процесу (викликати з головного потоку).
+    component — ім'я процесу у файлах готовності (predictor, consumer-0, ...).
+    """
+    if not hasattr(signal, "SIGUSR1"):
+        return
+
+    def handler(signum, frame):
+        duration = PROFILE_SECONDS
+        try:
+            duration = float(_request_path(component).read_text())
+            _request_path(component).unlink()
+        except (OSError, ValueError):
+            pass
+        start_profile(component, duration)
+
+    signal.signal(signal.SIGUSR1, handler)
+
+
+def request_profile(component: str, duration: float):
+    """
+    Просить процеси компонента (predictor, усі процеси consumer) профілюватись
+    duration секунд. Повертає {процес: pid}.
+    """
+    pids = {}
+    details = []
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    for name, status in readiness.worker_statuses(component).items():
+        pid = status.get("pid")
+        if pid is None:
+            details.append(f"{name}: {status.get('detail', 'not running')}")
+            continue
+        _request_path(name).write_text(str(duration))
+        os.kill(pid, signal.SIGUSR1)
+        pids[name] = pid
+    if not pids:
+        raise ProcessLookupError("; ".join(details) or f"{component}: not running")
+    return pids
+
+
+def list_profiles():
+    if not PROFILE_DIR.exists():
+        return []
+    files = sorted(PROFILE_DIR.glob("*.folded"), key=lambda p: p.stat().st_mtime, reverse=True)
+    return [{"name": p.name, "size": p.stat().st_size, "modified": p.stat().st_mtime} for p in files]
+
+
+class PhaseTimer:
+    """
+    Тривалість етапів одного проходу циклу: mark(phase) закриває етап,
+    що почався з попередньої позначки. Лише perf_counter і observe
+    гістограми — достатньо дешево, щоб не вимикати у продакшені.
+    """
+
+    # Кеш дочірніх гістограм (labels() бере блокування на кожен виклик)
+    _children = {}
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.last = time.perf_counter()
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        key = (self.histogram, phase)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self.histogram.labels(phase)
+        child.observe(now - self.last)
+        self.last = now
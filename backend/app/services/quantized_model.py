@@ -0,0 +1,377 @@
+# backend/app/services/quantized_model.py
+"""
+Експорт RUL-моделі у компактний NumPy-формат зі зниженою точністю.
+
+Мережа невелика (Dense + BatchNormalization), тож повний Keras на CPU
+витрачає більшість часу на накладні витрати виклику, а не на обчислення.
+Експорт згортає BatchNormalization у сусідні Dense-шари і зберігає ваги
+в .npz; інференс — кілька матричних множень NumPy без TensorFlow.
+
+Точності:
+  float32 — ваги як в оригіналі;
+  float16 — ваги зберігаються у float16 (вдвічі менший артефакт),
+            обчислення у float32: NumPy не має fp16-ядер для CPU;
+  int8    — ваги int8 з масштабом на вихідний канал, входи кожного шару
+            квантуються int8 з масштабом, каліброваним на rul_test_data.csv.
+            Добуток int8 x int8 накопичується у float32 точно (сума < 2^24),
+            тож результат збігається з цілочисельним інференсом.
+
+Вибір у predictor: MODEL_PRECISION=keras|float32|float16|int8
+(або поле "precision" версії в registry.json).
+
+CLI:
+    python -m backend.app.services.quantized_model export --precision int8
+    python -m backend.app.services.quantized_model evaluate
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+
+from backend.app.services.model_loader import MODEL_DIR, MODEL_PATH, SCALER_PATH, FEATURE_NAMES, RulModel
+
+PRECISIONS = ["float32", "float16", "int8"]
+CALIBRATION_PATH = MODEL_DIR / "rul_test_data.csv"
+TARGET_COLUMN = "RUL_synthetic"
+INT8_MAX = 127
+
+
+def artifact_path(model_path, precision: str) -> Path:
+    """best_rul_model.keras -> best_rul_model.int8.npz"""
+    model_path = Path(model_path)
+    return model_path.with_name(f"{model_path.stem}.{precision}.npz")
+
+
+def load_calibration(path=CALIBRATION_PATH, limit: int = None):
+    """Ознаки і цільовий RUL тестового набору (як у model_test.py)."""
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    if limit:
+        df = df.head(limit)
+    return df[FEATURE_NAMES].to_numpy(dtype=np.float32), df[TARGET_COLUMN].to_numpy(dtype=np.float32)
+
+
+# --- Згортання Keras-моделі -------------------------------------------------
+
+def fold_keras_model(model):
+    """
+    Перетворює Keras-модель на список шарів (W, b, activation) у float32.
+
+    BatchNormalization в режимі інференсу — це афінне перетворення
+    a * x + c, тому воно вбудовується у ваги наступного Dense-шару.
+    Dropout в інференсі нічого не робить і пропускається.
+    """
+    layers = []
+    pending_a, pending_c = None, None
+
+    for layer in model.layers:
+        kind = layer.__class__.__name__
+        if kind in ("InputLayer", "Dropout"):
+            continue
+
+        if kind == "BatchNormalization":
+            gamma, beta, mean, var = layer.get_weights()
+            a = gamma / np.sqrt(var + layer.epsilon)
+            c = beta - mean * a
+            if pending_a is None:
+                pending_a, pending_c = a, c
+            else:
+                pending_a, pending_c = pending_a * a, pending_c * a + c
+            continue
+
+        if kind != "Dense":
+            raise ValueError(f"Unsupported layer for export: {kind}")
+
+        activation = layer.get_config()["activation"]
+        if activation not in ("relu", "linear"):
+            raise ValueError(f"Unsupported activation for export: {activation}")
+
+        W, b = layer.get_weights()
+        if pending_a is not None:
+            b = b + pending_c @ W
+            W = pending_a[:, None] * W
+            pending_a, pending_c = None, None
+        layers.append((W.astype(np.float32), b.astype(np.float32), activation))
+
+    if pending_a is not None:
+        raise ValueError("BatchNormalization after the last Dense layer is not supported")
+    return layers
+
+
+def _forward_float(x, layers):
+    for W, b, activation in layers:
+        x = x @ W + b
+        if activation == "relu":
+            x = np.maximum(x, 0.0)
+    return x
+
+
+def quantize(layers, precision: str, calibration_inputs=None) -> dict:
+    """
+    Готує масиви для .npz. calibration_inputs — вже стандартизовані ознаки,
+    потрібні лише для int8 (масштаби входів кожного шару).
+    """
+    arrays = {"precision": np.array(precision), "num_layers": np.array(len(layers))}
+    activations = []
+
+    if precision == "int8":
+        if calibration_inputs is None:
+            raise ValueError("int8 export needs calibration data")
+        x = calibration_inputs.astype(np.float32)
+
+    for i, (W, b, activation) in enumerate(layers):
+        activations.append(activation)
+        arrays[f"b{i}"] = b
+
+        if precision == "float32":
+            arrays[f"W{i}"] = W
+        elif precision == "float16":
+            arrays[f"W{i}"] = W.astype(np.float16)
+        elif precision == "int8":
+            # Симетричне квантування ваг з окремим масштабом на вихідний канал
+            w_scale = np.maximum(np.abs(W).max(axis=0), 1e-12) / INT8_MAX
+            arrays[f"W{i}"] = np.clip(np.round(W / w_scale), -INT8_MAX, INT8_MAX).astype(np.int8)
+            arrays[f"w_scale{i}"] = w_scale.astype(np.float32)
+            # Масштаб входу шару — за максимумом модуля на калібрувальних даних
+            arrays[f"x_scale{i}"] = np.float32(max(float(np.abs(x).max()), 1e-12) / INT8_MAX)
+            x = _forward_float(x, [(W, b, activation)])
+        else:
+            raise ValueError(f"Unknown precision: {precision}")
+
+    arrays["activations"] = np.array(activations)
+    return arrays
+
+
+def export_model(model_path=MODEL_PATH, scaler_path=SCALER_PATH, precision="int8",
+                 out_path=None, calibration_path=CALIBRATION_PATH, save=True):
+    """Експортує Keras-модель; повертає масиви (і записує .npz, якщо save)."""
+    import joblib
+    from tensorflow.keras.models import load_model
+    from backend.app.services.model_registry import sha256_file
+
+    model = load_model(str(model_path))
+    scaler = joblib.load(str(scaler_path))
+    layers = fold_keras_model(model)
+
+    calibration = None
+    if precision == "int8":
+        features, _ = load_calibration(calibration_path)
+        calibration = (features - scaler.mean_) / scaler.scale_
+
+    arrays = quantize(layers, precision, calibration)
+    arrays["scaler_mean"] = scaler.mean_.astype(np.float32)
+    arrays["scaler_scale"] = scaler.scale_.astype(np.float32)
+    # Зв'язок з оригіналом: застарілий експорт не завантажиться для нової моделі
+    arrays["source_sha256"] = np.array(sha256_file(model_path))
+
+    if save:
+        out_path = Path(out_path or artifact_path(model_path, precision))
+        np.savez(out_path, **arrays)
+        print(f"Exported {precision} model -> {out_path} ({out_path.stat().st_size / 1024:.1f} KB)")
+    return arrays
+
+
+# --- Інференс ---------------------------------------------------------------
+
+class NumpyRulModel:
+    """
+    Інференс експортованої моделі лише на NumPy.
+    Інтерфейс той самий, що в RulModel (load/warm_up/predict/predict_batch).
+    """
+
+    def __init__(self, path=None, version=None, arrays: dict = None):
+        self.path = Path(path) if path else None
+        self._arrays = arrays
+        self.version = version or (self.path.stem if self.path else "numpy")
+        self.precision = None
+        self._layers = None
+
+    def load(self):
+        if self._layers is not None:
+            return self
+        arrays = self._arrays
+        if arrays is None:
+            with np.load(self.path) as data:
+                arrays = {key: data[key] for key in data.files}
+
+        self.precision = str(arrays["precision"])
+        self.source_sha256 = str(arrays["source_sha256"])
+        self._mean = arrays["scaler_mean"].astype(np.float32)
+        self._scale = arrays["scaler_scale"].astype(np.float32)
+
+        layers = []
+        for i, activation in enumerate(arrays["activations"].tolist()):
+            # Ваги зберігаються у float16/int8, але множаться у float32 (BLAS)
+            W = arrays[f"W{i}"].astype(np.float32)
+            b = arrays[f"b{i}"].astype(np.float32)
+            if self.precision == "int8":
+                layers.append((W, b, activation, float(arrays[f"x_scale{i}"]), arrays[f"w_scale{i}"].astype(np.float32)))
+            else:
+                layers.append((W, b, activation, None, None))
+        self._layers = layers
+        self._arrays = None
+        return self
+
+    def warm_up(self, batch_sizes=(1, 64)):
+        self.load()
+        started = time.perf_counter()
+        dummy = [300.0, 310.0, 1500.0, 40.0, 100.0]
+        for size in batch_sizes:
+            self.predict_batch(np.tile(dummy, (size, 1)))
+        elapsed = time.perf_counter() - started
+        print(f"Model {self.version} ({self.precision}) warmed up in {elapsed * 1000:.1f}ms")
+        return elapsed
+
+    def _forward(self, features):
+        x = (features - self._mean) / self._scale
+        for W, b, activation, x_scale, w_scale in self._layers:
+            if x_scale is None:
+                x = x @ W + b
+            else:
+                # Цілі значення int8 у float32: добуток і сума точні
+                x_q = np.clip(np.round(x / x_scale), -INT8_MAX, INT8_MAX)
+                x = (x_q @ W) * (x_scale * w_scale) + b
+            if activation == "relu":
+                np.maximum(x, 0.0, out=x)
+        return x.reshape(-1)
+
+    def predict(self, feature_list):
+        self.load()
+        if feature_list[2] < 500:
+            return 0.0
+        value = float(self._forward(np.asarray([feature_list], dtype=np.float32))[0])
+        return max(0.0, value)
+
+    def predict_batch(self, features, batch_size: int = 1024):
+        self.load()
+        features = np.asarray(features, dtype=np.float32).reshape(-1, len(FEATURE_NAMES))
+        if len(features) == 0:
+            return np.zeros(0)
+        pred = np.maximum(0.0, self._forward(features)).astype(float)
+        pred[features[:, 2] < 500] = 0.0
+        return pred
+
+
+def load_precision(model_path, scaler_path, precision: str, version=None, expected_sha256=None):
+    """
+    Модель потрібної точності: готовий .npz поруч з .keras, якщо він
+    зроблений з того самого файлу, інакше експорт у пам'яті.
+    """
+    if precision == "keras":
+        return RulModel(model_path, scaler_path, version=version).load()
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision: {precision}")
+
+    path = artifact_path(model_path, precision)
+    if path.exists():
+        model = NumpyRulModel(path, version=version).load()
+        if expected_sha256 is None or model.source_sha256 == expected_sha256:
+            return model
+        print(f"Stale export {path} (source checksum differs), re-exporting in memory")
+
+    arrays = export_model(model_path, scaler_path, precision, save=False)
+    return NumpyRulModel(version=version, arrays=arrays).load()
+
+
+# --- Оцінка -----------------------------------------------------------------
+
+def _single_row_latency(model, rows, repeats: int = 200):
+    timings = []
+    for i in range(repeats):
+        row = rows[i % len(rows)].tolist()
+        started = time.perf_counter()
+        model.predict(row)
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings))
+
+
+def _batch_throughput(model, features, repeats: int = 5):
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        model.predict_batch(features)
+        best = min(best, time.perf_counter() - started)
+    return len(features) / best
+
+
+def evaluate(model_path=MODEL_PATH, scaler_path=SCALER_PATH, precisions=PRECISIONS, data_path=CALIBRATION_PATH):
+    """
+    MAE/MSE/R² (як у model_test.py) та швидкість кожної точності
+    відносно float32-моделі Keras.
+    """
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+    features, y_true = load_calibration(data_path)
+    # Метрики — на «сирому» виході мережі, як у model_test.py (без правила rpm < 500)
+    scored = features[:, 2] >= 500
+
+    results = []
+    baseline = None
+    for precision in ["keras"] + list(precisions):
+        model = load_precision(model_path, scaler_path, precision, version=precision)
+        model.warm_up()
+        y_pred = model.predict_batch(features)
+
+        result = {
+            "precision": precision,
+            "mae": float(mean_absolute_error(y_true[scored], y_pred[scored])),
+            "mse": float(mean_squared_error(y_true[scored], y_pred[scored])),
+            "r2": float(r2_score(y_true[scored], y_pred[scored])),
+            "single_row_ms": _single_row_latency(model, features, repeats=50 if precision == "keras" else 500) * 1000,
+            "batch_rows_per_s": _batch_throughput(model, features),
+        }
+        if baseline is None:
+            baseline = result
+        result["mae_delta"] = result["mae"] - baseline["mae"]
+        result["r2_delta"] = result["r2"] - baseline["r2"]
+        result["single_row_speedup"] = baseline["single_row_ms"] / result["single_row_ms"]
+        result["batch_speedup"] = result["batch_rows_per_s"] / baseline["batch_rows_per_s"]
+        result["max_abs_diff"] = float(np.abs(y_pred - baseline_pred).max()) if precision != "keras" else 0.0
+        if precision == "keras":
+            baseline_pred = y_pred
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Експорт і оцінка RUL-моделі зі зниженою точністю")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="Експортувати .keras у .npz")
+    export.add_argument("--model-path", default=str(MODEL_PATH))
+    export.add_argument("--scaler-path", default=str(SCALER_PATH))
+    export.add_argument("--precision", choices=PRECISIONS + ["all"], default="all")
+    export.add_argument("--calibration", default=str(CALIBRATION_PATH), help="CSV для калібрування int8")
+
+    evaluate_parser = sub.add_parser("evaluate", help="Точність і швидкість проти float32 Keras")
+    evaluate_parser.add_argument("--model-path", default=str(MODEL_PATH))
+    evaluate_parser.add_argument("--scaler-path", default=str(SCALER_PATH))
+    evaluate_parser.add_argument("--data", default=str(CALIBRATION_PATH))
+    evaluate_parser.add_argument("--json", type=str, default=None, help="Зберегти результати у JSON")
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        precisions = PRECISIONS if args.precision == "all" else [args.precision]
+        for precision in precisions:
+            export_model(args.model_path, args.scaler_path, precision, calibration_path=args.calibration)
+        return
+
+    results = evaluate(args.model_path, args.scaler_path, data_path=args.data)
+    print(f"\n{'precision':<10} {'MAE':>8} {'ΔMAE':>8} {'R²':>8} {'ΔR²':>8} {'row ms':>8} {'speedup':>8} "
+          f"{'rows/s':>10} {'speedup':>8}")
+    for r in results:
+        print(f"{r['precision']:<10} {r['mae']:8.3f} {r['mae_delta']:+8.3f} {r['r2']:8.4f} {r['r2_delta']:+8.4f} "
+              f"{r['single_row_ms']:8.3f} {r['single_row_speedup']:7.1f}x {r['batch_rows_per_s']:10.0f} "
+              f"{r['batch_speedup']:7.1f}x")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved -> {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# backend/app/services/readiness.py
+"""
+Готовність фонових процесів (predictor, MQTT consumer) для /health.
+
+Усі сервіси запускаються з одного entrypoint.sh у спільному контейнері,
+тому кожен процес після прогріву записує невеликий JSON-файл стану в
+READINESS_DIR, а вебсервер лише читає ці файли. Файл вважається дійсним,
+поки живий процес із записаним pid — застарілі файли після перезапуску
+не дають хибної готовності.
+
+Компонент із кількох процесів (група consumer) пише файл на кожен процес:
+<компонент>-<номер>.json. read_status збирає їх: компонент готовий, лише
+коли готові всі процеси.
+"""
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+READINESS_DIR = Path(os.getenv("READINESS_DIR", Path(tempfile.gettempdir()) / "pdm-readiness"))
+
+# Компоненти, без яких система не обробляє живі дані
+COMPONENTS = ["predictor", "consumer"]
+
+
+def _status_path(component: str) -> Path:
+    return READINESS_DIR / f"{component}.json"
+
+
+def _group_paths(component: str):
+    return sorted(READINESS_DIR.glob(f"{component}-*.json"))
+
+
+def set_status(component: str, ready: bool, **info):
+    """Записує стан компонента поточного процесу (атомарно)."""
+    READINESS_DIR.mkdir(parents=True, exist_ok=True)
+    status = {"ready": ready, "pid": os.getpid(), "updated_at": time.time(), **info}
+    path = _status_path(component)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(status, f)
+    os.replace(tmp_path, path)
+
+
+def _pid_alive(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except (ProcessLookupError, TypeError):
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read_file(path: Path) -> dict:
+    try:
+        with open(path) as f:
+            status = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"ready": False, "detail": "not started"}
+
+    if not _pid_alive(status.get("pid")):
+        return {"ready": False, "detail": "process exited"}
+    return status
+
+
+def worker_statuses(component: str) -> dict:
+    """Стани процесів компонента: {<компонент>-<номер>: стан} або {<компонент>: стан}."""
+    paths = _group_paths(component)
+    if not paths:
+        return {component: _read_file(_status_path(component))}
+    return {path.stem: _read_file(path) for path in paths}
+
+
+def read_status(component: str) -> dict:
+    """Стан компонента; ready=False, якщо файла немає або процес завершився."""
+    if not _group_paths(component):
+        return _read_file(_status_path(component))
+    workers = worker_statuses(component)
+    return {"ready": all(status["ready"] for status in workers.values()), "workers": workers}
+
+
+def clear_status(component: str):
+    """Прибирає файли попереднього запуску (наприклад, процесів, яких більше немає в групі)."""
+    for path in [_status_path(component), *_group_paths(component)]:
+        path.unlink(missing_ok=True)
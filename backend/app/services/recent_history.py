@@ -0,0 +1,214 @@
+# backend/app/services/recent_history.py
+"""
+Недавня історія пристроїв у пам'яті вебпроцесу для живого режиму графіків.
+
+На кожен пристрій — кільцевий буфер останніх HISTORY_SIZE записів у
+стовпцях numpy фіксованого типу (id, час, п'ять показників float32,
+прогноз RUL і аномальність float32). Пам'ять пристрою не залежить від
+навантаження: HISTORY_SIZE * 44 байти (~4.4 КБ на 100 записів).
+
+Буфери наповнює цикл розсилки live (кадри live_data), тож вони бачать ті
+самі записи, що й дашборд; записи між тіками розсилки і прогнози, що прийшли
+для старіших записів, цикл дочитує в завантажені буфери (append_rows). Буфер
+вважається повним, коли в нього один раз завантажено останні записи з БД
+(seed) — після цього графіки живого режиму віддаються без БД. Поки розсилка простоює (немає клієнтів WebSocket),
+буфери не оновлюються, тому очищаються і наповнюються заново.
+"""
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from backend.app.services.payload_codec import FIELDS, DECIMALS
+
+HISTORY_SIZE = int(os.getenv("HISTORY_SIZE", 100))
+
+# Та сама формула потужності, що й у get_device_charts
+POWER_FACTOR = 2 * 3.14159 / 60
+
+
+class DeviceHistory:
+    """Кільцевий буфер одного пристрою; head — позиція наступного запису."""
+
+    def __init__(self, size: int = HISTORY_SIZE, product_type: str = None):
+        self.size = size
+        self.product_type = product_type
+        self.ids = np.zeros(size, dtype=np.int64)
+        self.timestamps = np.zeros(size, dtype=np.float64)  # epoch секунди
+        self.values = np.zeros((size, len(FIELDS)), dtype=np.float32)
+        self.rul = np.full(size, np.nan, dtype=np.float32)
+        self.anomaly = np.full(size, np.nan, dtype=np.float32)
+        self.head = 0
+        self.count = 0
+        # Часовий пояс міток, як їх повертає БД (None — без поясу)
+        self.tz = None
+        self.seeded = False
+        # Найновіший запис із прогнозом (для ETag графіків: прогноз приходить пізніше запису)
+        self.last_predicted_id = None
+
+    @property
+    def last_id(self):
+        return int(self.ids[(self.head - 1) % self.size]) if self.count else None
+
+    def _order(self):
+        """Індекси буфера від найстарішого запису до найновішого."""
+        return np.arange(self.head - self.count, self.head) % self.size
+
+    def append(self, reading_id: int, timestamp, values, rul=None, anomaly=None):
+        if rul is not None:
+            self.last_predicted_id = max(self.last_predicted_id or 0, int(reading_id))
+        last_id = self.last_id
+        if last_id is not None and reading_id <= last_id:
+            # Уже відомий запис: з'явився прогноз (новіший кадр того самого запису)
+            match = np.flatnonzero(self.ids == reading_id)
+            if match.size:
+                self.rul[match[0]] = np.nan if rul is None else rul
+                self.anomaly[match[0]] = np.nan if anomaly is None else anomaly
+            return
+        if not isinstance(timestamp, (int, float)):
+            if isinstance(timestamp, str):
+                timestamp = datetime.fromisoformat(timestamp)
+            self.tz = timestamp.tzinfo
+            timestamp = timestamp.timestamp()
+        i = self.head
+        self.ids[i] = reading_id
+        self.timestamps[i] = timestamp
+        self.values[i] = values
+        self.rul[i] = np.nan if rul is None else rul
+        self.anomaly[i] = np.nan if anomaly is None else anomaly
+        self.head = (self.head + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def charts(self, limit: int = None) -> dict:
+        """
+        Ряди графіків живого режиму (як get_device_charts): показники, потужність,
+        різниця температур і прогноз RUL — векторно по всьому буферу.
+        """
+        order = self._order()
+        if limit is not None:
+            order = order[-limit:]
+        # float32 -> float64 з точністю відправника (як після декодування payload_codec)
+        values = self.values[order].astype(np.float64)
+        for column, decimals in enumerate(DECIMALS):
+            values[:, column] = np.round(values[:, column], decimals)
+        air_temp, process_temp, rotational_speed, torque, tool_wear = values.T
+
+        series = {
+            "air_temp": air_temp,
+            "process_temp": process_temp,
+            "rotational_speed": rotational_speed,
+            "torque": torque,
+            "tool_wear": tool_wear,
+            "power": torque * rotational_speed * POWER_FACTOR,
+            "temp_difference": process_temp - air_temp,
+        }
+        x = [datetime.fromtimestamp(ts, self.tz).isoformat() for ts in self.timestamps[order].tolist()]
+        result = {name: [{"x": ts, "y": y} for ts, y in zip(x, column.tolist())] for name, column in series.items()}
+        rul = self.rul[order].astype(np.float64)
+        result["rul"] = [
+            {"x": ts, "y": None if np.isnan(y) else round(y, 4)} for ts, y in zip(x, rul.tolist())
+        ]
+        return {"last_id": self.last_id, "last_predicted_id": self.last_predicted_id, "series": result}
+
+
+class HistoryStore:
+    """Буфери всіх пристроїв процесу; спільний для циклу розсилки і потоків запитів."""
+
+    def __init__(self, size: int = HISTORY_SIZE):
+        self.size = size
+        self.devices: dict[str, DeviceHistory] = {}
+        self.lock = threading.Lock()
+
+    def append_frame(self, data: dict):
+        """Кадр live_data (format_reading_response) -> буфер пристрою."""
+        prediction = data.get("prediction") or {}
+        with self.lock:
+            history = self.devices.get(data["device_uid"])
+            if history is None:
+                history = self.devices[data["device_uid"]] = DeviceHistory(self.size)
+            history.append(
+                data["id"], data["timestamp"], [data[field] for field in FIELDS],
+                prediction.get("rul"), prediction.get("anomaly_score")
+            )
+
+    @staticmethod
+    def _append_row(history: DeviceHistory, reading, prediction):
+        history.append(
+            reading.id, reading.timestamp, [getattr(reading, field) for field in FIELDS],
+            prediction.predicted_rul if prediction else None,
+            prediction.anomaly_score if prediction else None
+        )
+
+    def seed(self, device_uid: str, product_type: str, rows):
+        """
+        Одноразове завантаження останніх записів з БД: rows — (reading, prediction)
+        від старішого до новішого. Записи, що вже прийшли з розсилки, не дублюються.
+        Якщо вибірка не перекривається з буфером розсилки (репліка відстає),
+        між ними може бути пропуск — буфер лишається незавантаженим до наступного разу.
+        """
+        with self.lock:
+            current = self.devices.get(device_uid)
+            if current is not None and current.count:
+                oldest_streamed = int(current.ids[current._order()[0]])
+                if not rows or rows[-1][0].id < oldest_streamed:
+                    return None
+            history = DeviceHistory(self.size, product_type)
+            newest_seeded = None
+            for reading, prediction in rows:
+                self._append_row(history, reading, prediction)
+                newest_seeded = reading.id
+            if current is not None:
+                # Дописуємо новіші записи, які розсилка встигла покласти в буфер
+                for i in current._order():
+                    if newest_seeded is None or current.ids[i] > newest_seeded:
+                        history.append(
+                            int(current.ids[i]), float(current.timestamps[i]), current.values[i],
+                            None if np.isnan(current.rul[i]) else float(current.rul[i]),
+                            None if np.isnan(current.anomaly[i]) else float(current.anomaly[i])
+                        )
+                if history.tz is None:
+                    history.tz = current.tz
+            history.seeded = True
+            self.devices[device_uid] = history
+            return history
+
+    def streamed_id(self, device_uid: str):
+        """Найновіший запис завантаженого буфера; None — буфера немає або він не завантажений."""
+        with self.lock:
+            history = self.devices.get(device_uid)
+            return history.last_id if history is not None and history.seeded else None
+
+    def append_rows(self, device_uid: str, rows):
+        """
+        Записи (reading, prediction) від старішого до новішого, яких не було в кадрах
+        розсилки: проміжні записи і прогнози для вже відомих записів (оновлюються на місці).
+        """
+        with self.lock:
+            history = self.devices.get(device_uid)
+            if history is None or not history.seeded:
+                return
+            for reading, prediction in rows:
+                self._append_row(history, reading, prediction)
+
+    def invalidate(self, device_uid: str):
+        """Пропуск, який не вдалось дочитати: буфер знову завантажиться з БД."""
+        with self.lock:
+            history = self.devices.get(device_uid)
+            if history is not None:
+                history.seeded = False
+
+    def charts(self, device_uid: str, limit: int = None):
+        """(product_type, ряди) з пам'яті або None, якщо буфер ще не завантажений з БД."""
+        with self.lock:
+            history = self.devices.get(device_uid)
+            if history is None or not history.seeded:
+                return None
+            return history.product_type, history.charts(limit)
+
+    def clear(self):
+        with self.lock:
+            self.devices.clear()
+
+
+recent_history = HistoryStore()
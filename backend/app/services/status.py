@@ -1,3 +1,13 @@
+# Оцінка аномальності (відстань Махаланобіса від базової лінії пристрою, див.
+# anomaly_detector.py), вище якої показник підсвічується на живій стрічці
+ANOMALY_THRESHOLD = 4.0
+
+# Прогноз RUL нижче цього значення — ризик
+RISK_RUL = 50
+
+# Порядок статусів для сортування (device_status.severity): найгірший — найбільший
+STATUS_SEVERITY = {"normal": 0, "risk": 1, "emergency": 2}
+
 def determine_status(failure, pred):
     """
     Визначає загальний статус пристрою.
@@ -11,7 +21,7 @@ def determine_status(failure, pred):
     # 2. Перевірка на прогноз (попередження)
     if pred and pred.predicted_rul is not None:
         # Якщо RUL менше 50 годин
-        if pred.predicted_rul < 50:
+        if pred.predicted_rul < RISK_RUL:
             return "risk"
 
     # 3. Якщо все добре
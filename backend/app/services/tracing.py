@@ -0,0 +1,127 @@
+# backend/app/services/tracing.py
+"""
+Трасування затримки запису від симулятора до дашборду.
+
+Кожен показник несе мітки часу всіх переходів (epoch секунди):
+  sent_at      — відправка з пристрою (simulator_publish);
+  received_at  — отримання consumer від брокера;
+  committed_at — запис показника в БД (SensorReading.timestamp, now() транзакції);
+  predicted_at — запис прогнозу (Prediction.created_at);
+  broadcast_at — розсилка live_data вебсервером.
+
+Окремих записів у БД трасування не потребує: перші чотири мітки — колонки
+вже збережених рядків, остання з'являється в момент розсилки. Затримки
+етапів — різниці сусідніх міток. Вебсервер тримає останні MAX_SAMPLES трас
+у пам'яті (для перцентилів) і вибірково (TRACE_SAMPLE_RATE) пише повні
+траси в журнал.
+"""
+import json
+import os
+import random
+import threading
+from collections import deque
+from datetime import timezone
+
+import numpy as np
+
+# Етапи: назва -> (мітка початку, мітка кінця)
+STAGES = {
+    "broker": ("sent_at", "received_at"),
+    "db_commit": ("received_at", "committed_at"),
+    "prediction": ("committed_at", "predicted_at"),
+    "broadcast": ("predicted_at", "broadcast_at"),
+    "end_to_end": ("sent_at", "broadcast_at"),
+}
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Частка трас, що пишуться в журнал (0 — вимкнено)
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 0.01))
+# Файл журналу трас (JSON lines); без нього траси друкуються в stdout
+TRACE_LOG = os.getenv("TRACE_LOG")
+
+MAX_SAMPLES = 10000
+
+
+def epoch(value):
+    """datetime -> epoch секунди; наївні значення (SQLite) вважаються UTC."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def reading_trace(reading, prediction=None) -> dict:
+    """Мітки часу, відомі з рядків БД (без broadcast_at)."""
+    return {
+        "seq": reading.seq,
+        "sent_at": epoch(reading.sent_at),
+        "received_at": epoch(reading.received_at),
+        "committed_at": epoch(reading.timestamp),
+        "predicted_at": epoch(prediction.created_at) if prediction is not None else None,
+    }
+
+
+def stage_latencies(trace: dict) -> dict:
+    """Затримки етапів у мілісекундах (лише ті, для яких є обидві мітки)."""
+    latencies = {}
+    for stage, (start, end) in STAGES.items():
+        if trace.get(start) is not None and trace.get(end) is not None:
+            latencies[stage] = (trace[end] - trace[start]) * 1000.0
+    return latencies
+
+
+def summarize(traces) -> dict:
+    """Перцентилі затримок по етапах: {етап: {count, p50, ..., max}}."""
+    samples = {stage: [] for stage in STAGES}
+    for trace in traces:
+        for stage, value in stage_latencies(trace).items():
+            samples[stage].append(value)
+
+    summary = {}
+    for stage, values in samples.items():
+        if not values:
+            summary[stage] = {"count": 0}
+            continue
+        values = np.asarray(values)
+        summary[stage] = {"count": int(values.size)}
+        for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+            summary[stage][f"p{p}"] = round(float(value), 2)
+        summary[stage]["max"] = round(float(values.max()), 2)
+    return summary
+
+
+class TraceRecorder:
+    """Останні траси розсилок вебсервера та вибірковий журнал."""
+
+    def __init__(self, max_samples: int = MAX_SAMPLES, sample_rate: float = TRACE_SAMPLE_RATE,
+                 log_path: str = TRACE_LOG):
+        self.traces = deque(maxlen=max_samples)
+        self.sample_rate = sample_rate
+        self.log_path = log_path
+        self.lock = threading.Lock()
+
+    def record(self, device_uid, trace: dict):
+        with self.lock:
+            self.traces.append(trace)
+        if self.sample_rate and random.random() < self.sample_rate:
+            self._log(dict(trace, device_uid=device_uid, latency_ms=stage_latencies(trace)))
+
+    def _log(self, entry: dict):
+        line = json.dumps(entry)
+        if not self.log_path:
+            print(f"[TRACE] {line}")
+            return
+        try:
+            with open(self.log_path, "a") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            print(f"[TRACE] Could not write trace log: {e}")
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.traces)
+
+
+recorder = TraceRecorder()
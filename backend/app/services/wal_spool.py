@@ -0,0 +1,341 @@
+# backend/app/services/wal_spool.py
+"""
+Локальний журнал попереднього запису (WAL) для consumer.
+
+Отримане повідомлення спершу дописується в журнал на диску, а в БД його
+пакетами переносить фоновий потік. Поки БД недоступна або повільна,
+журнал росте, а не губить дані; callback paho не чекає на БД.
+
+Будова:
+  сегменти      — <dir>/<номер>.seg, лише дописування; новий сегмент після
+                  segment_bytes. Після перезапуску запис іде в новий сегмент,
+                  старі лише дочитуються;
+  запис         — заголовок <II (довжина, crc32) + JSON; обірваний або
+                  пошкоджений хвіст сегмента вважається його кінцем;
+  групова fsync — append лише пише в буфер файла, окремий потік раз на
+                  fsync_interval робить flush+fsync; читач бачить тільки
+                  записи, що вже на диску;
+  checkpoint    — <dir>/checkpoint (сегмент, зсув) після кожного успішного
+                  пакета; повністю перенесені сегменти видаляються;
+  ліміт розміру — понад max_bytes видаляються найстаріші сегменти (з
+                  повідомленням і метрикою), щоб диск не переповнився.
+                  Видаляє той, хто дописує, без drain_lock: потік перенесення
+                  може довго чекати на БД. Межа видаленого (floor) не дає
+                  checkpoint повернутися до видалених сегментів;
+  dead-letter   — якщо пакет не пишеться через помилку даних (не через
+                  transient_errors), він ділиться навпіл, доки поганий запис
+                  не лишиться сам; його переносять у <dir>/dead-letter.jsonl,
+                  і журнал іде далі, а не повторює той самий пакет вічно.
+"""
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+
+from backend.app.services import metrics
+
+_HEADER = struct.Struct("<II")
+
+
+class WalSpool:
+    def __init__(self, directory, sink, segment_bytes: int = 16 * 1024 * 1024,
+                 max_bytes: int = 1024 * 1024 * 1024, fsync_interval: float = 0.05,
+                 batch_size: int = 1000, drain_interval: float = 0.2, transient_errors: tuple = ()):
+        # sink(records) пише пакет у БД; виняток — пакет лишається в журналі.
+        # transient_errors — винятки sink, після яких пакет повторюється цілим (БД недоступна)
+        self.directory = Path(directory)
+        self.sink = sink
+        self.transient_errors = transient_errors
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.fsync_interval = fsync_interval
+        self.batch_size = batch_size
+        self.drain_interval = drain_interval
+
+        self.lock = threading.Lock()
+        self.drain_lock = threading.RLock()
+        self.stop_event = threading.Event()
+        self.data_ready = threading.Event()
+        self.drain_requested = threading.Event()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Перший сегмент, що не видалений лімітом розміру
+        self.floor = 0
+        self.checkpoint = self._load_checkpoint()
+        segments = self._segments()
+        for segment in segments:
+            if segment < self.checkpoint[0]:
+                self._path(segment).unlink(missing_ok=True)
+        segments = [s for s in segments if s >= self.checkpoint[0]]
+        if segments and self.checkpoint[0] < segments[0]:
+            self.checkpoint = (segments[0], 0)
+
+        # Запис завжди починається з нового сегмента
+        self.active = (segments[-1] + 1) if segments else max(self.checkpoint[0], 1)
+        if not segments:
+            self.checkpoint = (self.active, 0)
+        self.file = open(self._path(self.active), "ab")
+        self.dirty = False
+        # Межа прочитаного: (сегмент, зсув) останнього запису, що вже на диску
+        self.durable = (self.active, 0)
+        self.total_bytes = sum(self._path(s).stat().st_size for s in segments)
+
+        self._reader = None
+        self._reader_segment = None
+
+    # --- файли ---------------------------------------------------------------
+
+    def _path(self, segment: int) -> Path:
+        return self.directory / f"{segment:012d}.seg"
+
+    def _segments(self):
+        return sorted(int(p.stem) for p in self.directory.glob("*.seg"))
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.directory / "checkpoint") as f:
+                data = json.load(f)
+            return int(data["segment"]), int(data["offset"])
+        except (FileNotFoundError, ValueError, KeyError):
+            return 0, 0
+
+    def _save_checkpoint(self, position):
+        position = max(position, (self.floor, 0))
+        path = self.directory / "checkpoint"
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"segment": position[0], "offset": position[1]}, f)
+        os.replace(tmp_path, path)
+        self.checkpoint = position
+
+    # --- запис ---------------------------------------------------------------
+
+    def append(self, record: dict):
+        payload = json.dumps(record, separators=(",", ":")).encode()
+        frame = _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        with self.lock:
+            self.file.write(frame)
+            self.dirty = True
+            self.total_bytes += len(frame)
+            if self.file.tell() < self.segment_bytes:
+                return
+            self._roll()
+        if self.total_bytes > self.max_bytes:
+            self._enforce_limit()
+
+    def _roll(self):
+        # Викликається під self.lock
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        self.active += 1
+        self.file = open(self._path(self.active), "ab")
+        self.durable = (self.active, 0)
+        self.dirty = False
+        self.data_ready.set()
+
+    def _remove_segment(self, segment: int) -> int:
+        path = self._path(segment)
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return 0
+        with self.lock:
+            self.total_bytes -= size
+        return size
+
+    def _enforce_limit(self):
+        """
+        Видаляє найстаріші сегменти (крім активного), поки журнал більший за max_bytes.
+        Без drain_lock: checkpoint і читача за межею floor переставляє потік перенесення.
+        """
+        for segment in self._segments():
+            if self.total_bytes <= self.max_bytes or segment >= self.active:
+                break
+            size = self._remove_segment(segment)
+            with self.lock:
+                self.floor = max(self.floor, segment + 1)
+            self.data_ready.set()
+            metrics.SPOOL_DROPPED_BYTES.inc(size)
+            print(f"[SPOOL] Size limit {self.max_bytes} bytes exceeded, dropped segment {segment} ({size} bytes)")
+
+    def sync(self):
+        """Групова fsync усього, що дописано з попереднього виклику."""
+        with self.lock:
+            if not self.dirty:
+                return
+            self.file.flush()
+            position = (self.active, self.file.tell())
+            # Копія дескриптора: fsync іде без блокування, append не чекає на диск
+            fileno = os.dup(self.file.fileno())
+            self.dirty = False
+        try:
+            os.fsync(fileno)
+        finally:
+            os.close(fileno)
+        with self.lock:
+            if position[0] == self.active:
+                self.durable = max(self.durable, position)
+        metrics.SPOOL_BYTES.set(self.total_bytes)
+        self.data_ready.set()
+
+    # --- читання і перенесення в БД ---------------------------------------------
+
+    def _close_reader(self):
+        if self._reader is not None:
+            self._reader.close()
+        self._reader = None
+        self._reader_segment = None
+
+    def _read_batch(self):
+        """
+        Записи від checkpoint до межі durable; повертає (records, кінці записів, нова позиція).
+        Кінець запису — позиція одразу після нього (checkpoint, якщо пакет записано частково).
+        """
+        with self.lock:
+            durable = self.durable
+            floor = self.floor
+        if self.checkpoint < (floor, 0):
+            # Сегменти до floor видалено лімітом розміру
+            if self._reader_segment is not None and self._reader_segment < floor:
+                self._close_reader()
+            self._save_checkpoint((floor, 0))
+        segment, offset = self.checkpoint
+        records = []
+        ends = []
+
+        while len(records) < self.batch_size and (segment, offset) < durable:
+            if self._reader_segment != segment:
+                self._close_reader()
+                try:
+                    self._reader = open(self._path(segment), "rb")
+                except FileNotFoundError:
+                    # Сегмент видалено лімітом розміру
+                    segment, offset = segment + 1, 0
+                    continue
+                self._reader_segment = segment
+            self._reader.seek(offset)
+
+            limit = durable[1] if segment == durable[0] else None
+            while len(records) < self.batch_size and (limit is None or offset < limit):
+                header = self._reader.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    break
+                length, crc = _HEADER.unpack(header)
+                payload = self._reader.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    # Обірваний запис у хвості старого сегмента (аварійна зупинка)
+                    print(f"[SPOOL] Torn record in segment {segment} at {offset}, skipping rest of segment")
+                    break
+                records.append(json.loads(payload))
+                offset += _HEADER.size + length
+                ends.append((segment, offset))
+
+            if len(records) >= self.batch_size or segment == durable[0]:
+                break
+            # Старий сегмент дочитано — переходимо до наступного
+            segment, offset = segment + 1, 0
+
+        return records, ends, (segment, offset)
+
+    def _deliver(self, records, ends):
+        """
+        Пише записи через sink і просуває checkpoint. Помилка даних ділить
+        пакет навпіл: записані половини лишаються записаними, а один поганий
+        запис іде в dead-letter. transient_errors прокидаються далі — пакет
+        повториться цілим після паузи (_drain_loop).
+        """
+        try:
+            self.sink(records)
+        except self.transient_errors:
+            raise
+        except Exception as e:
+            if len(records) == 1:
+                self._dead_letter(records[0], e)
+            else:
+                middle = len(records) // 2
+                self._deliver(records[:middle], ends[:middle])
+                self._deliver(records[middle:], ends[middle:])
+                return
+        self._save_checkpoint(ends[-1])
+
+    def _dead_letter(self, record, error):
+        line = json.dumps({"record": record, "error": f"{type(error).__name__}: {error}", "at": time.time()},
+                          separators=(",", ":"), default=str)
+        with open(self.directory / "dead-letter.jsonl", "a") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        metrics.SPOOL_DEAD_LETTERS.inc()
+        print(f"[SPOOL] Record moved to dead-letter.jsonl: {type(error).__name__}: {error}")
+
+    def drain_once(self) -> int:
+        """Переносить у БД один пакет; повертає кількість записів."""
+        with self.drain_lock:
+            records, ends, position = self._read_batch()
+            previous = self.checkpoint[0]
+            if records:
+                self._deliver(records, ends)
+            if position != self.checkpoint:
+                self._save_checkpoint(position)
+            for segment in range(previous, position[0]):
+                if self._reader_segment == segment:
+                    self._close_reader()
+                self._remove_segment(segment)
+            return len(records)
+
+    def drain(self):
+        """Переносить усе, що вже на диску (наприклад, перед перерозподілом пристроїв)."""
+        self.sync()
+        while self.drain_once():
+            pass
+
+    def request_drain(self):
+        """Неблокуючий запит: потік перенесення зробить fsync і дожене журнал (для колбеків MQTT)."""
+        self.drain_requested.set()
+        self.data_ready.set()
+
+    def _sync_loop(self):
+        while not self.stop_event.wait(self.fsync_interval):
+            try:
+                self.sync()
+            except OSError as e:
+                print(f"[SPOOL] fsync failed: {e}")
+
+    def _drain_loop(self):
+        backoff = self.drain_interval
+        while not self.stop_event.is_set():
+            try:
+                if self.drain_requested.is_set():
+                    self.drain_requested.clear()
+                    self.sync()
+                drained = self.drain_once()
+                backoff = self.drain_interval
+            except Exception as e:
+                metrics.SPOOL_DRAIN_ERRORS.inc()
+                print(f"[SPOOL] Drain failed, retrying in {backoff:.1f}s: {e}")
+                self.stop_event.wait(backoff)
+                backoff = min(backoff * 2, 10.0)
+                continue
+            if not drained:
+                self.data_ready.wait(self.drain_interval)
+                self.data_ready.clear()
+
+    def start(self):
+        threading.Thread(target=self._sync_loop, daemon=True, name="spool-fsync").start()
+        threading.Thread(target=self._drain_loop, daemon=True, name="spool-drain").start()
+
+    def close(self):
+        """Зупиняє потоки; незаписане в БД лишається на диску до наступного запуску."""
+        self.stop_event.set()
+        self.sync()
+        try:
+            self.drain()
+        except Exception as e:
+            print(f"[SPOOL] Final drain failed, {self.total_bytes} bytes kept on disk: {e}")
+        with self.lock:
+            self.file.close()
@@ -0,0 +1,310 @@
+# backend/backfill.py
+"""
+Офлайн перерахунок прогнозів для історичних sensor_readings.
+
+Потрібен після заміни best_rul_model.keras або зміни порогів у
+failure_detector.py: predictor обробляє лише нові записи без прогнозу.
+
+Записи вибираються за часом та/або пристроями, діляться на чанки
+однакового розміру (keyset по id), кожен чанк рахується пакетно
+(detect_failure_batch + predict_rul_batch) і записується одним bulk
+upsert по (reading_id, model_version). Версія береться з реєстру моделей
+(backend/model/registry.json) або з --model-path. Прогнози робочої версії
+стають робочими (is_primary) для перерахованих записів, інших версій —
+зберігаються поруч для порівняння. Чанки обробляються паралельно
+в --workers процесах; виконані чанки пишуться в checkpoint-файл, тож
+перерваний запуск продовжується з того ж місця.
+
+Приклад:
+    python -m backend.backfill --start 2025-01-01T00:00 --end 2025-02-01T00:00 --workers 4
+    python -m backend.backfill --devices dev-1,dev-2 --model-version final_rul_model
+    python -m backend.backfill --devices dev-1,dev-2 --model-path backend/model/final_rul_model.keras
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone
+from multiprocessing import Pool
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import func, select, update
+
+from backend.app.database import SessionLocal, engine
+from backend.app.services.model_registry import read_manifest
+from backend.models import Device, SensorReading, Prediction
+
+DEFAULT_CHECKPOINT = "backfill_checkpoint.json"
+
+
+def parse_utc(value):
+    # ISO-дата; без часового поясу вважається UTC
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _filtered_ids(start=None, end=None, devices=None):
+    query = select(SensorReading.id)
+    if devices:
+        query = query.join(Device, SensorReading.device_id == Device.id).where(Device.device_uid.in_(devices))
+    if start:
+        query = query.where(SensorReading.timestamp >= start)
+    if end:
+        query = query.where(SensorReading.timestamp <= end)
+    return query
+
+
+def plan_chunks(start=None, end=None, devices=None, chunk_size=5000):
+    """
+    Межі чанків [lo, hi] по id: кожен чанк містить chunk_size записів,
+    що підпадають під фільтр (а не просто chunk_size послідовних id).
+    """
+    ids = _filtered_ids(start, end, devices).subquery()
+    numbered = select(
+        ids.c.id,
+        func.row_number().over(order_by=ids.c.id).label("rn")
+    ).subquery()
+
+    db = SessionLocal()
+    try:
+        first_ids = [row[0] for row in db.execute(
+            select(numbered.c.id).where((numbered.c.rn - 1) % chunk_size == 0).order_by(numbered.c.id)
+        )]
+        last_id = db.execute(select(func.max(ids.c.id))).scalar()
+    finally:
+        db.close()
+
+    if not first_ids:
+        return []
+    bounds = first_ids + [last_id + 1]
+    return [(bounds[i], bounds[i + 1] - 1) for i in range(len(first_ids))]
+
+
+# --- Робочий процес ---------------------------------------------------------
+
+_worker_filters = {}
+_worker_model_path = None
+_worker_model = None
+
+
+def _init_worker(filters, model_path):
+    # Кожен процес отримує власні з'єднання з БД і власну копію моделі
+    global _worker_filters, _worker_model_path, _worker_model
+    _worker_filters = filters
+    _worker_model_path = model_path
+    _worker_model = None
+    engine.dispose(close=False)
+
+
+def _get_model():
+    # Модель завантажується ліниво в кожному процесі (після fork)
+    global _worker_model
+    if _worker_model is None:
+        from backend.app.services.model_loader import MODEL_PATH, RulModel
+        from backend.app.services.model_registry import load_version
+
+        version = _worker_filters["model_version"]
+        if _worker_model_path:
+            _worker_model = RulModel(_worker_model_path, version=version).load()
+        elif version in read_manifest()["models"]:
+            _worker_model = load_version(version)
+        else:
+            _worker_model = RulModel(MODEL_PATH, version=version).load()
+    return _worker_model
+
+
+def score_chunk(bounds):
+    """Перераховує один чанк і повертає (lo, hi, кількість записів)."""
+    from backend.app.services.failure_detector import detect_failure_batch
+
+    lo, hi = bounds
+    filters = _worker_filters
+    db = SessionLocal()
+    try:
+        query = (
+            db.query(
+                SensorReading.id, SensorReading.air_temp, SensorReading.process_temp,
+                SensorReading.rotational_speed, SensorReading.torque, SensorReading.tool_wear,
+                Device.product_type
+            )
+            .join(Device, SensorReading.device_id == Device.id)
+            .filter(SensorReading.id >= lo, SensorReading.id <= hi)
+        )
+        if filters.get("devices"):
+            query = query.filter(Device.device_uid.in_(filters["devices"]))
+        if filters.get("start"):
+            query = query.filter(SensorReading.timestamp >= parse_utc(filters["start"]))
+        if filters.get("end"):
+            query = query.filter(SensorReading.timestamp <= parse_utc(filters["end"]))
+        rows = query.all()
+        if not rows:
+            return lo, hi, 0
+
+        reading_ids = [row[0] for row in rows]
+        features = np.array([row[1:6] for row in rows], dtype=float)
+        product_types = [row[6] or "L" for row in rows]
+
+        # 1. Правила відмов для всього чанку
+        failures = detect_failure_batch(
+            features[:, 0], features[:, 1], features[:, 2], features[:, 3], features[:, 4],
+            product_types
+        )
+        failed = failures != None  # noqa: E711 (порівняння масиву об'єктів)
+
+        # 2. Модель лише для записів без відмови, одним пакетом
+        rul = np.zeros(len(rows))
+        if (~failed).any():
+            rul[~failed] = _get_model().predict_batch(features[~failed])
+
+        values = [
+            {
+                "reading_id": reading_id,
+                "predicted_rul": float(predicted_rul),
+                "class_failure_type": failure if failure is not None else "Normal",
+                "model_version": filters["model_version"],
+                "is_primary": filters["primary"],
+            }
+            for reading_id, predicted_rul, failure in zip(reading_ids, rul.tolist(), failures.tolist())
+        ]
+
+        # 3. Робочий прогноз на запис лише один: знімаємо позначку з інших версій
+        if filters["primary"]:
+            db.execute(
+                update(Prediction)
+                .where(Prediction.reading_id.in_(reading_ids),
+                       Prediction.model_version != filters["model_version"],
+                       Prediction.is_primary.is_(True))
+                .values(is_primary=False)
+            )
+
+        # 4. Bulk upsert: повторний запуск перезаписує прогнози тієї ж версії
+        db.execute(upsert_predictions(values))
+        db.commit()
+        return lo, hi, len(rows)
+    finally:
+        db.close()
+
+
+def upsert_predictions(values):
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    stmt = insert(Prediction).values(values)
+    return stmt.on_conflict_do_update(
+        index_elements=[Prediction.reading_id, Prediction.model_version],
+        set_={
+            "predicted_rul": stmt.excluded.predicted_rul,
+            "class_failure_type": stmt.excluded.class_failure_type,
+            "is_primary": stmt.excluded.is_primary,
+            "created_at": func.now(),
+        }
+    )
+
+
+# --- Checkpoint -------------------------------------------------------------
+
+def job_key(filters, chunk_size):
+    raw = json.dumps({**filters, "chunk_size": chunk_size}, sort_keys=True)
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def load_checkpoint(path, key):
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        data = json.load(f)
+    return {tuple(b) for b in data.get(key, {}).get("done", [])}
+
+
+def save_checkpoint(path, key, filters, done):
+    data = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            data = json.load(f)
+    data[key] = {"filters": filters, "done": sorted(list(b) for b in done)}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+# --- CLI --------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Перерахунок прогнозів для історичних показників")
+    parser.add_argument("--start", type=str, default=None, help="Початок інтервалу (ISO, UTC)")
+    parser.add_argument("--end", type=str, default=None, help="Кінець інтервалу (ISO, UTC)")
+    parser.add_argument("--devices", type=str, default=None, help="Список device_uid через кому")
+    parser.add_argument("--model-path", type=str, default=None,
+                        help="Файл .keras поза реєстром (за замовчуванням — артефакт версії з реєстру)")
+    parser.add_argument("--model-version", type=str, default=None,
+                        help="Версія з реєстру або мітка для --model-path (за замовчуванням — робоча версія "
+                             "або ім'я файлу --model-path)")
+    parser.add_argument("--primary", action="store_true",
+                        help="Зробити прогнози робочими, навіть якщо версія не є робочою в реєстрі")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Записів у чанку")
+    parser.add_argument("--workers", type=int, default=1, help="Кількість процесів")
+    parser.add_argument("--checkpoint", type=str, default=DEFAULT_CHECKPOINT, help="Файл checkpoint")
+    parser.add_argument("--restart", action="store_true", help="Ігнорувати checkpoint і почати заново")
+    args = parser.parse_args()
+
+    serving_version = read_manifest()["serving"]
+    model_version = args.model_version
+    if not model_version:
+        model_version = Path(args.model_path).stem if args.model_path else serving_version
+
+    filters = {
+        "start": args.start,
+        "end": args.end,
+        "devices": sorted(d.strip() for d in args.devices.split(",")) if args.devices else None,
+        "model_version": model_version,
+        "primary": args.primary or model_version == serving_version,
+    }
+    key = job_key(filters, args.chunk_size)
+
+    chunks = plan_chunks(parse_utc(args.start), parse_utc(args.end), filters["devices"], args.chunk_size)
+    done = set() if args.restart else load_checkpoint(args.checkpoint, key)
+    pending = [c for c in chunks if c not in done]
+
+    print(f"[BACKFILL] Версія: {model_version}{' (робоча)' if filters['primary'] else ''}, чанків: {len(chunks)}, виконано раніше: {len(chunks) - len(pending)}, "
+          f"процесів: {args.workers}")
+    if not pending:
+        print("[BACKFILL] Нічого робити")
+        return
+
+    started = time.time()
+    scored = 0
+    initargs = (filters, args.model_path)
+
+    if args.workers > 1:
+        pool = Pool(args.workers, initializer=_init_worker, initargs=initargs)
+        results = pool.imap_unordered(score_chunk, pending)
+    else:
+        pool = None
+        _init_worker(*initargs)
+        results = map(score_chunk, pending)
+
+    try:
+        for i, (lo, hi, count) in enumerate(results, start=1):
+            scored += count
+            done.add((lo, hi))
+            save_checkpoint(args.checkpoint, key, filters, done)
+            elapsed = time.time() - started
+            print(f"[BACKFILL] {i}/{len(pending)} чанків, id {lo}..{hi}: {count} записів "
+                  f"({scored / elapsed if elapsed else 0:.0f} rows/s)")
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    print(f"[BACKFILL] Готово: {scored} прогнозів версії {model_version} за {time.time() - started:.1f}с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+# backend/bench_measure.py
+"""
+Вимірювач для навантажувального тесту (simulator_publish --target-rate).
+
+Симулятор додає до кожного повідомлення "seq" і "sent_at", consumer
+зберігає їх у sensor_readings. Звідси рахуємо пропускну здатність,
+втрати та перцентилі затримки по етапах:
+
+    датчик -> запис у БД -> прогноз -> дашборд (WebSocket)
+
+Приклад:
+    python -m backend.simulator_publish --mqtt --num-devices 1000 --target-rate 5000/s --duration 60 --ramp 10
+    python -m backend.bench_measure --since-seconds 120 --ws --ws-duration 30
+
+    python -m backend.simulator_publish --mqtt --replay backend/model/AI4I_with_RUL.csv --max-speed
+    python -m backend.bench_measure --since-seconds 600 --replay-labels backend/model/AI4I_with_RUL.csv
+
+Час відправки береться з годинника симулятора, а час запису/прогнозу —
+з БД, тому процеси мають працювати з синхронізованим часом (в docker-compose
+це той самий хост).
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from backend.app.crud import prediction_join
+from backend.app.database import SessionLocal
+from backend.models import SensorReading, Prediction
+
+
+def latency_stats(latencies) -> dict:
+    """Перцентилі затримки в мілісекундах (NaN ігноруються)."""
+    values = np.asarray(latencies, dtype=float)
+    values = values[~np.isnan(values)] * 1000.0
+    if values.size == 0:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": int(values.size),
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(values.max()), 2),
+    }
+
+
+def _print_stage(name, stats):
+    if not stats["count"]:
+        print(f"  {name:<28} немає даних")
+        return
+    print(f"  {name:<28} n={stats['count']:<9} p50={stats['p50_ms']:>9.1f} мс  "
+          f"p95={stats['p95_ms']:>9.1f} мс  p99={stats['p99_ms']:>9.1f} мс  max={stats['max_ms']:>9.1f} мс")
+
+
+def measure_db(since: datetime, until: datetime = None, chunk_size: int = 50000) -> dict:
+    """Затримки та втрати за рядками sensor_readings/predictions тестового прогону."""
+    db = SessionLocal()
+    try:
+        query = (
+            db.query(SensorReading.seq, SensorReading.sent_at, SensorReading.timestamp, Prediction.created_at)
+            .outerjoin(Prediction, prediction_join())
+            .filter(SensorReading.seq.isnot(None), SensorReading.sent_at >= since)
+        )
+        if until:
+            query = query.filter(SensorReading.sent_at <= until)
+
+        seqs, sent, stored, predicted = [], [], [], []
+        for seq, sent_at, stored_at, predicted_at in query.yield_per(chunk_size):
+            seqs.append(seq)
+            sent.append(sent_at.timestamp())
+            stored.append(stored_at.timestamp())
+            predicted.append(predicted_at.timestamp() if predicted_at else np.nan)
+    finally:
+        db.close()
+
+    if not seqs:
+        return {"readings": 0}
+
+    seqs = np.asarray(seqs, dtype=np.int64)
+    sent = np.asarray(sent)
+    stored = np.asarray(stored)
+    predicted = np.asarray(predicted)
+
+    unique = np.unique(seqs)
+    expected = int(unique[-1] - unique[0] + 1)
+    window = stored.max() - stored.min()
+
+    return {
+        "readings": int(seqs.size),
+        "unique_seq": int(unique.size),
+        "expected_seq": expected,
+        "lost": expected - int(unique.size),
+        "loss_pct": round(float((expected - unique.size) / expected * 100), 3),
+        "duplicates": int(seqs.size - unique.size),
+        "unpredicted": int(np.isnan(predicted).sum()),
+        "ingest_throughput": round(float(seqs.size / window), 1) if window > 0 else None,
+        "predict_throughput": round(float((~np.isnan(predicted)).sum() / window), 1) if window > 0 else None,
+        "sensor_to_db": latency_stats(stored - sent),
+        "db_to_prediction": latency_stats(predicted - stored),
+        "sensor_to_prediction": latency_stats(predicted - sent),
+    }
+
+
+def measure_ws(url: str, username: str, role: str, duration: float) -> dict:
+    """Слухає /api/ws/live і міряє затримку від датчика до кадру дашборду."""
+    from websockets.sync.client import connect
+    from backend.app.services.auth import create_access_token
+
+    token = create_access_token(data={"sub": username, "role": role})
+    latencies, seqs = [], set()
+    frames = 0
+
+    deadline = time.time() + duration
+    with connect(url, additional_headers={"Cookie": f"access_token={token}"}) as ws:
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                raw = ws.recv(timeout=remaining)
+            except TimeoutError:
+                break
+            received_at = time.time()
+            data = json.loads(raw)
+            if data.get("type") != "live_data":
+                continue
+            frames += 1
+            if data.get("sent_at") is not None:
+                latencies.append(received_at - data["sent_at"])
+                seqs.add(data.get("seq"))
+
+    return {
+        "frames": frames,
+        "frames_per_sec": round(frames / duration, 1) if duration else None,
+        # broadcast_loop надсилає лише останній стан пристрою, тож
+        # кількість унікальних seq тут — не втрати, а коалесценція
+        "unique_seq": len(seqs),
+        "sensor_to_dashboard": latency_stats(latencies),
+    }
+
+
+def evaluate_replay(labels_path: str, since: datetime, until: datetime = None) -> dict:
+    """
+    Порівнює збережені прогнози з мітками датасету, відтвореного через
+    simulator_publish --replay (seq = номер рядка у файлі).
+    """
+    import pandas as pd
+    from backend.simulator_publish import failure_labels
+
+    dataset = pd.read_csv(labels_path, encoding="utf-8-sig")
+    true_rul = dataset["RUL_synthetic"].to_numpy(dtype=float) if "RUL_synthetic" in dataset.columns else None
+    true_failure = failure_labels(dataset)
+
+    db = SessionLocal()
+    try:
+        query = (
+            db.query(SensorReading.seq, Prediction.predicted_rul, Prediction.class_failure_type)
+            .join(Prediction, prediction_join())
+            .filter(SensorReading.seq.isnot(None), SensorReading.sent_at >= since)
+        )
+        if until:
+            query = query.filter(SensorReading.sent_at <= until)
+        rows = query.all()
+    finally:
+        db.close()
+
+    if not rows:
+        return {"predictions": 0}
+
+    positions = np.array([seq for seq, _, _ in rows], dtype=np.int64) % len(dataset)
+    pred_rul = np.array([rul for _, rul, _ in rows], dtype=float)
+    pred_failure = np.array([failure or "Normal" for _, _, failure in rows], dtype=object)
+    expected_failure = true_failure[positions]
+
+    report = {
+        "predictions": len(rows),
+        "failure_accuracy": round(float(np.mean(pred_failure == expected_failure)), 4),
+        "failures_true": int(np.sum(expected_failure != "Normal")),
+        "failures_detected": int(np.sum((expected_failure != "Normal") & (pred_failure != "Normal"))),
+        "false_alarms": int(np.sum((expected_failure == "Normal") & (pred_failure != "Normal"))),
+    }
+
+    if true_rul is not None:
+        # RUL оцінюємо як у model_test.py: MAE / MSE / R²
+        y_true = true_rul[positions]
+        y_pred = pred_rul
+        errors = y_pred - y_true
+        ss_tot = np.sum((y_true - y_true.mean()) ** 2)
+        report.update({
+            "rul_mae": round(float(np.mean(np.abs(errors))), 4),
+            "rul_mse": round(float(np.mean(errors ** 2)), 4),
+            "rul_r2": round(float(1 - np.sum(errors ** 2) / ss_tot), 4) if ss_tot > 0 else None,
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Вимірювання наскрізної затримки навантажувального тесту")
+    parser.add_argument("--since", type=str, default=None, help="Початок прогону (ISO, UTC)")
+    parser.add_argument("--since-seconds", type=float, default=300, help="Або: останні N секунд")
+    parser.add_argument("--until", type=str, default=None, help="Кінець прогону (ISO, UTC)")
+    parser.add_argument("--ws", action="store_true", help="Також міряти затримку до дашборду через WebSocket")
+    parser.add_argument("--ws-url", type=str, default="ws://localhost:8000/api/ws/live")
+    parser.add_argument("--ws-duration", type=float, default=30.0, help="Скільки секунд слухати WebSocket")
+    parser.add_argument("--username", type=str, default="manager1")
+    parser.add_argument("--role", type=str, default="manager")
+    parser.add_argument("--replay-labels", type=str, default=None,
+                        help="Датасет, відтворений через --replay: порівняти прогнози з мітками")
+    parser.add_argument("--json", type=str, default=None, help="Зберегти результат у JSON-файл")
+    args = parser.parse_args()
+
+    report = {}
+
+    if args.ws:
+        print(f"Слухаємо {args.ws_url} {args.ws_duration}с...")
+        report["dashboard"] = measure_ws(args.ws_url, args.username, args.role, args.ws_duration)
+
+    since = datetime.fromisoformat(args.since) if args.since else datetime.now(timezone.utc) - timedelta(seconds=args.since_seconds)
+    until = datetime.fromisoformat(args.until) if args.until else None
+    report["database"] = measure_db(since, until)
+
+    db_report = report["database"]
+    print("\nНАСКРІЗНІ ЗАТРИМКИ")
+    if not db_report["readings"]:
+        print("  Немає записів з seq/sent_at у вказаному вікні")
+    else:
+        print(f"  Записів: {db_report['readings']}, очікувалось: {db_report['expected_seq']}, "
+              f"втрачено: {db_report['lost']} ({db_report['loss_pct']}%), дублікатів: {db_report['duplicates']}, "
+              f"без прогнозу: {db_report['unpredicted']}")
+        print(f"  Пропускна здатність: запис {db_report['ingest_throughput']} msg/s, "
+              f"прогноз {db_report['predict_throughput']} msg/s")
+        _print_stage("датчик -> БД", db_report["sensor_to_db"])
+        _print_stage("БД -> прогноз", db_report["db_to_prediction"])
+        _print_stage("датчик -> прогноз", db_report["sensor_to_prediction"])
+
+    if "dashboard" in report:
+        ws_report = report["dashboard"]
+        print(f"  Кадрів дашборду: {ws_report['frames']} ({ws_report['frames_per_sec']}/s), "
+              f"унікальних seq: {ws_report['unique_seq']}")
+        _print_stage("датчик -> дашборд", ws_report["sensor_to_dashboard"])
+
+    if args.replay_labels:
+        quality = evaluate_replay(args.replay_labels, since, until)
+        report["quality"] = quality
+        print("\nЯКІСТЬ ПРОГНОЗІВ (відносно міток датасету)")
+        if not quality["predictions"]:
+            print("  Немає прогнозів для відтворених рядків")
+        else:
+            print(f"  Прогнозів: {quality['predictions']}, точність класу відмови: {quality['failure_accuracy']}")
+            print(f"  Відмов у датасеті: {quality['failures_true']}, виявлено: {quality['failures_detected']}, "
+                  f"хибних тривог: {quality['false_alarms']}")
+            if "rul_mae" in quality:
+                print(f"  RUL: MAE={quality['rul_mae']}, MSE={quality['rul_mse']}, R²={quality['rul_r2']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nЗбережено: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
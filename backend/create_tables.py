@@ -1,9 +1,81 @@
 import sys
 import os
+from sqlalchemy import text
 from backend.app.database import engine, Base
 from backend import models 
+from backend.app.services.status import RISK_RUL, STATUS_SEVERITY
+from backend.models import FLEET_NULL_RUL, FLEET_NULL_LAST_SEEN
+
+# Колонки, додані після першого релізу: create_all не змінює вже існуючі
+# таблиці, тому додаємо їх окремо (ідемпотентно).
+COLUMN_UPGRADES = [
+    ("sensor_readings", "seq", "BIGINT"),
+    ("sensor_readings", "sent_at", "TIMESTAMP WITH TIME ZONE"),
+    ("sensor_readings", "received_at", "TIMESTAMP WITH TIME ZONE"),
+    ("predictions", "model_version", "VARCHAR"),
+    ("predictions", "is_primary", "BOOLEAN"),
+    ("predictions", "anomaly_score", "DOUBLE PRECISION"),
+    ("device_status", "product_type", "VARCHAR"),
+    ("device_status", "severity", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+# Дані/індекси, що мають з'явитися після додавання колонок
+SQL_UPGRADES = [
+    # Прогнози до появи версій зроблені моделлю best_rul_model.keras
+    "UPDATE predictions SET model_version = 'best_rul_model' WHERE model_version IS NULL",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_prediction_reading_version ON predictions (reading_id, model_version)",
+    # Робочими вважаються прогнози моделі, що обслуговувала систему до появи реєстру
+    "UPDATE predictions SET is_primary = (model_version = 'best_rul_model') WHERE is_primary IS NULL",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_prediction_reading_primary ON predictions (reading_id) WHERE is_primary",
+    "CREATE INDEX IF NOT EXISTS ix_sensor_readings_device_id_id ON sensor_readings (device_id, id)",
+    # Початкове заповнення device_status: останній показник і прогноз кожного пристрою
+    # (max(id) на пристрій — по індексу device_id, id, без сканування таблиці)
+    f"""
+    INSERT INTO device_status (device_id, product_type, reading_id, air_temp, process_temp, rotational_speed, torque, tool_wear,
+                               last_seen, prediction_reading_id, predicted_rul, failure_type, anomaly_score,
+                               status, severity, updated_at)
+    SELECT r.device_id, d.product_type, r.id, r.air_temp, r.process_temp, r.rotational_speed, r.torque, r.tool_wear,
+           COALESCE(r.received_at, r.timestamp), p.reading_id, p.predicted_rul, p.class_failure_type, p.anomaly_score,
+           CASE WHEN p.class_failure_type <> 'Normal' THEN 'emergency'
+                WHEN p.predicted_rul < {RISK_RUL} THEN 'risk' ELSE 'normal' END,
+           CASE WHEN p.class_failure_type <> 'Normal' THEN {STATUS_SEVERITY["emergency"]}
+                WHEN p.predicted_rul < {RISK_RUL} THEN {STATUS_SEVERITY["risk"]} ELSE {STATUS_SEVERITY["normal"]} END,
+           CURRENT_TIMESTAMP
+    FROM devices d
+    JOIN sensor_readings r ON r.id = (SELECT max(id) FROM sensor_readings WHERE device_id = d.id)
+    LEFT JOIN predictions p ON p.reading_id = r.id AND p.is_primary
+    ON CONFLICT (device_id) DO NOTHING
+    """,
+    # Таблиця з'явилась до колонок product_type/severity
+    "UPDATE device_status SET product_type = (SELECT product_type FROM devices WHERE devices.id = device_status.device_id) "
+    "WHERE product_type IS NULL",
+    f"UPDATE device_status SET severity = CASE status WHEN 'emergency' THEN {STATUS_SEVERITY['emergency']} "
+    f"WHEN 'risk' THEN {STATUS_SEVERITY['risk']} ELSE {STATUS_SEVERITY['normal']} END "
+    "WHERE severity = 0 AND status <> 'normal'",
+    # Ключі огляду парку без NULL (routers/fleet.py): індекси по виразах замість колонок
+    "DROP INDEX IF EXISTS ix_device_status_rul",
+    "DROP INDEX IF EXISTS ix_device_status_severity",
+    "DROP INDEX IF EXISTS ix_device_status_last_seen",
+    "CREATE INDEX IF NOT EXISTS ix_device_status_rul_key "
+    f"ON device_status (COALESCE(predicted_rul, {FLEET_NULL_RUL}), device_id)",
+    "CREATE INDEX IF NOT EXISTS ix_device_status_severity_key "
+    f"ON device_status ((-severity), COALESCE(predicted_rul, {FLEET_NULL_RUL}), device_id)",
+    "CREATE INDEX IF NOT EXISTS ix_device_status_last_seen_key "
+    f"ON device_status (COALESCE(last_seen, '{FLEET_NULL_LAST_SEEN}'), device_id)",
+    "CREATE INDEX IF NOT EXISTS ix_device_status_type_status ON device_status (product_type, status)",
+    "CREATE INDEX IF NOT EXISTS ix_device_status_status ON device_status (status)",
+    "CREATE INDEX IF NOT EXISTS ix_device_status_updated_at ON device_status (updated_at)",
+]
+
+def upgrade_columns():
+    with engine.begin() as conn:
+        for table, column, column_type in COLUMN_UPGRADES:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {column_type}"))
+        for statement in SQL_UPGRADES:
+            conn.execute(text(statement))
 
 if __name__ == "__main__":
     print("Створення таблиць...")
     Base.metadata.create_all(bind=engine)
-    print("Таблиці успішно створено.")
\ No newline at end of file
+    upgrade_columns()
+    print("Таблиці успішно створено.")
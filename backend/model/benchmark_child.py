@@ -0,0 +1,108 @@
+"""
+Дочірній процес model_benchmark: один кандидат у свіжому інтерпретаторі.
+
+    python -m backend.model.benchmark_child <spec.json> <features.npz> <result.json>
+
+Модуль навмисно не імпортує нічого, крім стандартної бібліотеки й бекенда
+інференсу (quantized_model), тож import_s і RSS показують саме бекенд, а не
+pandas/sklearn з model_test. Тестові ознаки готує батьківський процес (npz),
+він же рахує метрики точності за повернутими прогнозами. rss_baseline_mb —
+пам'ять інтерпретатора до імпорту бекенда.
+"""
+import json
+import os
+import resource
+import sys
+import time
+
+
+def _peak_rss_mb():
+    # VmHWM — пік RSS поточного образу процесу. ru_maxrss у Linux переживає execve,
+    # тобто містив би пам'ять батьківського процесу (pandas), що нас запустив
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss у Linux — кілобайти
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_candidate(candidate, scaler_path, features_path, batch_sizes, single_row_samples, batch_repeats):
+    rss_baseline = _peak_rss_mb()
+
+    started = time.perf_counter()
+    from backend.app.services.quantized_model import load_precision
+    import_s = time.perf_counter() - started
+    rss_after_import = _peak_rss_mb()
+
+    import numpy as np
+
+    started = time.perf_counter()
+    model = load_precision(candidate["model_path"], scaler_path, candidate["backend"],
+                           version=candidate["version"], expected_sha256=candidate["sha256"])
+    load_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    model.warm_up()
+    warm_up_s = time.perf_counter() - started
+    rss_after_load = _peak_rss_mb()
+
+    with np.load(features_path) as data:
+        features = data["features"]
+
+    # Точність — на всьому наборі одним пакетом (метрики рахує батьківський процес)
+    y_pred = model.predict_batch(features)
+
+    # Затримка одного запису (шлях predictor: predict(feature_list))
+    timings = []
+    for i in range(single_row_samples):
+        row = features[i % len(features)].tolist()
+        t0 = time.perf_counter()
+        model.predict(row)
+        timings.append(time.perf_counter() - t0)
+
+    # Пропускна здатність: batch_repeats пакетів кожного розміру
+    throughput = {}
+    for size in batch_sizes:
+        total_rows = min(len(features), size * batch_repeats)
+        chunks = [features[i:i + size] for i in range(0, total_rows, size)]
+        t0 = time.perf_counter()
+        for chunk in chunks:
+            model.predict_batch(chunk, batch_size=size)
+        throughput[str(size)] = total_rows / (time.perf_counter() - t0)
+
+    return {
+        **candidate,
+        "y_pred": np.asarray(y_pred, dtype=float).ravel().tolist(),
+        "import_s": import_s,
+        "load_s": load_s,
+        "warm_up_s": warm_up_s,
+        "single_row_p50_ms": float(np.percentile(timings, 50) * 1000),
+        "single_row_p95_ms": float(np.percentile(timings, 95) * 1000),
+        "throughput_rows_per_s": throughput,
+        "rss_baseline_mb": rss_baseline,
+        "rss_after_import_mb": rss_after_import,
+        "rss_after_load_mb": rss_after_load,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def main():
+    spec_path, features_path, result_path = sys.argv[1:4]
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+    with open(spec_path) as f:
+        spec = json.load(f)
+    candidate = spec["candidate"]
+    try:
+        result = run_candidate(candidate, spec["scaler_path"], features_path, **spec["options"])
+    except Exception as e:
+        result = {**candidate, "error": f"{type(e).__name__}: {e}"}
+    with open(result_path, "w") as f:
+        json.dump(result, f)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Порівняльний бенчмарк RUL-моделей на тестовому наборі (на основі model_test.py).
+
+Кандидати — кожна версія з registry.json (і будь-який інший *.keras у цій
+папці) у кожному бекенді інференсу:
+  keras   — повна Keras-модель (float32);
+  float32 / float16 / int8 — NumPy-експорт (quantized_model.py).
+
+Кожен кандидат вимірюється в окремому інтерпретаторі з мінімальною точкою
+входу (benchmark_child.py), тож час завантаження (з імпортом бібліотек) і
+пікова пам'ять (RSS) не змішуються між бекендами і не містять pandas/sklearn
+цього модуля; базова RSS інтерпретатора звітується окремо і віднімається.
+
+Метрики: MAE/MSE/R², затримка одного запису (p50/p95), пропускна здатність
+predict_batch для кількох розмірів пакета, час імпорту та завантаження, пікова RSS
+(і вона ж без базової RSS інтерпретатора — model_rss_mb).
+Результати пишуться в JSON, а --baseline порівнює з попереднім запуском.
+
+Приклад:
+    python -m backend.model.model_benchmark --json bench.json
+    python -m backend.model.model_benchmark --backends float32,int8 --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from backend.model.model_test import MODEL_DIR, SCALER_PATH, TEST_DATA_PATH, load_test_data, compute_metrics
+
+BACKENDS = ["keras", "float32", "float16", "int8"]
+DEFAULT_BATCH_SIZES = [1, 32, 256, 2000]
+
+# Допуски для --baseline: гірше на стільки — регресія
+REGRESSION_TOLERANCE = {"mae": 0.05, "r2": 0.002, "latency": 0.25, "throughput": 0.25}
+
+
+def discover_candidates(backends):
+    """(version, шлях до .keras, sha256) з реєстру плюс незареєстровані .keras."""
+    from backend.app.services.model_registry import read_manifest, resolve_artifact
+
+    candidates = {}
+    for version, entry in read_manifest()["models"].items():
+        candidates[version] = (str(resolve_artifact(entry["path"])), entry.get("sha256"))
+    for path in sorted(MODEL_DIR.glob("*.keras")):
+        if str(path) not in {p for p, _ in candidates.values()}:
+            candidates[path.stem] = (str(path), None)
+
+    return [
+        {"version": version, "model_path": path, "sha256": sha256, "backend": backend}
+        for version, (path, sha256) in candidates.items()
+        for backend in backends
+    ]
+
+
+# --- Вимірювання в дочірньому процесі ---------------------------------------
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+def measure_isolated(candidate, options, features_path, y_true):
+    """
+    Запускає кандидата у свіжому інтерпретаторі з мінімальною точкою входу
+    (benchmark_child): без pandas/sklearn цього модуля, тож час імпорту і RSS
+    належать бекенду. Метрики точності — тут, за прогнозами дочірнього процесу.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        spec_path = os.path.join(tmp, "spec.json")
+        result_path = os.path.join(tmp, "result.json")
+        with open(spec_path, "w") as f:
+            json.dump({"candidate": candidate, "scaler_path": str(SCALER_PATH), "options": options}, f)
+        env = {**os.environ, "TF_CPP_MIN_LOG_LEVEL": os.environ.get("TF_CPP_MIN_LOG_LEVEL", "3")}
+        process = subprocess.run(
+            [sys.executable, "-m", "backend.model.benchmark_child", spec_path, str(features_path), result_path],
+            cwd=REPO_ROOT, env=env
+        )
+        try:
+            with open(result_path) as f:
+                result = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {**candidate, "error": f"process exited with code {process.returncode}"}
+
+    if "error" in result:
+        return result
+    metrics = compute_metrics(y_true, np.array(result.pop("y_pred")))
+    result.update(metrics)
+    # Пам'ять бекенда без самого інтерпретатора
+    result["model_rss_mb"] = result["peak_rss_mb"] - result["rss_baseline_mb"]
+    return result
+
+
+# --- Звіт -------------------------------------------------------------------
+
+def environment_info():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=MODEL_DIR).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+    }
+
+
+def print_table(results, batch_sizes):
+    header = (f"{'version':<18} {'backend':<8} {'MAE':>7} {'R²':>7} {'load s':>7} {'p50 ms':>8} {'p95 ms':>8} "
+              + " ".join(f"{'b=' + str(s):>10}" for s in batch_sizes) + f" {'RSS MB':>7} {'+RSS':>6}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        if "error" in r:
+            print(f"{r['version']:<18} {r['backend']:<8} ERROR: {r['error']}")
+            continue
+        throughput = " ".join(f"{r['throughput_rows_per_s'][str(s)]:10.0f}" for s in batch_sizes)
+        print(f"{r['version']:<18} {r['backend']:<8} {r['mae']:7.3f} {r['r2']:7.4f} "
+              f"{r['import_s'] + r['load_s']:7.2f} {r['single_row_p50_ms']:8.3f} {r['single_row_p95_ms']:8.3f} "
+              f"{throughput} {r['peak_rss_mb']:7.0f} {r['model_rss_mb']:6.0f}")
+    print("(b=N — rows/s для predict_batch з пакетами по N записів; load s — імпорт + завантаження;")
+    print(" +RSS — пікова RSS без базової RSS інтерпретатора)")
+
+
+def compare_with_baseline(results, baseline_results):
+    """Регресії відносно попереднього запуску для тих самих (version, backend)."""
+    baseline = {(r["version"], r["backend"]): r for r in baseline_results if "error" not in r}
+    regressions = []
+    for r in results:
+        old = baseline.get((r["version"], r["backend"]))
+        if old is None or "error" in r:
+            continue
+        key = f"{r['version']}/{r['backend']}"
+        if r["mae"] > old["mae"] + REGRESSION_TOLERANCE["mae"]:
+            regressions.append(f"{key}: MAE {old['mae']:.3f} -> {r['mae']:.3f}")
+        if r["r2"] < old["r2"] - REGRESSION_TOLERANCE["r2"]:
+            regressions.append(f"{key}: R² {old['r2']:.4f} -> {r['r2']:.4f}")
+        if r["single_row_p50_ms"] > old["single_row_p50_ms"] * (1 + REGRESSION_TOLERANCE["latency"]):
+            regressions.append(f"{key}: p50 {old['single_row_p50_ms']:.3f} -> {r['single_row_p50_ms']:.3f} ms")
+        for size, rate in r["throughput_rows_per_s"].items():
+            old_rate = old["throughput_rows_per_s"].get(size)
+            if old_rate and rate < old_rate * (1 - REGRESSION_TOLERANCE["throughput"]):
+                regressions.append(f"{key}: b={size} {old_rate:.0f} -> {rate:.0f} rows/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк RUL-моделей і бекендів інференсу")
+    parser.add_argument("--backends", type=str, default=",".join(BACKENDS), help="Бекенди через кому")
+    parser.add_argument("--versions", type=str, default=None, help="Лише ці версії (через кому)")
+    parser.add_argument("--batch-sizes", type=str, default=",".join(map(str, DEFAULT_BATCH_SIZES)))
+    parser.add_argument("--single-row-samples", type=int, default=200, help="Кількість вимірів predict()")
+    parser.add_argument("--batch-repeats", type=int, default=20, help="Пакетів на кожен розмір")
+    parser.add_argument("--json", type=str, default=None, help="Зберегти результати у JSON")
+    parser.add_argument("--baseline", type=str, default=None, help="JSON попереднього запуску для порівняння")
+    args = parser.parse_args()
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    batch_sizes = [int(s) for s in args.batch_sizes.split(",")]
+    candidates = discover_candidates(backends)
+    if args.versions:
+        versions = {v.strip() for v in args.versions.split(",")}
+        candidates = [c for c in candidates if c["version"] in versions]
+
+    options = {
+        "batch_sizes": batch_sizes,
+        "single_row_samples": args.single_row_samples,
+        "batch_repeats": args.batch_repeats,
+    }
+
+    # Тестовий набір читається один раз тут; дочірнім процесам — лише масив ознак
+    _, X, y_true = load_test_data(TEST_DATA_PATH, verbose=False)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        features_path = Path(tmp) / "features.npz"
+        np.savez(features_path, features=X.to_numpy(dtype=float))
+        for candidate in candidates:
+            print(f"[BENCH] {candidate['version']} / {candidate['backend']} ...", flush=True)
+            results.append(measure_isolated(candidate, options, features_path, y_true))
+
+    print()
+    print_table(results, batch_sizes)
+
+    report = {"environment": environment_info(), "options": options, "results": results}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nResults saved -> {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_with_baseline(results, json.load(f)["results"])
+        if regressions:
+            print("\nРегресії відносно baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            raise SystemExit(1)
+        print("\nРегресій відносно baseline немає")
+
+
+if __name__ == "__main__":
+    main()
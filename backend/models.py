@@ -1,5 +1,5 @@
 # backend/models.py
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Boolean, DateTime, ForeignKey, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from backend.app.database import Base
@@ -30,16 +30,115 @@ class SensorReading(Base):
     torque = Column(Float)
     tool_wear = Column(Float)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    # Порядковий номер і час відправки з симулятора (для вимірювання затримок)
+    seq = Column(BigInteger, nullable=True)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+    # Час отримання повідомлення consumer від брокера (трасування, tracing.py)
+    received_at = Column(DateTime(timezone=True), nullable=True)
 
     device = relationship("Device", back_populates="readings")
     prediction = relationship("Prediction", back_populates="reading", uselist=False)
 
+    __table_args__ = (
+        # Останні записи пристрою і курсор since_id (API графіків, відновлення WebSocket)
+        Index("ix_sensor_readings_device_id_id", "device_id", "id"),
+    )
+
 class Prediction(Base):
     __tablename__ = "predictions"
     id = Column(Integer, primary_key=True)
     reading_id = Column(Integer, ForeignKey("sensor_readings.id"))
     predicted_rul = Column(Float)
     class_failure_type = Column(String)
+    # Версія моделі, що зробила прогноз: різні версії для одного reading співіснують
+    model_version = Column(String, nullable=True)
+    # Прогноз робочої моделі (показується дашбордами); тіньові/кандидатні версії — False
+    is_primary = Column(Boolean, default=True, nullable=True)
+    # Відстань показника від базової лінії пристрою (anomaly_detector.py)
+    anomaly_score = Column(Float, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    reading = relationship("SensorReading", back_populates="prediction")
\ No newline at end of file
+    reading = relationship("SensorReading", back_populates="prediction")
+
+    __table_args__ = (
+        Index("uq_prediction_reading_version", "reading_id", "model_version", unique=True),
+        # Не більше одного робочого прогнозу на запис
+        Index("uq_prediction_reading_primary", "reading_id", unique=True,
+              postgresql_where=text("is_primary"), sqlite_where=text("is_primary")),
+    )
+
+class Alert(Base):
+    """Тривога по пристрою і типу відмови; рядок живе від відкриття до вирішення."""
+    __tablename__ = "alerts"
+    id = Column(Integer, primary_key=True)
+    device_id = Column(Integer, ForeignKey("devices.id"))
+    # Тип відмови (TWF, HDF, PWF, OSF, RNF) або RUL — низький прогноз ресурсу
+    alert_type = Column(String, nullable=False)
+    severity = Column(String, nullable=False)   # risk | emergency | critical
+    state = Column(String, nullable=False)      # open | resolved
+    message = Column(String)
+    occurrences = Column(Integer, default=1)
+    first_reading_id = Column(Integer, ForeignKey("sensor_readings.id"))
+    last_reading_id = Column(Integer, ForeignKey("sensor_readings.id"))
+    opened_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+    resolved_at = Column(DateTime(timezone=True), nullable=True)
+
+    device = relationship("Device")
+
+    __table_args__ = (
+        Index("ix_alerts_device_state", "device_id", "state"),
+    )
+
+# Значення ключів сортування огляду парку замість NULL (див. індекси DeviceStatus)
+FLEET_NULL_RUL = 1e9
+FLEET_NULL_LAST_SEEN = "9999-12-31 00:00:00+00"
+
+class DeviceStatus(Base):
+    """
+    Поточний стан пристрою — один рядок на пристрій, оновлюється при записі
+    (consumer — показники, predictor — прогноз). Оглядові запити по парку
+    читають цю таблицю, а не сканують sensor_readings.
+    """
+    __tablename__ = "device_status"
+    device_id = Column(Integer, ForeignKey("devices.id"), primary_key=True)
+    # Копія devices.product_type — фільтр огляду парку без з'єднання таблиць
+    product_type = Column(String, nullable=True)
+    # Останній показник (consumer)
+    reading_id = Column(Integer, nullable=True)
+    air_temp = Column(Float)
+    process_temp = Column(Float)
+    rotational_speed = Column(Float)
+    torque = Column(Float)
+    tool_wear = Column(Float)
+    # Відмова за правилами failure_detector для останнього показника (NULL — норма)
+    reading_failure = Column(String, nullable=True)
+    last_seen = Column(DateTime(timezone=True), nullable=True)
+    # Останній робочий прогноз (predictor)
+    prediction_reading_id = Column(Integer, nullable=True)
+    predicted_rul = Column(Float, nullable=True)
+    failure_type = Column(String, nullable=True)
+    anomaly_score = Column(Float, nullable=True)
+    # normal | risk | emergency — як determine_status (status.py)
+    status = Column(String, nullable=False, default="normal")
+    # Числовий порядок статусу (STATUS_SEVERITY) для сортування «найгірші першими»
+    severity = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    device = relationship("Device")
+
+    __table_args__ = (
+        # Огляд парку (/api/fleet): кожне сортування — прохід по своєму індексу,
+        # device_id — однозначний порядок для курсора сторінок. Ключі без NULL
+        # (NULL — найбільше значення) і в одному напрямі: курсор — порівняння
+        # рядків (ключі) > (курсор), тобто діапазон по індексу (routers/fleet.py)
+        Index("ix_device_status_rul_key", text(f"COALESCE(predicted_rul, {FLEET_NULL_RUL})"), "device_id"),
+        Index("ix_device_status_severity_key", text("(-severity)"), text(f"COALESCE(predicted_rul, {FLEET_NULL_RUL})"),
+              "device_id"),
+        Index("ix_device_status_last_seen_key", text(f"COALESCE(last_seen, '{FLEET_NULL_LAST_SEEN}')"), "device_id"),
+        # Фільтри і лічильники за статусом
+        Index("ix_device_status_type_status", "product_type", "status"),
+        Index("ix_device_status_status", "status"),
+        # Цикл розсилки live: пристрої, змінені з попереднього тіку
+        Index("ix_device_status_updated_at", "updated_at"),
+    )
@@ -1,98 +1,532 @@
+import argparse
+import csv
+import io
 import json
+import math
+import multiprocessing
+import signal
+import socket
 import time
+import tempfile
+import threading
+import uuid
+import zlib
+from pathlib import Path
+from types import SimpleNamespace
 import paho.mqtt.client as mqtt
+from sqlalchemy import exc, insert
 from sqlalchemy.orm import Session
 from backend.app.database import SessionLocal
 from backend.models import Device, SensorReading
-from datetime import datetime
+from backend.app.crud import upsert_device_status_reading
+from backend.app.services.failure_detector import detect_failure
+from datetime import datetime, timezone
 import traceback
 import os
+from backend.app.services import readiness
+from backend.app.services import metrics
+from backend.app.services import profiler
+from backend.app.services import payload_codec
+from backend.app.services.wal_spool import WalSpool
 
 MQTT_HOST = os.getenv("MQTT_HOST", "mosquitto")
 MQTT_PORT = int(os.getenv("MQTT_PORT", 1883))
 MQTT_TOPIC = "sensors/#"
 
+# Група процесів consumer: спільна підписка MQTT v5 і тема присутності учасників
+INGEST_GROUP = "ingest"
+SHARED_TOPIC = f"$share/{INGEST_GROUP}/{MQTT_TOPIC}"
+MEMBERS_TOPIC = f"{INGEST_GROUP}/members"
+# Позначки передачі пристроїв між учасниками (режим hash): ingest/handoff/<id>
+HANDOFF_TOPIC = f"{INGEST_GROUP}/handoff"
+# Скільки новий власник чекає на позначки попереднього, перш ніж забрати пристрої сам
+HANDOFF_TIMEOUT = float(os.getenv("HANDOFF_TIMEOUT", 10))
 
-def save_reading_to_db(data: dict):
-    """Зберігає одне вимірювання у БД."""
+# Локальний журнал кожного процесу: <SPOOL_DIR>/consumer-<номер>
+SPOOL_DIR = Path(os.getenv("SPOOL_DIR", Path(tempfile.gettempdir()) / "pdm-spool"))
 
-    db: Session = SessionLocal()
+# Короткий keepalive: брокер швидше публікує LWT і група перерозподіляє пристрої
+KEEPALIVE = 15
 
+REQUIRED_FIELDS = [
+    "device_uid", "product_type", "air_temp", "process_temp",
+    "rotational_speed", "torque", "tool_wear"
+]
+
+NUMERIC_FIELDS = ["air_temp", "process_temp", "rotational_speed", "torque", "tool_wear"]
+
+COPY_COLUMNS = [
+    "device_id", "air_temp", "process_temp", "rotational_speed", "torque", "tool_wear",
+    "seq", "sent_at", "received_at"
+]
+
+# Помилки зв'язку з БД: пакет журналу повторюється цілим. Решта помилок запису
+# вважаються помилками даних — журнал шукає поганий запис (dead-letter, wal_spool.py)
+TRANSIENT_DB_ERRORS = (exc.OperationalError, exc.InterfaceError, exc.DisconnectionError, exc.TimeoutError)
+
+
+class InvalidReading(ValueError):
+    """Поля повідомлення мають неправильний тип або значення."""
+
+
+def normalize_reading(data) -> dict:
+    """
+    Перевіряє і зводить типи полів до тих, що пише reading_row (на місці).
+    Перевірка йде до журналу: запис, що не вставиться в БД, не повинен
+    потрапити в журнал і зупиняти його перенесення.
+    """
+    if not isinstance(data, dict):
+        raise InvalidReading("payload is not an object")
+    for field in ("device_uid", "product_type"):
+        if not isinstance(data.get(field), str) or not data[field]:
+            raise InvalidReading(f"{field}: expected non-empty string, got {data.get(field)!r}")
     try:
-        # 1) Шукаємо пристрій
-        device = db.query(Device).filter(Device.device_uid == data["device_uid"]).first()
+        for field in NUMERIC_FIELDS:
+            value = float(data[field])
+            if not math.isfinite(value):
+                raise ValueError("not finite")
+            data[field] = value
+        if data.get("sent_at"):
+            field = "sent_at"
+            data[field] = float(data[field])
+            datetime.fromtimestamp(data[field], timezone.utc)
+        if data.get("seq") is not None:
+            field = "seq"
+            data[field] = int(data[field])
+            if not -2 ** 63 <= data[field] < 2 ** 63:
+                raise ValueError("out of BIGINT range")
+    except (TypeError, ValueError, OverflowError, OSError) as e:
+        raise InvalidReading(f"{field}: {data[field]!r} ({e})") from None
+    return data
+
+
+def reading_row(device_id: int, data: dict, received_at: float = None) -> dict:
+    """Показник у вигляді рядка для пакетної вставки в sensor_readings."""
+    return {
+        "device_id": device_id,
+        "air_temp": data["air_temp"],
+        "process_temp": data["process_temp"],
+        "rotational_speed": data["rotational_speed"],
+        "torque": data["torque"],
+        "tool_wear": data["tool_wear"],
+        # Поля трасування: порядковий номер і час відправки з пристрою
+        "seq": data.get("seq"),
+        "sent_at": datetime.fromtimestamp(data["sent_at"], timezone.utc) if data.get("sent_at") else None,
+        "received_at": datetime.fromtimestamp(received_at, timezone.utc) if received_at else None,
+    }
 
+
+class ReadingWriter:
+    """
+    Пише пакет показників із журналу (wal_spool.py) у sensor_readings
+    однією транзакцією. На PostgreSQL — через COPY, інакше — багаторядковим INSERT.
+    У тій самій транзакції оновлює device_status останнім показником кожного пристрою пакета.
+    """
+
+    def __init__(self):
+        self.device_ids = {}
+
+    def _device_id(self, db: Session, data: dict) -> int:
+        device_uid = data["device_uid"]
+        device_id = self.device_ids.get(device_uid)
+        if device_id is not None:
+            return device_id
+
+        device = db.query(Device).filter(Device.device_uid == device_uid).first()
         # Якщо не існує — створюємо
         if not device:
-            device = Device(
-                device_uid=data["device_uid"],
-                product_type=data["product_type"]
-            )
+            device = Device(device_uid=device_uid, product_type=data["product_type"])
             db.add(device)
             db.commit()
             db.refresh(device)
+        self.device_ids[device_uid] = device.id
+        return device.id
+
+    @staticmethod
+    def _copy(db: Session, rows) -> bool:
+        cursor = db.connection().connection.cursor()
+        if not hasattr(cursor, "copy_expert"):
+            return False
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            # Порожнє поле без лапок у CSV-режимі COPY — NULL
+            writer.writerow([
+                "" if row[column] is None else row[column].isoformat() if isinstance(row[column], datetime) else row[column]
+                for column in COPY_COLUMNS
+            ])
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY sensor_readings ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        return True
 
-        # 3) Створюємо вимірювання
-        reading = SensorReading(
-            device_id=device.id,
-            air_temp=data["air_temp"],
-            process_temp=data["process_temp"],
-            rotational_speed=data["rotational_speed"],
-            torque=data["torque"],
-            tool_wear=data["tool_wear"],
-        )
+    @staticmethod
+    def _update_status(db: Session, records, rows):
+        # Лише останній показник кожного пристрою: один upsert на пристрій, а не на рядок
+        latest = {}
+        for record, row in zip(records, rows):
+            latest[row["device_id"]] = (record["d"], row)
+        for device_id, (data, row) in latest.items():
+            reading = SimpleNamespace(**row, device=SimpleNamespace(product_type=data["product_type"]))
+            upsert_device_status_reading(db, device_id, row, failure=detect_failure(reading),
+                                         last_seen=row["received_at"], product_type=data["product_type"])
 
-        db.add(reading)
-        db.commit()
+    def write(self, records):
+        """records — записи журналу {"d": повідомлення, "r": час отримання}."""
+        db: Session = SessionLocal()
+        try:
+            rows = [reading_row(self._device_id(db, record["d"]), record["d"], record["r"]) for record in records]
+            if db.bind.dialect.name != "postgresql" or not self._copy(db, rows):
+                db.execute(insert(SensorReading), rows)
+            self._update_status(db, records, rows)
+            with metrics.DB_FLUSH_SECONDS.labels("consumer").time():
+                db.commit()
+            metrics.DB_FLUSH_ROWS.labels("consumer").observe(len(rows))
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
 
-    except Exception as e:
-        print("DB save error:", e)
-        traceback.print_exc()
 
-    finally:
-        db.close()
+class Partitioner:
+    """
+    Розподіл пристроїв між живими процесами групи (rendezvous hashing):
+    пристрій належить учаснику з найбільшим crc32(учасник/пристрій). Усі
+    повідомлення одного пристрою обробляє один процес — порядок зберігається
+    (під час перерозподілу — завдяки передачі пристроїв, див. IngestConsumer).
+    Коли учасник зникає, переходять лише його пристрої.
+    """
 
+    def __init__(self, member_id: str, on_rebalance=None):
+        self.member_id = member_id
+        # Сам процес потрапляє в склад лише з відлунням власного оголошення
+        self.members = set()
+        self.on_rebalance = on_rebalance
+        self._owned = {}
 
-def on_connect(client, userdata, flags, rc):
-    print(f"Connected to MQTT with code {rc}")
-    client.subscribe(MQTT_TOPIC)
+    @staticmethod
+    def owner(device_uid: str, members):
+        if not members:
+            return None
+        return max(members, key=lambda member: zlib.crc32(f"{member}/{device_uid}".encode()))
 
+    def owns(self, device_uid: str) -> bool:
+        owned = self._owned.get(device_uid)
+        if owned is None:
+            owned = self._owned[device_uid] = self.owner(device_uid, self.members) == self.member_id
+        return owned
 
-def on_message(client, userdata, msg):
-    try:
-        payload = msg.payload.decode()
-        data = json.loads(payload)
-
-        # перевірка обов'язкових полів
-        required = [
-            "device_uid", "product_type", "air_temp", "process_temp",
-            "rotational_speed", "torque", "tool_wear"
-        ]
-        if not all(k in data for k in required):
-            print("Invalid payload:", data)
+    def update(self, member: str, alive: bool):
+        if (member in self.members) == alive:
             return
+        previous = frozenset(self.members)
+        if alive:
+            self.members.add(member)
+        else:
+            self.members.discard(member)
+        self._owned = {}
+        print(f"[INGEST] Rebalanced: {len(self.members)} consumer(s) {sorted(self.members)}")
+        if self.on_rebalance:
+            self.on_rebalance(previous)
 
-        save_reading_to_db(data)
 
+class IngestConsumer:
+    """
+    Один процес групи consumer.
 
-    except Exception as e:
-        print("Error while handling MQTT message:", e)
-        traceback.print_exc()
+    mode="hash" (за замовчуванням): кожен процес підписаний на sensors/#,
+    але зберігає лише свої пристрої (Partitioner). Склад групи — retained
+    повідомлення ingest/members/<id>; LWT з порожнім retained payload
+    прибирає процес, що зник без відключення.
 
+    Передача пристроїв при зміні складу (один брокер доставляє повідомлення
+    кожному підписнику в тому порядку, в якому їх маршрутизує):
+      вступ        — процес спершу підписується на sensors/#, і лише після SUBACK
+                     оголошує себе; склад вважається відомим з відлунням
+                     власного оголошення (retained інших уже прийшли);
+      старий       — публікує позначку cut і приймає пристрої, що відходять,
+      власник        доки не отримає її відлуння: далі їх приймає новий. Потім
+                     переносить журнал у БД і публікує позначку drained;
+      новий        — буферизує в пам'яті повідомлення пристроїв, що переходять;
+      власник        на cut відкидає буфер (це записав старий власник), на drained
+                     переносить буфер у журнал і далі пише напряму. Без позначок
+                     за HANDOFF_TIMEOUT (старий власник упав) забирає пристрої сам;
+      вихід        — штатна зупинка так само віддає пристрої і лише потім відключається.
+    Якщо процес упав, повідомлення його пристроїв губляться до LWT
+    (до 1,5 × KEEPALIVE), а неперенесений журнал дописується в БД після
+    перезапуску цього слота — вже не в порядку з новими записами.
 
-def run():
-    client = mqtt.Client()
+    mode="shared": спільна підписка MQTT v5 $share/ingest/sensors/#, брокер
+    сам розподіляє повідомлення між процесами. Рівномірніше і без зайвого
+    трафіку, але порядок повідомлень одного пристрою між процесами не гарантується.
+    """
 
-    client.on_connect = on_connect
-    client.on_message = on_message
+    def __init__(self, mode: str = "hash", index: int = 0, batch_size: int = 1000,
+                 flush_interval: float = 0.2, spool_max_bytes: int = 1024 * 1024 * 1024):
+        self.mode = mode
+        self.index = index
+        # Стабільний id слота: перезапущений процес займає той самий retained-топік
+        # і ті самі пристрої, а не з'являється в групі поряд зі своїм LWT-привидом
+        self.member_id = f"{socket.gethostname()}-{index}"
+        # Payload оголошення: відрізняє відлуння від retained попереднього запуску слота
+        self.incarnation = uuid.uuid4().hex
+        self.component = f"consumer-{index}"
+        # Повідомлення -> журнал на диску -> пакети в БД (фоновий потік)
+        self.writer = ReadingWriter()
+        self.spool = WalSpool(SPOOL_DIR / f"consumer-{index}", self.writer.write, max_bytes=spool_max_bytes,
+                              batch_size=batch_size, drain_interval=flush_interval,
+                              transient_errors=TRANSIENT_DB_ERRORS)
+        self.partitioner = Partitioner(self.member_id, on_rebalance=self.on_rebalance)
+        # Передача пристроїв (лише потік paho), по запису на кожну зміну складу:
+        # що віддаємо {"previous", "members"} і що забираємо {"giver", "previous", "members", "deadline", "buffer"}
+        self.handing_off = []
+        self.taking_over = []
+        # Склади, для яких cut уже повернувся, а drained чекає на завершення власних takeover
+        self.pending_acks = []
+        self.subscribe_mid = None
+        self.client = None
+        self.stopping = False
 
-    while True:
+    def member_topic(self, member_id: str = None) -> str:
+        return f"{MEMBERS_TOPIC}/{member_id or self.member_id}"
+
+    def on_connect(self, client, userdata, flags, rc, properties=None):
+        print(f"Connected to MQTT with code {rc} ({self.mode}, member {self.member_id})")
+        if self.mode == "shared":
+            client.subscribe(SHARED_TOPIC, qos=1)
+        else:
+            # Відлуння cut, надіслані до розриву, вже не прийдуть: передачу завершуємо так
+            self.pending_acks += [handoff["members"] for handoff in self.handing_off]
+            self.handing_off = []
+            self.start_acks()
+            # Оголошення — лише після SUBACK (on_subscribe): до нього ніхто
+            # не віддає нам пристрої, тож повідомлення не губляться
+            _, self.subscribe_mid = client.subscribe(
+                [(f"{MEMBERS_TOPIC}/+", 1), (f"{HANDOFF_TOPIC}/+", 1), (MQTT_TOPIC, 1)]
+            )
+        readiness.set_status(self.component, rc == 0, broker=f"{MQTT_HOST}:{MQTT_PORT}", mode=self.mode)
+
+    def on_subscribe(self, client, userdata, mid, granted_qos, properties=None):
+        if mid == self.subscribe_mid and not self.stopping:
+            client.publish(self.member_topic(), self.incarnation, qos=1, retain=True)
+
+    def on_disconnect(self, client, userdata, rc, properties=None):
+        readiness.set_status(self.component, False, detail=f"disconnected ({rc})")
+
+    # --- передача пристроїв (режим hash) -----------------------------------------
+
+    def on_member(self, member: str, payload: bytes):
+        if member == self.member_id and payload and payload.decode() != self.incarnation:
+            # retained попереднього запуску цього слота
+            return
+        self.partitioner.update(member, bool(payload))
+
+    def on_rebalance(self, previous):
+        members = sorted(self.partitioner.members)
+        if self.member_id in previous:
+            # Пристрої, що відходять, приймаємо до відлуння власної позначки cut
+            self.handing_off.append({"previous": previous, "members": members})
+            self.publish_handoff("cut", members)
+        if self.member_id in self.partitioner.members:
+            # Вступили самі — забираємо в усіх; вийшов інший — лише в нього
+            givers = previous if self.member_id not in previous else previous - self.partitioner.members
+            deadline = time.time() + HANDOFF_TIMEOUT
+            for giver in sorted(givers):
+                self.taking_over.append({"giver": giver, "previous": previous, "members": members,
+                                         "deadline": deadline, "buffer": []})
+
+    def publish_handoff(self, phase: str, members):
+        self.client.publish(f"{HANDOFF_TOPIC}/{self.member_id}",
+                            json.dumps({"phase": phase, "members": members}), qos=1)
+
+    def on_handoff(self, giver: str, payload: bytes):
+        try:
+            marker = json.loads(payload)
+            phase, members = marker["phase"], marker["members"]
+        except (ValueError, TypeError, KeyError) as e:
+            print(f"[INGEST] Invalid handoff marker from {giver}: {e}")
+            return
+        if giver == self.member_id:
+            for handoff in self.handing_off:
+                if phase == "cut" and members == handoff["members"]:
+                    # Усе, що брокер надіслав до позначки, уже в журналі або в буфері takeover;
+                    # далі пристрої приймає новий власник
+                    self.handing_off.remove(handoff)
+                    self.pending_acks.append(members)
+                    self.start_acks()
+                    break
+            return
+        for index, handoff in enumerate(self.taking_over):
+            if handoff["giver"] != giver or handoff["members"] != members:
+                continue
+            if phase == "cut":
+                # Отримане до позначки записує попередній власник
+                handoff["buffer"].clear()
+            elif phase == "drained":
+                # drained покриває і попередні зміни складу: журнал перенесено до цієї позначки
+                for earlier in [h for h in self.taking_over[:index + 1] if h["giver"] == giver]:
+                    self.finish_takeover(earlier)
+            break
+
+    def start_acks(self):
+        # Буфер ще не завершеної передачі до нас має потрапити в журнал раніше, ніж
+        # ми оголосимо drained: інакше наступний власник випередить ці записи
+        if self.taking_over:
+            return
+        for members in self.pending_acks:
+            threading.Thread(target=self.drain_and_ack, args=(members,), daemon=True, name="handoff-drain").start()
+        self.pending_acks = []
+
+    def drain_and_ack(self, members):
+        """
+        Потік передачі: журнал у БД до поточної позиції (отримане до відлуння cut),
+        потім позначка drained; якщо це вихід із групи — відключення.
+        """
+        deadline = time.time() + HANDOFF_TIMEOUT
         try:
-            client.connect(MQTT_HOST, MQTT_PORT, 60)
-            client.loop_forever()
+            self.spool.sync()
+            position = self.spool.durable
+            while self.spool.checkpoint < position:
+                try:
+                    if not self.spool.drain_once():
+                        break
+                except Exception as e:
+                    if time.time() > deadline:
+                        print(f"[INGEST] Handoff drain failed, new owners will take over on timeout: {e}")
+                        return
+                    time.sleep(0.5)
+            self.publish_handoff("drained", members)
+        finally:
+            if self.stopping and self.member_id not in members:
+                self.disconnect()
+
+    def finish_takeover(self, handoff, timed_out: bool = False):
+        self.taking_over.remove(handoff)
+        for record in handoff["buffer"]:
+            self.spool.append(record)
+        if timed_out:
+            print(f"[INGEST] No handoff from {handoff['giver']} in {HANDOFF_TIMEOUT:.0f}s, "
+                  f"taking over with {len(handoff['buffer'])} buffered message(s)")
+        else:
+            print(f"[INGEST] Handoff from {handoff['giver']} complete, {len(handoff['buffer'])} buffered message(s)")
+        self.start_acks()
+
+    def expire_takeovers(self, now: float):
+        for handoff in list(self.taking_over):
+            if now > handoff["deadline"]:
+                self.finish_takeover(handoff, timed_out=True)
+
+    def target(self, device_uid: str):
+        """Куди йде повідомлення пристрою в режимі hash: журнал, буфер передачі або нікуди (None)."""
+        if not self.partitioner.owns(device_uid):
+            # Пристрій відходить: приймаємо до відлуння cut
+            if not any(Partitioner.owner(device_uid, handoff["previous"]) == self.member_id
+                       for handoff in self.handing_off):
+                return None
+        for handoff in self.taking_over:
+            if (Partitioner.owner(device_uid, handoff["previous"]) == handoff["giver"]
+                    and Partitioner.owner(device_uid, handoff["members"]) == self.member_id):
+                # Пристрій перейшов до нас у цій зміні складу, і передача ще триває
+                return handoff["buffer"]
+        return self.spool
+
+    # --- повідомлення ----------------------------------------------------------
+
+    def on_message(self, client, userdata, msg):
+        received_at = time.time()
+        if self.taking_over:
+            self.expire_takeovers(received_at)
+        if msg.topic.startswith(MEMBERS_TOPIC + "/"):
+            self.on_member(msg.topic.rsplit("/", 1)[-1], msg.payload)
+            return
+        if msg.topic.startswith(HANDOFF_TOPIC + "/"):
+            self.on_handoff(msg.topic.rsplit("/", 1)[-1], msg.payload)
+            return
+
+        target = self.spool
+        if self.mode == "hash":
+            target = self.target(msg.topic.split("/")[1])
+            if target is None:
+                return
+
+        metrics.MESSAGES_RECEIVED.inc()
+        try:
+            if payload_codec.is_binary_topic(msg.topic):
+                # Двійковий запис фіксованої схеми: усі поля вже на місці
+                data = payload_codec.decode(msg.payload, payload_codec.device_uid_from_topic(msg.topic))
+            else:
+                data = json.loads(msg.payload.decode())
+
+                # перевірка обов'язкових полів
+                if isinstance(data, dict) and not all(k in data for k in REQUIRED_FIELDS):
+                    print("Invalid payload:", data)
+                    metrics.MESSAGES_REJECTED.labels("missing_fields").inc()
+                    return
+
+            normalize_reading(data)
+            metrics.MESSAGES_PARSED.inc()
+            target.append({"d": data, "r": received_at})
+
+        except InvalidReading as e:
+            print("Invalid payload:", e)
+            metrics.MESSAGES_REJECTED.labels("invalid_types").inc()
+        except (UnicodeDecodeError, json.JSONDecodeError, payload_codec.PayloadError) as e:
+            print("Error while handling MQTT message:", e)
+            metrics.MESSAGES_REJECTED.labels("malformed").inc()
         except Exception as e:
-            print("MQTT connection error, reconnecting in 3 sec:", e)
-            time.sleep(3)
+            print("Error while handling MQTT message:", e)
+            traceback.print_exc()
+
+    def run(self):
+        protocol = mqtt.MQTTv5 if self.mode == "shared" else mqtt.MQTTv311
+        client = mqtt.Client(client_id=self.member_id, protocol=protocol)
+        if self.mode == "hash":
+            client.will_set(self.member_topic(), "", qos=1, retain=True)
+
+        client.on_connect = self.on_connect
+        client.on_subscribe = self.on_subscribe
+        client.on_disconnect = self.on_disconnect
+        client.on_message = self.on_message
+        self.client = client
+        self.spool.start()
+
+        try:
+            while not self.stopping:
+                try:
+                    client.connect(MQTT_HOST, MQTT_PORT, KEEPALIVE)
+                    client.loop_forever()
+                    return
+                except Exception as e:
+                    if self.stopping:
+                        return
+                    print("MQTT connection error, reconnecting in 3 sec:", e)
+                    time.sleep(3)
+        finally:
+            # Мережевий цикл завершено — нових повідомлень уже не буде
+            self.spool.close()
+
+    def stop(self, *args):
+        """
+        Штатне завершення. У режимі hash процес виходить із групи і віддає
+        пристрої (on_rebalance -> cut -> drained), а відключається вже з
+        drain_and_ack; якщо брокер не відповідає — за таймером. Журнал
+        закривається після мережевого циклу (у run).
+        """
+        self.stopping = True
+        if self.client is None:
+            return
+        if self.mode == "hash" and self.member_id in self.partitioner.members:
+            self.client.publish(self.member_topic(), "", qos=1, retain=True)
+            timer = threading.Timer(3 * HANDOFF_TIMEOUT, self.disconnect)
+            timer.daemon = True
+            timer.start()
+            return
+        self.disconnect()
+
+    def disconnect(self):
+        self.client.disconnect()
+        self.client.loop_stop()
+
 
 async def async_notify():
     from backend.app.routers.live import notify_new_reading
@@ -106,6 +540,65 @@ async def async_notify():
     if "error" not in latest_data:
         await notify_new_reading(latest_data)
 
+
+def run_worker(index: int, args):
+    consumer = IngestConsumer(args.mode, index, args.batch_size, args.flush_interval,
+                              spool_max_bytes=args.spool_max_mb * 1024 * 1024)
+    signal.signal(signal.SIGTERM, consumer.stop)
+    readiness.set_status(consumer.component, False, detail="connecting")
+    # 9101, 9111, 9121... — не перетинається з портом predictor (9102)
+    metrics.start_metrics_server(9101, offset=10 * index)
+    profiler.install_signal_handler(consumer.component)
+    consumer.run()
+
+
+def run_group(args):
+    """N процесів consumer; процес, що впав, перезапускається через 3 с."""
+    ctx = multiprocessing.get_context("spawn")
+    workers = {}
+
+    def spawn(index):
+        process = ctx.Process(target=run_worker, args=(index, args), name=f"consumer-{index}")
+        process.start()
+        workers[index] = process
+
+    def shutdown(signum, frame):
+        for process in workers.values():
+            process.terminate()
+        for process in workers.values():
+            process.join(timeout=5)
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    for index in range(args.processes):
+        spawn(index)
+    while True:
+        time.sleep(3)
+        for index, process in list(workers.items()):
+            if not process.is_alive():
+                print(f"[INGEST] consumer-{index} exited ({process.exitcode}), restarting")
+                spawn(index)
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MQTT consumer: показники -> sensor_readings")
+    parser.add_argument("--processes", type=int, default=int(os.getenv("CONSUMER_PROCESSES", 1)),
+                        help="Кількість процесів consumer")
+    parser.add_argument("--mode", choices=["hash", "shared"], default=os.getenv("CONSUMER_MODE", "hash"),
+                        help="hash — розподіл пристроїв за хешем (порядок зберігається); "
+                             "shared — спільна підписка MQTT v5")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Максимальний розмір пакета вставки")
+    parser.add_argument("--flush-interval", type=float, default=0.2, help="Максимальна затримка пакета (с)")
+    parser.add_argument("--spool-max-mb", type=int, default=1024,
+                        help="Ліміт локального журналу на процес (МБ); понад нього видаляються найстаріші сегменти")
+    args = parser.parse_args()
+
     print("MQTT Consumer started. Listening for messages...")
-    run()
+    # Файли готовності попереднього запуску (можливо, з більшою кількістю процесів)
+    readiness.clear_status("consumer")
+    if args.processes > 1:
+        run_group(args)
+    else:
+        run_worker(0, args)
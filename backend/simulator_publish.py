@@ -3,12 +3,14 @@ import random
 import time
 import threading
 import argparse
+import heapq
 from datetime import datetime, timezone
 import numpy as np
 import sys
 import signal
 import paho.mqtt.client as mqtt
 from typing import Dict, Tuple, Optional
+from backend.app.services import payload_codec
 
 # -----------------------------
 # Конфігураційні параметри симуляції
@@ -43,6 +45,9 @@ PRODUCT_VARIANTS = {
 # Знос інструменту множник
 WEAR_MULTIPLIER = 1.0
 
+# Формат MQTT-повідомлень: json або binary (payload_codec.py, тема <prefix>/<uid>/bin)
+PAYLOAD_FORMAT = "json"
+
 # -----------------------------
 # Симулятор промислових датчиків
 # -----------------------------
@@ -521,13 +526,20 @@ def apply_post_failure_behavior(air, process, speed, torque, wear, failure_type,
 # Публікація даних пристрою
 # -----------------------------
 
+def encode_message(topic_prefix, data):
+    # (тема, payload) у форматі PAYLOAD_FORMAT
+    if PAYLOAD_FORMAT == "binary":
+        return payload_codec.binary_topic(topic_prefix, data["device_uid"]), payload_codec.encode(data)
+    return f"{topic_prefix}/{data['device_uid']}", json.dumps(data)
+
+
 class DevicePublisher(threading.Thread):
     def __init__(self, device_uid, interval, mqtt_client=None, mqtt_topic_prefix="sensors"):
         super().__init__(daemon=True)
         self.device_uid = device_uid
         self.interval = interval
         self.mqtt_client = mqtt_client
-        self.mqtt_topic = f"{mqtt_topic_prefix}/{device_uid}"
+        self.mqtt_topic_prefix = mqtt_topic_prefix
         self.stop_event = threading.Event()
         self.state = EquipmentState(device_uid)
         
@@ -615,14 +627,15 @@ class DevicePublisher(threading.Thread):
         while not self.stop_event.is_set():
             data = self.generate_sensor_data()
             if data:
-                json_data = json.dumps(data)
+                # Час відправки для трасування затримки (tracing.py)
+                data["sent_at"] = time.time()
                 if self.mqtt_client:
                     try:
-                        self.mqtt_client.publish(self.mqtt_topic, json_data, qos=1)
+                        self.mqtt_client.publish(*encode_message(self.mqtt_topic_prefix, data), qos=1)
                     except Exception as e:
                         print(f"[{self.device_uid}] MQTT publish error: {e}")
                 else:
-                    print(f"{self.device_uid}: {json_data}")
+                    print(f"{self.device_uid}: {json.dumps(data)}")
             
             self.current_index += 1
             if self.stop_event.wait(timeout=self.interval):
@@ -660,6 +673,787 @@ class DevicePublisher(threading.Thread):
         else:
             return {"status": "error", "message": f"Невідома команда: {action}"}
 
+# -----------------------------
+# Векторизований рушій флоту
+# -----------------------------
+
+SCENARIO_NAMES = list(scenario_funcs.keys())
+SCENARIO_INDEX = {name: i for i, name in enumerate(SCENARIO_NAMES)}
+SCENARIO_ARRAY = np.array(SCENARIO_NAMES)
+VARIANT_NAMES = np.array(list(PRODUCT_VARIANTS.keys()))
+VARIANT_PROBS = np.array([data["prob"] for data in PRODUCT_VARIANTS.values()])
+
+# Коди відмов (порядок = пріоритет перевірки в detect_failure)
+FAILURE_NAMES = np.array(["Normal", "TWF", "OSF", "HDF", "PWF", "RNF"])
+
+# Пороги/коефіцієнти, проіндексовані кодом варіанту продукту
+OSF_LIMITS = np.array([OSF_THRESHOLDS.get(v, 11000) for v in VARIANT_NAMES], dtype=float)
+WEAR_RATES = np.array([WEAR_VARIANTS[v] for v in VARIANT_NAMES], dtype=float)
+
+# Падіння швидкості/моменту після поломки, проіндексовані кодом відмови
+# (ті самі коефіцієнти, що в apply_post_failure_behavior)
+POST_FAILURE_SPEED_DROP = np.array([0.9, 0.8, 0.9, 1.0, 0.6, 0.9])
+POST_FAILURE_TORQUE_DROP = np.array([0.9, 0.9, 0.9, 0.7, 0.8, 0.9])
+
+RPM_TO_RAD = 2 * np.pi / 60
+
+
+def detect_failure_batch(air, process, speed, torque, wear, variant, twf_limit, rnf_allowed, rng):
+    """
+    Векторна версія detect_failure для масивів усіх пристроїв.
+    Повертає масив кодів відмов (індекси FAILURE_NAMES, 0 = Normal).
+    """
+    power = torque * speed * RPM_TO_RAD
+    temp_diff = process - air
+
+    conditions = [
+        wear >= twf_limit,
+        (wear * torque) > OSF_LIMITS[variant],
+        (temp_diff < HDF_TEMP_DIFF) & (speed < HDF_RPM_THRESHOLD),
+        (power < PWF_POWER_MIN) | (power > PWF_POWER_MAX),
+        rnf_allowed & (rng.random(len(air)) < RNF_PROB),
+    ]
+    return np.select(conditions, [1, 2, 3, 4, 5], default=0).astype(np.int8)
+
+
+def apply_post_failure_batch(air, process, speed, torque, failure_code, time_after_failure):
+    # Векторна версія apply_post_failure_behavior
+    decay = np.minimum(1.0, time_after_failure / 20.0)
+
+    new_speed = np.maximum(0, speed * (1 - decay * POST_FAILURE_SPEED_DROP[failure_code]))
+    new_torque = np.maximum(0, torque * (1 - decay * POST_FAILURE_TORQUE_DROP[failure_code]))
+
+    new_process = process - np.minimum(20, time_after_failure * 0.8)
+    new_air = air - np.minimum(10, time_after_failure * 0.3)
+
+    return (
+        np.maximum(295, new_air),
+        np.maximum(new_air + 5, new_process),
+        new_speed,
+        new_torque
+    )
+
+
+class FleetSimulator:
+    """
+    Симулює весь флот як матрицю станів NumPy.
+
+    Замість окремого потоку та 2000-елементних масивів сценарію на кожен
+    пристрій, стан зберігається в масивах довжини num_devices, а step()
+    просуває всі пристрої на один такт: шум, накопичення зносу, перевірка
+    відмов і поведінка після поломки рахуються над масивами одразу.
+    """
+
+    def __init__(self, num_devices: int, data_length: int = 2000, seed: int = None, scenario: str = None):
+        self.num_devices = num_devices
+        self.data_length = data_length
+        self.rng = np.random.default_rng(seed)
+        self.lock = threading.Lock()
+
+        self.device_uids = [f"dev-{i}" for i in range(1, num_devices + 1)]
+        self.index_by_uid = {uid: i for i, uid in enumerate(self.device_uids)}
+
+        n = num_devices
+        self.scenario = np.zeros(n, dtype=np.int8)
+        self.variant = np.zeros(n, dtype=np.int8)
+        self.twf_limit = np.zeros(n)
+        self.accumulated_wear = np.zeros(n)
+        self.base_wear = np.zeros(n)
+        self.base_air = np.zeros(n)
+        self.tick = np.zeros(n, dtype=np.int64)
+        self.pwf_high = np.zeros(n, dtype=bool)
+        self.stress_wear = np.zeros(n)
+        self.is_failed = np.zeros(n, dtype=bool)
+        self.failure_code = np.zeros(n, dtype=np.int8)
+        self.failure_time = np.zeros(n)
+
+        if scenario:
+            scenarios = np.full(n, SCENARIO_INDEX[scenario])
+        else:
+            scenarios = self.rng.integers(0, len(SCENARIO_NAMES), n)
+        self.reset(np.arange(n), scenarios)
+
+    def reset(self, idx, scenarios):
+        # Повне скидання стану вибраних пристроїв (аналог EquipmentState.reset)
+        k = len(idx)
+        self.scenario[idx] = scenarios
+        self.variant[idx] = self.rng.choice(len(VARIANT_NAMES), size=k, p=VARIANT_PROBS)
+        self.twf_limit[idx] = self.rng.integers(TWF_MIN, TWF_MAX + 1, k)
+        self.accumulated_wear[idx] = 0.0
+        self.base_wear[idx] = 0.0
+        self.base_air[idx] = 300.0
+        self.tick[idx] = 0
+        self.pwf_high[idx] = self.rng.random(k) > 0.5
+        self.stress_wear[idx] = self.rng.uniform(150, 180, k)
+        self.is_failed[idx] = False
+        self.failure_code[idx] = 0
+        self.failure_time[idx] = 0.0
+
+    def _base_signals(self, idx):
+        # Базові сигнали сценаріїв на поточному такті (те, що scenario_funcs
+        # генерують наперед масивами, тут рахується для всіх пристроїв idx разом)
+        n = len(idx)
+        rng = self.rng
+        scenario = self.scenario[idx]
+        tick = self.tick[idx]
+        position = tick % self.data_length
+        phase = position / self.data_length
+        base_wear = self.base_wear[idx]
+
+        def scenario_mask(name, start=None):
+            mask = scenario == SCENARIO_INDEX[name]
+            if start is not None:
+                mask &= phase >= start
+            return mask
+
+        # Початок нового циклу сценарію — базовий знос починається з нуля
+        base_wear[(position == 0) & (tick > 0)] = 0.0
+
+        # Нормальна робота (IndustrialSensorSimulator.generate_normal_operation)
+        air = np.clip(self.base_air[idx] + rng.normal(0, 2.0 * 0.3, n), 295, 305)
+        self.base_air[idx] = air
+        process = air + 10 + rng.normal(0, 1.0, n)
+        speed = np.clip(rng.normal(1500, 50, n), 1200, 2800)
+        torque = np.clip(rng.normal(40, 5, n), 10, 70)
+        wear_increment = 0.1 + rng.normal(0, 0.02, n)
+
+        # TWF: прискорений знос до 200 з підвищеними обертами та моментом
+        m = scenario_mask("twf")
+        k = int(m.sum())
+        if k:
+            speed[m] = np.clip(rng.normal(1800, 75, k), 1500, 2800)
+            torque[m] = np.clip(rng.normal(52, 6, k), 20, 70)
+            wear_increment[m] = 0.5 + rng.normal(0, 0.05, k)
+            wear_increment[m & (base_wear >= 200)] = 0.0
+
+        base_wear += wear_increment
+        self.base_wear[idx] = base_wear
+        wear = base_wear.copy()
+
+        # Normal: корекція потужності та умов HDF, як у scenario_normal
+        m = scenario_mask("normal")
+        if m.any():
+            power = torque * speed * RPM_TO_RAD
+            low = m & (power < 3550)
+            high = m & (power > 8950)
+            torque[low] = 3600 / (speed[low] * RPM_TO_RAD)
+            torque[high] = 8900 / (speed[high] * RPM_TO_RAD)
+            hdf = m & ((process - air) < 8.7) & (speed < 1390)
+            process[hdf] = air[hdf] + 9.0
+
+        # HDF: після 70% циклу низькі оберти та мала різниця температур
+        m = scenario_mask("hdf", 0.7)
+        k = int(m.sum())
+        if k:
+            speed[m] = rng.uniform(1100, 1350, k)
+            process[m] = air[m] + rng.uniform(2.0, 8.0, k)
+
+        # PWF: після 80% циклу потужність виходить за межі
+        m = scenario_mask("pwf", 0.8)
+        pwf_high = self.pwf_high[idx]
+        for mode_mask, speed_range, power_range in (
+            (m & pwf_high, (2800, 3000), (9100, 10000)),
+            (m & ~pwf_high, (1200, 1300), (2000, 3400)),
+        ):
+            k = int(mode_mask.sum())
+            if k:
+                speed[mode_mask] = rng.uniform(*speed_range, k)
+                torque[mode_mask] = rng.uniform(*power_range, k) / (speed[mode_mask] * RPM_TO_RAD)
+
+        # OSF: після 60% циклу знос лінійно росте до 200, момент під поріг
+        m = scenario_mask("osf", 0.6)
+        k = int(m.sum())
+        if k:
+            start_wear = 0.1 * 0.6 * self.data_length
+            wear[m] = start_wear + (200 - start_wear) * (phase[m] - 0.6) / 0.4
+            torque[m] = np.clip(11000 / np.maximum(wear[m], 1e-6) + 5.0, 0, 80) + rng.normal(0, 1.0, k)
+
+        # Worn stress: високий знос, момент і оберти в безпечних межах
+        m = scenario_mask("worn_stress")
+        k = int(m.sum())
+        if k:
+            wear[m] = self.stress_wear[idx][m] + 2 * phase[m]
+            torque[m] = np.clip(rng.normal(48, 2, k), 42, 53)
+            speed[m] = rng.normal(1450, 15, k)
+
+        return air, process, speed, torque, wear
+
+    def step(self, now: float = None, idx=None) -> dict:
+        """
+        Просуває пристрої idx (за замовчуванням — увесь флот) на один такт.
+        Повертає пакет: dict колонок-масивів довжини len(idx)
+        та позиції (у пакеті) пристроїв, які зламались на цьому такті.
+        """
+        now = time.time() if now is None else now
+        idx = np.arange(self.num_devices) if idx is None else np.asarray(idx)
+        n = len(idx)
+        rng = self.rng
+
+        with self.lock:
+            air, process, speed, torque, base_wear = self._base_signals(idx)
+
+            variant = self.variant[idx]
+            scenario = self.scenario[idx]
+            is_failed = self.is_failed[idx]
+            failure_code = self.failure_code[idx]
+
+            # Накопичення зносу (тільки для працюючого обладнання)
+            alive = ~is_failed
+            accumulated_wear = self.accumulated_wear[idx]
+            accumulated_wear[alive] += WEAR_RATES[variant[alive]] * WEAR_MULTIPLIER
+            self.accumulated_wear[idx] = accumulated_wear
+            current_wear = accumulated_wear + base_wear * 0.3
+
+            # Реальний шум вимірювань
+            air = air + rng.normal(0, 0.5, n)
+            process += rng.normal(0, 0.3, n)
+            speed += rng.normal(0, 10, n)
+            torque += rng.normal(0, 1, n)
+
+            # Поведінка після поломки для вже зламаних пристроїв
+            if is_failed.any():
+                air[is_failed], process[is_failed], speed[is_failed], torque[is_failed] = apply_post_failure_batch(
+                    air[is_failed], process[is_failed], speed[is_failed], torque[is_failed],
+                    failure_code[is_failed], now - self.failure_time[idx][is_failed]
+                )
+
+            # Перевірка на нові поломки
+            rnf_allowed = (scenario == SCENARIO_INDEX["normal"]) | (scenario == SCENARIO_INDEX["rnf"])
+            codes = detect_failure_batch(
+                air, process, speed, torque, current_wear,
+                variant, self.twf_limit[idx], rnf_allowed, rng
+            )
+            new_failures = np.flatnonzero(alive & (codes > 0))
+            is_failed[new_failures] = True
+            failure_code[new_failures] = codes[new_failures]
+
+            failed_idx = idx[new_failures]
+            self.is_failed[failed_idx] = True
+            self.failure_code[failed_idx] = codes[new_failures]
+            self.failure_time[failed_idx] = now
+            self.tick[idx] += 1
+
+            return {
+                "device_uid": [self.device_uids[i] for i in idx.tolist()],
+                "product_type": VARIANT_NAMES[variant],
+                "air_temp": air,
+                "process_temp": process,
+                "rotational_speed": speed,
+                "torque": torque,
+                "tool_wear": current_wear,
+                "power": torque * speed * RPM_TO_RAD,
+                "failure_type": FAILURE_NAMES[np.where(is_failed, failure_code, 0)],
+                "scenario": SCENARIO_ARRAY[scenario],
+                "is_failed": is_failed,
+                "new_failures": new_failures,
+            }
+
+    def handle_control_command(self, device_uid, command):
+        # Ті самі команди, що й DevicePublisher.handle_control_command
+        idx = self.index_by_uid.get(device_uid)
+        if idx is None:
+            return {"status": "error", "message": f"Невідомий пристрій: {device_uid}"}
+
+        action = command.get("action")
+        scenario = command.get("scenario", "normal")
+
+        if action in ("repair", "change_scenario"):
+            if scenario not in SCENARIO_INDEX:
+                return {"status": "error", "message": f"Невідомий сценарій: {scenario}"}
+            with self.lock:
+                self.reset(np.array([idx]), SCENARIO_INDEX[scenario])
+            print(f"[{device_uid}] RESET: Scenario='{scenario}'")
+            if action == "repair":
+                return {"status": "success", "message": f"Повний ремонт виконано. Сценарій: {scenario}"}
+            return {"status": "success", "message": f"Сценарій встановлено: {scenario} (стан скинуто)"}
+
+        elif action == "repair_partial":
+            with self.lock:
+                self.is_failed[idx] = False
+                self.failure_code[idx] = 0
+            return {"status": "success", "message": "Частковий ремонт виконано"}
+
+        else:
+            return {"status": "error", "message": f"Невідома команда: {action}"}
+
+
+def iter_batch_messages(batch: dict):
+    # Перетворює пакет такту на повідомлення у форматі DevicePublisher
+    timestamp = datetime.now(timezone.utc).isoformat()
+    columns = zip(
+        batch["device_uid"],
+        batch["product_type"].tolist(),
+        np.round(batch["air_temp"], 2).tolist(),
+        np.round(batch["process_temp"], 2).tolist(),
+        np.round(batch["rotational_speed"], 0).tolist(),
+        np.round(batch["torque"], 2).tolist(),
+        np.round(batch["tool_wear"], 1).tolist(),
+        np.round(batch["power"], 0).tolist(),
+        batch["failure_type"].tolist(),
+        batch["scenario"].tolist(),
+        batch["is_failed"].tolist(),
+    )
+    for uid, product, air, process, speed, torque, wear, power, failure, scenario, is_failed in columns:
+        yield {
+            "device_uid": uid,
+            "product_type": product,
+            "air_temp": air,
+            "process_temp": process,
+            "rotational_speed": speed,
+            "torque": torque,
+            "tool_wear": wear,
+            "power": power,
+            "failure_type": failure,
+            "scenario": scenario,
+            "timestamp": timestamp,
+            "is_failed": is_failed,
+            "time_elapsed": wear
+        }
+
+
+class FleetPublisher(threading.Thread):
+    # Один потік, що публікує пакет FleetSimulator на кожному такті
+    def __init__(self, fleet: FleetSimulator, interval, mqtt_client=None, mqtt_topic_prefix="sensors"):
+        super().__init__(daemon=True)
+        self.fleet = fleet
+        self.interval = interval
+        self.mqtt_client = mqtt_client
+        self.mqtt_topic_prefix = mqtt_topic_prefix
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            started = time.time()
+            batch = self.fleet.step(started)
+            publish_batch(batch, self.mqtt_client, self.mqtt_topic_prefix)
+
+            # Один підсумковий рядок на такт замість print на кожну відмову
+            new_failures = batch["new_failures"]
+            if len(new_failures):
+                sample = ", ".join(
+                    f"{batch['device_uid'][i]}={batch['failure_type'][i]}" for i in new_failures[:5]
+                )
+                print(f"[FLEET] Нових відмов: {len(new_failures)} ({sample}{', ...' if len(new_failures) > 5 else ''})")
+
+            elapsed = time.time() - started
+            if self.stop_event.wait(timeout=max(0.0, self.interval - elapsed)):
+                break
+
+    def stop(self):
+        self.stop_event.set()
+
+    def handle_control_command(self, device_uid, command):
+        return self.fleet.handle_control_command(device_uid, command)
+
+
+def publish_batch(batch, mqtt_client, topic_prefix):
+    # Публікує всі повідомлення пакету; повертає кількість відправлених
+    sent = 0
+    for data in iter_batch_messages(batch):
+        data["sent_at"] = time.time()
+        if mqtt_client:
+            try:
+                mqtt_client.publish(*encode_message(topic_prefix, data), qos=1)
+                sent += 1
+            except Exception as e:
+                print(f"[{data['device_uid']}] MQTT publish error: {e}")
+        else:
+            print(f"{data['device_uid']}: {json.dumps(data)}")
+            sent += 1
+    return sent
+
+
+class DeviceScheduler(threading.Thread):
+    """
+    Один потік веде всі віртуальні пристрої через heap дедлайнів.
+
+    Кожен пристрій має власний інтервал (interval ± interval_spread) і
+    випадковий jitter на кожну публікацію. На кожному пробудженні всі
+    пристрої, чий дедлайн настав, просуваються одним викликом
+    FleetSimulator.step(idx) і публікуються пакетом.
+    """
+
+    def __init__(self, fleet: FleetSimulator, interval, interval_spread=0.0, jitter=0.0,
+                 mqtt_client=None, mqtt_topic_prefix="sensors", report_interval=10.0, seed=None):
+        super().__init__(daemon=True)
+        self.fleet = fleet
+        self.mqtt_client = mqtt_client
+        self.mqtt_topic_prefix = mqtt_topic_prefix
+        self.jitter = jitter
+        self.report_interval = report_interval
+        self.stop_event = threading.Event()
+        self.rng = np.random.default_rng(seed)
+
+        spread = self.rng.uniform(1 - interval_spread, 1 + interval_spread, fleet.num_devices)
+        self.intervals = np.maximum(interval * spread, 1e-3)
+        self.target_rate = float(np.sum(1.0 / self.intervals))
+
+        self.sent = 0
+        self.failures = 0
+        self.max_lag = 0.0
+
+    def _next_due(self, due, i):
+        delay = self.intervals[i]
+        if self.jitter:
+            delay *= 1 + self.rng.uniform(-self.jitter, self.jitter)
+        return due + delay
+
+    def run(self):
+        start = time.time()
+        # Рівномірно розносимо перший дедлайн кожного пристрою на його інтервал
+        offsets = self.rng.uniform(0, self.intervals)
+        heap = [(start + offset, i) for i, offset in enumerate(offsets.tolist())]
+        heapq.heapify(heap)
+
+        report_at = start + self.report_interval
+        window_start, window_sent = start, 0
+
+        while not self.stop_event.is_set():
+            now = time.time()
+            due_idx = []
+            while heap and heap[0][0] <= now:
+                due, i = heapq.heappop(heap)
+                self.max_lag = max(self.max_lag, now - due)
+                next_due = self._next_due(due, i)
+                # Якщо відстали більше ніж на інтервал — не надолужуємо, а зсуваємо розклад
+                if next_due < now:
+                    next_due = now + self.intervals[i]
+                heapq.heappush(heap, (next_due, i))
+                due_idx.append(i)
+
+            if due_idx:
+                batch = self.fleet.step(now, np.array(due_idx))
+                sent = publish_batch(batch, self.mqtt_client, self.mqtt_topic_prefix)
+                self.sent += sent
+                window_sent += sent
+                self.failures += len(batch["new_failures"])
+
+            if now >= report_at:
+                self.report(now - window_start, window_sent)
+                window_start, window_sent = now, 0
+                report_at = now + self.report_interval
+
+            wait = heap[0][0] - time.time() if heap else self.report_interval
+            if wait > 0 and self.stop_event.wait(timeout=min(wait, self.report_interval)):
+                break
+
+    def report(self, elapsed, sent):
+        achieved = sent / elapsed if elapsed > 0 else 0.0
+        ratio = achieved / self.target_rate * 100 if self.target_rate else 0.0
+        print(f"[SCHED] Цільова швидкість: {self.target_rate:.1f} msg/s, "
+              f"фактична: {achieved:.1f} msg/s ({ratio:.0f}%), "
+              f"макс. запізнення: {self.max_lag * 1000:.0f} мс, нових відмов: {self.failures}")
+        self.max_lag = 0.0
+        self.failures = 0
+
+    def stop(self):
+        self.stop_event.set()
+
+    def handle_control_command(self, device_uid, command):
+        return self.fleet.handle_control_command(device_uid, command)
+
+# -----------------------------
+# Навантажувальний тест
+# -----------------------------
+
+def parse_rate(value: str) -> float:
+    # "50000/s", "50000" або "3000/min" -> повідомлень за секунду
+    value = value.strip().lower()
+    per = 1.0
+    if "/" in value:
+        value, unit = value.split("/", 1)
+        per = {"s": 1.0, "sec": 1.0, "m": 60.0, "min": 60.0}.get(unit.strip())
+        if per is None:
+            raise argparse.ArgumentTypeError(f"Невідома одиниця швидкості: {unit}")
+    return float(value) / per
+
+
+class LoadGenerator(threading.Thread):
+    """
+    Генерує рівно target_rate повідомлень/с (з лінійним розгоном ramp секунд)
+    протягом duration секунд, обходячи пристрої флоту по колу.
+
+    Кожне повідомлення має глобальний порядковий номер "seq" і час
+    відправки "sent_at" (epoch секунди), які consumer зберігає в
+    sensor_readings — їх використовує backend.bench_measure.
+    """
+
+    TICK = 0.005
+
+    def __init__(self, fleet: FleetSimulator, target_rate, duration=60.0, ramp=0.0,
+                 mqtt_client=None, mqtt_topic_prefix="sensors", report_interval=10.0):
+        super().__init__(daemon=True)
+        self.fleet = fleet
+        self.target_rate = target_rate
+        self.duration = duration
+        self.ramp = ramp
+        self.mqtt_client = mqtt_client
+        self.mqtt_topic_prefix = mqtt_topic_prefix
+        self.report_interval = report_interval
+        self.stop_event = threading.Event()
+
+        self.seq = 0
+        self.errors = 0
+        self.cursor = 0
+        self.started_at = None
+        self.finished_at = None
+
+    def expected_sent(self, elapsed):
+        # Скільки повідомлень мало бути відправлено до моменту elapsed (інтеграл швидкості)
+        elapsed = min(elapsed, self.duration) if self.duration else elapsed
+        if self.ramp <= 0:
+            return self.target_rate * elapsed
+        if elapsed <= self.ramp:
+            return self.target_rate * elapsed * elapsed / (2 * self.ramp)
+        return self.target_rate * (self.ramp / 2 + (elapsed - self.ramp))
+
+    def current_rate(self, elapsed):
+        if self.ramp <= 0:
+            return self.target_rate
+        return self.target_rate * min(1.0, elapsed / self.ramp)
+
+    def _next_devices(self, count):
+        idx = (self.cursor + np.arange(count)) % self.fleet.num_devices
+        self.cursor = int((self.cursor + count) % self.fleet.num_devices)
+        return idx
+
+    def _publish(self, batch):
+        for data in iter_batch_messages(batch):
+            data["seq"] = self.seq
+            data["sent_at"] = time.time()
+            self.seq += 1
+            try:
+                if self.mqtt_client:
+                    self.mqtt_client.publish(*encode_message(self.mqtt_topic_prefix, data), qos=1)
+            except Exception:
+                self.errors += 1
+
+    def run(self):
+        self.started_at = time.time()
+        report_at = self.started_at + self.report_interval
+        window_start, window_seq = self.started_at, 0
+
+        while not self.stop_event.is_set():
+            now = time.time()
+            elapsed = now - self.started_at
+            if self.duration and elapsed >= self.duration:
+                break
+
+            due = int(self.expected_sent(elapsed)) - self.seq
+            while due > 0:
+                # Один пристрій — не більше одного повідомлення за step
+                count = min(due, self.fleet.num_devices)
+                batch = self.fleet.step(now, self._next_devices(count))
+                self._publish(batch)
+                due -= count
+
+            if now >= report_at:
+                rate = (self.seq - window_seq) / (now - window_start)
+                print(f"[BENCH] t={elapsed:.0f}s, ціль: {self.current_rate(elapsed):.0f} msg/s, "
+                      f"фактично: {rate:.0f} msg/s, відправлено: {self.seq}, помилок: {self.errors}")
+                window_start, window_seq = now, self.seq
+                report_at = now + self.report_interval
+
+            self.stop_event.wait(timeout=self.TICK)
+
+        self.finished_at = time.time()
+        self.summary()
+        self.stop_event.set()
+
+    def summary(self):
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        print(f"[BENCH] Завершено: відправлено {self.seq} повідомлень за {elapsed:.1f}с "
+              f"({self.seq / elapsed if elapsed else 0:.0f} msg/s, ціль {self.target_rate:.0f} msg/s), "
+              f"помилок публікації: {self.errors}")
+        print(f"[BENCH] Діапазон seq: 0..{self.seq - 1}, старт: {datetime.fromtimestamp(self.started_at, timezone.utc).isoformat()}")
+
+    def stop(self):
+        self.stop_event.set()
+
+    def handle_control_command(self, device_uid, command):
+        return self.fleet.handle_control_command(device_uid, command)
+
+# -----------------------------
+# Відтворення датасету (AI4I 2020)
+# -----------------------------
+
+REPLAY_COLUMNS = {
+    "Air temperature [K]": "air_temp",
+    "Process temperature [K]": "process_temp",
+    "Rotational speed [rpm]": "rotational_speed",
+    "Torque [Nm]": "torque",
+    "Tool wear [min]": "tool_wear",
+}
+REPLAY_FAILURE_LABELS = ["TWF", "HDF", "PWF", "OSF", "RNF"]
+
+
+def iter_dataset_chunks(path: str, chunk_size: int = 5000):
+    # Ліниво читає датасет: CSV — чанками, Parquet — батчами з memory map
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Для відтворення Parquet потрібен pyarrow (pip install pyarrow) або CSV-версія датасету")
+        parquet_file = pq.ParquetFile(path, memory_map=True)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        import pandas as pd
+        # utf-8-sig: ai4i2020.csv починається з BOM
+        yield from pd.read_csv(path, chunksize=chunk_size, encoding="utf-8-sig")
+
+
+def failure_labels(chunk) -> np.ndarray:
+    # Мітка відмови рядка датасету: перший прапорець TWF..RNF або "Normal"
+    present = [name for name in REPLAY_FAILURE_LABELS if name in chunk.columns]
+    if not present:
+        return np.full(len(chunk), "Normal", dtype=object)
+    conditions = [chunk[name].to_numpy() == 1 for name in present]
+    return np.select(conditions, present, default="Normal").astype(object)
+
+
+class DatasetReplayer(threading.Thread):
+    """
+    Відтворює рядки датасету (ai4i2020.csv, AI4I_with_RUL.csv або будь-який
+    CSV/Parquet з тими ж колонками) як телеметрію віртуальних пристроїв.
+
+    Рядки розподіляються по кругу між num_devices пристроями кожного типу
+    продукту (replay-l-1, replay-m-3, ...), тож product_type пристрою не
+    змінюється. Кожен пристрій отримує рядок раз на interval секунд,
+    прискорення — speed, max_speed — без пауз. Повідомлення містять seq
+    (номер рядка у файлі) та мітки (label_failure, label_rul) для перевірки
+    якості прогнозів через backend.bench_measure --replay-labels.
+    """
+
+    def __init__(self, path, num_devices, interval, speed=1.0, max_speed=False, loop=False,
+                 chunk_size=5000, mqtt_client=None, mqtt_topic_prefix="sensors",
+                 device_prefix="replay", report_interval=10.0):
+        super().__init__(daemon=True)
+        self.path = path
+        self.num_devices = num_devices
+        self.max_speed = max_speed
+        self.loop = loop
+        self.chunk_size = chunk_size
+        self.mqtt_client = mqtt_client
+        self.mqtt_topic_prefix = mqtt_topic_prefix
+        self.device_prefix = device_prefix
+        self.report_interval = report_interval
+        self.stop_event = threading.Event()
+
+        # Пауза між сусідніми рядками для всього потоку (усіх пристроїв разом):
+        # num_devices — пристроїв кожного типу продукту
+        self.row_period = interval / max(1, num_devices * len(PRODUCT_VARIANTS)) / speed
+        self.type_counters = {}
+        self.seq = 0
+        self.sent = 0
+        self.errors = 0
+
+    def _device_uids(self, product_types: np.ndarray) -> list:
+        # Круговий розподіл рядків між пристроями в межах кожного типу продукту
+        slots = np.empty(len(product_types), dtype=np.int64)
+        for product_type in np.unique(product_types):
+            mask = product_types == product_type
+            count = int(mask.sum())
+            offset = self.type_counters.get(product_type, 0)
+            slots[mask] = (offset + np.arange(count)) % self.num_devices + 1
+            self.type_counters[product_type] = offset + count
+        return [
+            f"{self.device_prefix}-{product_type.lower()}-{slot}"
+            for product_type, slot in zip(product_types.tolist(), slots.tolist())
+        ]
+
+    def _chunk_messages(self, chunk):
+        missing = [c for c in list(REPLAY_COLUMNS) + ["Type"] if c not in chunk.columns]
+        if missing:
+            raise ValueError(f"У датасеті відсутні колонки: {missing}")
+
+        product_types = chunk["Type"].astype(str).to_numpy()
+        columns = {field: chunk[name].to_numpy(dtype=float) for name, field in REPLAY_COLUMNS.items()}
+        power = np.round(columns["torque"] * columns["rotational_speed"] * RPM_TO_RAD, 0)
+        labels = failure_labels(chunk)
+        rul = chunk["RUL_synthetic"].to_numpy(dtype=float) if "RUL_synthetic" in chunk.columns else None
+
+        rows = zip(
+            self._device_uids(product_types),
+            product_types.tolist(),
+            columns["air_temp"].tolist(),
+            columns["process_temp"].tolist(),
+            columns["rotational_speed"].tolist(),
+            columns["torque"].tolist(),
+            columns["tool_wear"].tolist(),
+            power.tolist(),
+            labels.tolist(),
+            rul.tolist() if rul is not None else [None] * len(chunk),
+        )
+        for uid, product, air, process, speed, torque, wear, row_power, label, row_rul in rows:
+            yield {
+                "device_uid": uid,
+                "product_type": product,
+                "air_temp": air,
+                "process_temp": process,
+                "rotational_speed": speed,
+                "torque": torque,
+                "tool_wear": wear,
+                "power": row_power,
+                "failure_type": label,
+                "scenario": "replay",
+                "is_failed": label != "Normal",
+                "time_elapsed": wear,
+                "label_failure": label,
+                "label_rul": row_rul,
+            }
+
+    def run(self):
+        started = time.time()
+        report_at = started + self.report_interval
+        passes = 0
+
+        while not self.stop_event.is_set():
+            for chunk in iter_dataset_chunks(self.path, self.chunk_size):
+                for data in self._chunk_messages(chunk):
+                    if not self.max_speed:
+                        delay = started + self.seq * self.row_period - time.time()
+                        if delay > 0 and self.stop_event.wait(timeout=delay):
+                            return self.summary(started)
+                    elif self.stop_event.is_set():
+                        return self.summary(started)
+
+                    now = time.time()
+                    data["seq"] = self.seq
+                    data["sent_at"] = now
+                    data["timestamp"] = datetime.fromtimestamp(now, timezone.utc).isoformat()
+                    self.seq += 1
+                    try:
+                        if self.mqtt_client:
+                            self.mqtt_client.publish(*encode_message(self.mqtt_topic_prefix, data), qos=1)
+                        else:
+                            print(f"{data['device_uid']}: {json.dumps(data)}")
+                        self.sent += 1
+                    except Exception:
+                        self.errors += 1
+
+                    if now >= report_at:
+                        print(f"[REPLAY] Відправлено: {self.sent} рядків, {self.sent / (now - started):.0f} rows/s, помилок: {self.errors}")
+                        report_at = now + self.report_interval
+
+            passes += 1
+            if not self.loop:
+                break
+
+        self.summary(started)
+        self.stop_event.set()
+
+    def summary(self, started):
+        elapsed = time.time() - started
+        print(f"[REPLAY] Завершено: {self.sent} рядків з {self.path} за {elapsed:.1f}с "
+              f"({self.sent / elapsed if elapsed else 0:.0f} rows/s), помилок: {self.errors}")
+
+    def stop(self):
+        self.stop_event.set()
+
+    def handle_control_command(self, device_uid, command):
+        return {"status": "error", "message": "Пристрої відтворення датасету не керуються командами"}
+
 # -----------------------------
 # Головна функція
 # -----------------------------
@@ -673,13 +1467,39 @@ def main():
     parser.add_argument("--mqtt-host", type=str, default="localhost", help="MQTT брокер")
     parser.add_argument("--mqtt-port", type=int, default=1883, help="MQTT порт")
     parser.add_argument("--mqtt-topic-prefix", type=str, default="sensors", help="Префікс MQTT топіку")
+    parser.add_argument("--payload-format", choices=["json", "binary"], default="json",
+                        help="Формат повідомлень: json або компактний binary (тема <prefix>/<uid>/bin)")
+    parser.add_argument("--engine", choices=["threads", "vectorized", "scheduler"], default="threads",
+                        help="threads — потік на пристрій, vectorized — один NumPy-рушій на весь флот, "
+                             "scheduler — один потік з heap дедлайнів (власний інтервал на пристрій)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed для vectorized/scheduler рушія")
+    parser.add_argument("--interval-spread", type=float, default=0.0,
+                        help="Розкид інтервалу між пристроями (частка, 0.2 = ±20%%) для scheduler")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="Випадковий jitter кожної публікації (частка інтервалу) для scheduler")
+    parser.add_argument("--report-interval", type=float, default=10.0,
+                        help="Період звіту про цільову/фактичну швидкість публікації (секунди)")
+    parser.add_argument("--target-rate", type=parse_rate, default=None,
+                        help="Режим навантажувального тесту: цільова швидкість, напр. 50000/s")
+    parser.add_argument("--duration", type=float, default=60.0,
+                        help="Тривалість навантажувального тесту (секунди, 0 = без обмеження)")
+    parser.add_argument("--ramp", type=float, default=0.0,
+                        help="Лінійний розгін до --target-rate (секунди)")
+    parser.add_argument("--replay", type=str, default=None,
+                        help="Відтворити датасет (CSV/Parquet у форматі AI4I 2020), напр. backend/model/AI4I_with_RUL.csv")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Прискорення відтворення (×N відносно --interval на пристрій)")
+    parser.add_argument("--max-speed", action="store_true", help="Відтворювати без пауз")
+    parser.add_argument("--loop", action="store_true", help="Повторювати датасет по колу")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Розмір чанку читання датасету")
     
     args = parser.parse_args()
-    global WEAR_MULTIPLIER
+    global WEAR_MULTIPLIER, PAYLOAD_FORMAT
     WEAR_MULTIPLIER = args.wear_rate
+    PAYLOAD_FORMAT = args.payload_format
 
     print(f"Інтелектуальна система прогнозування технічного стану обладнання")
-    print(f"Пристроїв: {args.num_devices}, Інтервал: {args.interval}с")
+    print(f"Пристроїв: {args.num_devices}, Інтервал: {args.interval}с, Рушій: {args.engine}")
     print(f"Множник зносу: {WEAR_MULTIPLIER}x")
     print(f"MQTT: {'Так' if args.mqtt else 'Ні'}")
     if args.mqtt:
@@ -688,6 +1508,7 @@ def main():
     # Налаштування MQTT
     mqtt_client = None
     devices = {}
+    fleet_publisher = None
 
     if args.mqtt:
         try:
@@ -698,7 +1519,10 @@ def main():
                 try:
                     target_device = msg.topic.split('/')[-1]
                     payload = json.loads(msg.payload.decode())
-                    if target_device in devices:
+                    if fleet_publisher is not None:
+                        result = fleet_publisher.handle_control_command(target_device, payload)
+                        print(f"[{target_device}] Command: {payload.get('action')} -> {result['status']}")
+                    elif target_device in devices:
                         result = devices[target_device].handle_control_command(payload)
                         print(f"[{target_device}] Command: {payload.get('action')} -> {result['status']}")
                 except Exception as e:
@@ -715,12 +1539,60 @@ def main():
             sys.exit(1)
 
     publishers = []
-    for i in range(1, args.num_devices + 1):
-        device_uid = f"dev-{i}"
-        publisher = DevicePublisher(device_uid, args.interval, mqtt_client, args.mqtt_topic_prefix)
-        devices[device_uid] = publisher
-        publishers.append(publisher)
-        publisher.start()
+    if args.replay:
+        fleet_publisher = DatasetReplayer(
+            args.replay, args.num_devices, args.interval,
+            speed=args.speed,
+            max_speed=args.max_speed,
+            loop=args.loop,
+            chunk_size=args.chunk_size,
+            mqtt_client=mqtt_client,
+            mqtt_topic_prefix=args.mqtt_topic_prefix,
+            report_interval=args.report_interval
+        )
+        print(f"Відтворення датасету: {args.replay}, пристроїв на тип: {args.num_devices}, "
+              f"швидкість: {'максимальна' if args.max_speed else f'x{args.speed}'}")
+        publishers.append(fleet_publisher)
+        fleet_publisher.start()
+    elif args.target_rate:
+        fleet = FleetSimulator(args.num_devices, seed=args.seed)
+        fleet_publisher = LoadGenerator(
+            fleet, args.target_rate,
+            duration=args.duration,
+            ramp=args.ramp,
+            mqtt_client=mqtt_client,
+            mqtt_topic_prefix=args.mqtt_topic_prefix,
+            report_interval=args.report_interval
+        )
+        print(f"Навантажувальний тест: {args.target_rate:.0f} msg/s, {args.duration}с, розгін {args.ramp}с")
+        publishers.append(fleet_publisher)
+        fleet_publisher.start()
+    elif args.engine == "vectorized":
+        fleet = FleetSimulator(args.num_devices, seed=args.seed)
+        fleet_publisher = FleetPublisher(fleet, args.interval, mqtt_client, args.mqtt_topic_prefix)
+        publishers.append(fleet_publisher)
+        fleet_publisher.start()
+    elif args.engine == "scheduler":
+        fleet = FleetSimulator(args.num_devices, seed=args.seed)
+        fleet_publisher = DeviceScheduler(
+            fleet, args.interval,
+            interval_spread=args.interval_spread,
+            jitter=args.jitter,
+            mqtt_client=mqtt_client,
+            mqtt_topic_prefix=args.mqtt_topic_prefix,
+            report_interval=args.report_interval,
+            seed=args.seed
+        )
+        print(f"Цільова швидкість публікації: {fleet_publisher.target_rate:.1f} msg/s")
+        publishers.append(fleet_publisher)
+        fleet_publisher.start()
+    else:
+        for i in range(1, args.num_devices + 1):
+            device_uid = f"dev-{i}"
+            publisher = DevicePublisher(device_uid, args.interval, mqtt_client, args.mqtt_topic_prefix)
+            devices[device_uid] = publisher
+            publishers.append(publisher)
+            publisher.start()
 
     def shutdown(signum=None, frame=None):
         print(f"\nЗавершення роботи симулятора...")
@@ -734,7 +1606,11 @@ def main():
     print("Симулятор запущено... Натисніть Ctrl+C, щоб зупинити.")
     
     try:
-        while True: time.sleep(1)
+        while True:
+            time.sleep(1)
+            # Навантажувальний тест і відтворення датасету завершуються самі
+            if (args.target_rate or args.replay) and not fleet_publisher.is_alive():
+                shutdown()
     except KeyboardInterrupt:
         shutdown()
 